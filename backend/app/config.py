@@ -1,4 +1,5 @@
 import os
+from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,6 +28,11 @@ class Settings:
     
     # Cohere Configuration
     COHERE_API_KEY: str = os.getenv("COHERE_API_KEY", "")
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "60"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # In-flight generations per worker
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "8"))
+    LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
     
     # CORS
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
@@ -34,10 +40,101 @@ class Settings:
     # Vector Database
     CHROMA_PERSIST_DIRECTORY: str = "chroma_db"
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    VECTOR_STORE_WORKERS: int = int(os.getenv("VECTOR_STORE_WORKERS", "2"))  # Threads for embedding and search
+    EMBEDDING_BATCH_WINDOW_MS: float = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "2"))  # 0 disables batching
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" (dense + BM25) or "dense"
+    RETRIEVAL_CANDIDATES: int = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))  # Per ranking, before fusion
+    RRF_K: int = int(os.getenv("RRF_K", "60"))  # Reciprocal rank fusion damping constant
+    RETRIEVAL_CACHE_ENABLED: bool = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024"))
+    KNOWLEDGE_VERSION_CHECK_SECONDS: float = float(os.getenv("KNOWLEDGE_VERSION_CHECK_SECONDS", "5"))  # Picks up ingestion by other processes
+    INGESTION_BATCH_SIZE: int = int(os.getenv("INGESTION_BATCH_SIZE", "64"))  # Documents per group and chunks per embedding call
+    INGESTION_CHUNK_SIZE: int = int(os.getenv("INGESTION_CHUNK_SIZE", "1000"))
+    INGESTION_CHUNK_OVERLAP: int = int(os.getenv("INGESTION_CHUNK_OVERLAP", "200"))
+    VECTOR_INDEX: str = os.getenv("VECTOR_INDEX", "chroma")  # "chroma", or "int8"/"float16" compressed in-memory index
+    VECTOR_INDEX_RESCORE_CANDIDATES: int = int(os.getenv("VECTOR_INDEX_RESCORE_CANDIDATES", "50"))  # Re-scored at full precision
+    METADATA_INDEX_FIELDS: List[str] = [
+        field.strip() for field in os.getenv("METADATA_INDEX_FIELDS", "category,type,relevance,source").split(",") if field.strip()
+    ]
+    FILTERED_SEARCH_MAX_CANDIDATES: int = int(os.getenv("FILTERED_SEARCH_MAX_CANDIDATES", "2000"))  # Scored exactly below this
+    FILTERED_SEARCH_OVERFETCH: int = int(os.getenv("FILTERED_SEARCH_OVERFETCH", "4"))  # Deeper search, then filtered, above it
+    KNOWLEDGE_CATEGORY_FILTER_ENABLED: bool = os.getenv("KNOWLEDGE_CATEGORY_FILTER_ENABLED", "true").lower() == "true"
+    VECTOR_ENGINE: str = os.getenv("VECTOR_ENGINE", "chroma")  # "chroma" or "faiss"
+    FAISS_INDEX_DIRECTORY: str = os.getenv("FAISS_INDEX_DIRECTORY", "faiss_index")
+    FAISS_INDEX_TYPE: str = os.getenv("FAISS_INDEX_TYPE", "flat")  # "flat", "ivf" or "hnsw"
+    FAISS_NLIST: int = int(os.getenv("FAISS_NLIST", "1024"))  # IVF centroids (capped at vectors / 39)
+    FAISS_NPROBE: int = int(os.getenv("FAISS_NPROBE", "16"))  # IVF lists searched per query
+    FAISS_HNSW_M: int = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_EF_SEARCH: int = int(os.getenv("FAISS_EF_SEARCH", "64"))
+    VECTOR_STORE_BACKGROUND_INIT: bool = os.getenv("VECTOR_STORE_BACKGROUND_INIT", "true").lower() == "true"
+    VECTOR_STORE_READY_TIMEOUT: float = float(os.getenv("VECTOR_STORE_READY_TIMEOUT", "1.5"))  # Wait per query while warming
     
     # LangChain
-    LLM_MODEL: str = "command-r-plus"  # Cohere's flagship model
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "cohere/command-r-plus")  # "<provider>/<model>": cohere or local
     TEMPERATURE: float = 0.1
     MAX_TOKENS: int = 1000
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))  # Input tokens, excluding the answer
+    PROMPT_TOKENIZER: str = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+    
+    # Local LLM stand-in (LLM_MODEL=local/...) for offline load tests
+    LOCAL_LLM_LATENCY_MS: float = float(os.getenv("LOCAL_LLM_LATENCY_MS", "300"))  # Time to first token
+    LOCAL_LLM_LATENCY_JITTER_MS: float = float(os.getenv("LOCAL_LLM_LATENCY_JITTER_MS", "100"))  # Mean of the exponential tail
+    LOCAL_LLM_TOKENS_PER_SECOND: float = float(os.getenv("LOCAL_LLM_TOKENS_PER_SECOND", "50"))
+    LOCAL_LLM_ANSWER_TOKENS: int = int(os.getenv("LOCAL_LLM_ANSWER_TOKENS", "150"))
+    LOCAL_LLM_ERROR_RATE: float = float(os.getenv("LOCAL_LLM_ERROR_RATE", "0.0"))
+    LOCAL_LLM_SEED: int = int(os.getenv("LOCAL_LLM_SEED", "42"))
+    
+    # Query pipeline deadlines (seconds) - a source that misses its deadline is dropped
+    KNOWLEDGE_BASE_DEADLINE: float = float(os.getenv("KNOWLEDGE_BASE_DEADLINE", "2.0"))
+    MONGODB_QUERY_DEADLINE: float = float(os.getenv("MONGODB_QUERY_DEADLINE", "3.0"))
+    MYSQL_QUERY_DEADLINE: float = float(os.getenv("MYSQL_QUERY_DEADLINE", "3.0"))
+    
+    # Per-stage timings in /query/ask responses (`timings` and Server-Timing)
+    QUERY_TIMINGS_ENABLED: bool = os.getenv("QUERY_TIMINGS_ENABLED", "false").lower() == "true"
+    
+    # Semantic answer cache
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "900"))
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+    
+    # Data version behind cached answers - "memory" is per worker, "redis" is shared
+    # through REDIS_URL with every worker and the data insertion scripts
+    DATA_VERSION_BACKEND: str = os.getenv("DATA_VERSION_BACKEND", "memory")
+    DATA_VERSION_SYNC_SECONDS: float = float(os.getenv("DATA_VERSION_SYNC_SECONDS", "1.0"))  # Staleness bound across workers
+    
+    # Text-to-query planner for questions no intent rule matches
+    QUERY_PLANNER_ENABLED: bool = os.getenv("QUERY_PLANNER_ENABLED", "true").lower() == "true"
+    QUERY_PLANNER_MAX_ENTRIES: int = int(os.getenv("QUERY_PLANNER_MAX_ENTRIES", "1024"))  # Question templates
+    QUERY_PLANNER_TTL_SECONDS: float = float(os.getenv("QUERY_PLANNER_TTL_SECONDS", "3600"))
+    QUERY_PLANNER_REJECTED_TTL_SECONDS: float = float(os.getenv("QUERY_PLANNER_REJECTED_TTL_SECONDS", "60"))  # Retry bad plans soon
+    QUERY_PLANNER_MAX_ROWS: int = int(os.getenv("QUERY_PLANNER_MAX_ROWS", "50"))
+    QUERY_PLANNER_DEADLINE: float = float(os.getenv("QUERY_PLANNER_DEADLINE", "10.0"))
+    
+    # Precomputed answers for the most asked questions
+    HOT_QUESTIONS_ENABLED: bool = os.getenv("HOT_QUESTIONS_ENABLED", "true").lower() == "true"
+    HOT_QUESTIONS_MAX_ENTRIES: int = int(os.getenv("HOT_QUESTIONS_MAX_ENTRIES", "10"))
+    HOT_QUESTIONS_MIN_COUNT: int = int(os.getenv("HOT_QUESTIONS_MIN_COUNT", "3"))  # Requests before a question is precomputed
+    HOT_QUESTIONS_MAX_TRACKED: int = int(os.getenv("HOT_QUESTIONS_MAX_TRACKED", "1000"))  # Distinct questions counted
+    HOT_QUESTIONS_REFRESH_SECONDS: float = float(os.getenv("HOT_QUESTIONS_REFRESH_SECONDS", "300"))
+    HOT_QUESTIONS_CHECK_SECONDS: float = float(os.getenv("HOT_QUESTIONS_CHECK_SECONDS", "5"))
+    HOT_QUESTIONS_SEED: list = [
+        question for question in os.getenv(
+            "HOT_QUESTIONS_SEED",
+            "Show me the top 5 portfolios|Who are the top relationship managers by AUM?|What are the recent transactions?"
+        ).split("|") if question.strip()
+    ]
+    
+    # Batch questions (/query/ask-batch)
+    BATCH_MAX_QUESTIONS: int = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))  # Generations per batch, within LLM_MAX_CONCURRENCY
+    
+    # Conversations - "memory" is per worker, "redis" is shared through REDIS_URL
+    CONVERSATION_STORE_BACKEND: str = os.getenv("CONVERSATION_STORE_BACKEND", "memory")
+    CONVERSATION_MAX_ENTRIES: int = int(os.getenv("CONVERSATION_MAX_ENTRIES", "10000"))
+    CONVERSATION_IDLE_TTL_SECONDS: float = float(os.getenv("CONVERSATION_IDLE_TTL_SECONDS", "86400"))
+    CONVERSATION_WINDOW: int = int(os.getenv("CONVERSATION_WINDOW", "5"))  # Turns kept per conversation
 
 settings = Settings()
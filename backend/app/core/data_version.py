@@ -0,0 +1,72 @@
+"""Version counter for the portfolio data behind query answers"""
+
+import logging
+import time
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class DataVersion:
+    """Monotonic version bumped whenever client or transaction data is written.
+    
+    Caches that derive answers from the databases record the version they were
+    built against and treat a different version as stale. With a Redis URL the
+    counter is shared, so a bump by another worker or by a data script is
+    picked up by `sync()` within `sync_seconds`; otherwise it is per process.
+    """
+    
+    KEY = "data_version"
+    
+    def __init__(self, redis_url: Optional[str] = None, sync_seconds: float = 1.0):
+        self.version = 0
+        self.changed_at = time.time()
+        self.sync_seconds = sync_seconds
+        self._synced_at = 0.0
+        self.redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            
+            self.redis = redis.from_url(redis_url, decode_responses=True)
+    
+    @property
+    def current(self) -> int:
+        return self.version
+    
+    async def sync(self) -> int:
+        """Refresh the version from the shared counter, at most once per `sync_seconds`"""
+        if self.redis is None or time.monotonic() - self._synced_at < self.sync_seconds:
+            return self.version
+        self._synced_at = time.monotonic()
+        try:
+            shared = int(await self.redis.get(self.KEY) or 0)
+        except Exception as e:
+            logger.warning(f"Data version sync failed, keeping version {self.version}: {e}")
+            return self.version
+        if shared != self.version:
+            self.version = shared
+            self.changed_at = time.time()
+        return self.version
+    
+    async def bump(self) -> int:
+        """Record that the underlying data changed"""
+        if self.redis is not None:
+            self.version = int(await self.redis.incr(self.KEY))
+            self._synced_at = time.monotonic()
+        else:
+            self.version += 1
+        self.changed_at = time.time()
+        return self.version
+    
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+
+def create_data_version() -> DataVersion:
+    """Build the data version selected by DATA_VERSION_BACKEND"""
+    if settings.DATA_VERSION_BACKEND == "redis":
+        return DataVersion(redis_url=settings.REDIS_URL, sync_seconds=settings.DATA_VERSION_SYNC_SECONDS)
+    return DataVersion()
+
+data_version = create_data_version()
@@ -0,0 +1,89 @@
+"""Bounded in-process cache with LRU and idle-TTL eviction"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+class LRUCache:
+    """Mapping capped at `max_entries` that evicts the least recently used key.
+    
+    When `ttl_seconds` is set, entries not read or written for that long are
+    treated as missing and dropped.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None or self._expired(item[1]):
+            if item is not None:
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+        self._data[key] = (item[0], time.monotonic())
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+    
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+    
+    def clear(self):
+        self._data.clear()
+    
+    def keys(self) -> List[Hashable]:
+        """Live keys, most recently used first"""
+        self.evict_expired()
+        return list(reversed(self._data))
+    
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Live (key, value) pairs without touching recency or hit counts"""
+        self.evict_expired()
+        return [(key, value) for key, (value, _) in self._data.items()]
+    
+    def evict_expired(self):
+        if self.ttl_seconds is None:
+            return
+        # Entries are kept in access order, so expired ones sit at the front
+        while self._data:
+            key, (_, touched_at) = next(iter(self._data.items()))
+            if not self._expired(touched_at):
+                break
+            del self._data[key]
+            self.evictions += 1
+    
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and not self._expired(item[1])
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+    
+    def _expired(self, touched_at: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - touched_at > self.ttl_seconds
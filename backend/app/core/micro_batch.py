@@ -0,0 +1,73 @@
+"""Micro-batching of concurrent calls into one batched call"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Tuple
+
+class MicroBatcher:
+    """Groups items submitted within `window` seconds into one `batch_fn` call.
+
+    The first item of a batch starts the window; the batch is flushed when the
+    window closes or it reaches `max_batch` items. `batch_fn` takes the list of
+    items and returns their results in the same order. A window of 0 disables
+    batching.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[List[Any]]], window: float, max_batch: int):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Return the result for one item, computed in a batch with its neighbours"""
+        if self.window <= 0:
+            self.batches += 1
+            self.items += 1
+            return (await self.batch_fn([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference so the task isn't garbage collected mid-batch
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            # A caller that gave up (deadline, disconnect) has a cancelled future
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
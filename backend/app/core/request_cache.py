@@ -0,0 +1,56 @@
+"""Request-scoped memoization of database reads"""
+
+import asyncio
+import contextvars
+import json
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_current_scope = contextvars.ContextVar("read_scope", default=None)
+
+class ReadScope:
+    """Shares identical reads issued while handling one request.
+    
+    The first caller for a key starts the read; later callers, including ones
+    that arrive while it is still in flight, await the same task.
+    """
+    
+    def __init__(self):
+        self.reads: Dict[Hashable, asyncio.Future] = {}
+        self.round_trips = 0
+        self.saved_round_trips = 0
+    
+    async def read(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.reads.get(key)
+        if task is None:
+            self.round_trips += 1
+            task = asyncio.ensure_future(fetch())
+            self.reads[key] = task
+        else:
+            self.saved_round_trips += 1
+        # One consumer missing its deadline must not cancel the read for the others
+        return await asyncio.shield(task)
+    
+    def stats(self) -> dict:
+        return {"round_trips": self.round_trips, "saved_round_trips": self.saved_round_trips}
+
+@contextmanager
+def read_scope():
+    """Memoize database reads made inside the block, including in tasks it spawns"""
+    scope = ReadScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+async def memoized_read(key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Run `fetch` once per key within the current read scope (or always, outside one)"""
+    scope = _current_scope.get()
+    if scope is None:
+        return await fetch()
+    return await scope.read(key, fetch)
+
+def read_key(*parts: Any) -> str:
+    """Canonical key for a read, stable across dict ordering"""
+    return json.dumps(parts, sort_keys=True, default=str)
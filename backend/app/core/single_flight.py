@@ -0,0 +1,40 @@
+"""Single-flight deduplication of concurrent identical work"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers share its result.
+    
+    The computation runs as its own task, so a leader whose client disconnects
+    does not cancel it for the callers waiting on it.
+    """
+    
+    def __init__(self):
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        """Return (result, shared) where shared is True if another caller did the work"""
+        task = self.in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+    
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+    
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
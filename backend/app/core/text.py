@@ -0,0 +1,9 @@
+"""Text normalization helpers shared by the query caches"""
+
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question: lowercase, single-spaced, no trailing punctuation"""
+    return _WHITESPACE.sub(" ", question.lower()).strip().rstrip("?!.").strip()
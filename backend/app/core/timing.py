@@ -0,0 +1,88 @@
+"""Request-scoped per-stage timings for the query pipeline"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+_current_timings = contextvars.ContextVar("stage_timings", default=None)
+
+class StageTimings:
+    """Wall-clock time spent in each pipeline stage while handling one request.
+
+    Stages that run concurrently overlap, so the durations can add up to more
+    than the request took. A stage entered more than once accumulates.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Durations in milliseconds"""
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.durations.items()}
+
+@contextmanager
+def timing_scope(enabled: bool = True):
+    """Record stage timings inside the block, including in tasks it spawns; yields None when disabled"""
+    if not enabled:
+        yield None
+        return
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+def timed(stage: str) -> Callable:
+    """Record the duration of every call under `stage` when a timing scope is active
+
+    Outside a scope the only overhead is one context variable lookup per call.
+    """
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                timings = _current_timings.get()
+                if timings is None:
+                    return await fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    timings.add(stage, time.perf_counter() - start)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                timings = _current_timings.get()
+                if timings is None:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    timings.add(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+@contextmanager
+def timed_stage(stage: str):
+    """Record the duration of the block under `stage` when a timing scope is active, for code that isn't one call"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format millisecond durations as a Server-Timing header value"""
+    return ", ".join(f"{stage};dur={duration:.1f}" for stage, duration in timings.items())
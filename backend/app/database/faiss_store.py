@@ -0,0 +1,312 @@
+"""FAISS-backed knowledge collection with a memory-mapped on-disk index
+
+`FaissCollection` implements the part of Chroma's Collection API that
+VectorStore and the ingestion pipeline use (get, upsert, update, delete,
+count, query), so the rest of the retrieval path is engine-agnostic.
+
+Chunks, metadata and full-precision embeddings live in SQLite; vectors are
+searched in a FAISS flat, IVF or HNSW index. Writes are staged in SQLite and
+applied to the index by `flush()`, which rewrites the index file atomically
+under a file lock. Readers memory-map that file with IO_FLAG_MMAP_IFC, so
+every uvicorn worker shares one copy of the vectors (and HNSW graph) through
+the page cache and picks up a new file as soon as another worker flushes it.
+FAISS releases without that flag only map IVF inverted lists; flat and HNSW
+indexes are then copied into each worker's memory.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FAISS_INDEX_TYPES = ("flat", "ivf", "hnsw")
+
+# Maps every index type's vectors from the file; plain IO_FLAG_MMAP only maps IVF lists
+MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    label INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE NOT NULL,
+    document TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    indexed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_pending ON chunks (indexed);
+CREATE TABLE IF NOT EXISTS tombstones (label INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+def _unit(vectors) -> np.ndarray:
+    vectors = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32).reshape(-1, np.shape(vectors)[-1]))
+    faiss.normalize_L2(vectors)
+    return vectors
+
+class FaissCollection:
+    """Chroma-compatible collection over SQLite and a memory-mapped FAISS index.
+
+    Cosine similarity is an inner product over unit-normalized vectors.
+    Labels are never reused: a changed or deleted chunk leaves a tombstone
+    that flat and IVF indexes remove on flush and HNSW (which can't remove)
+    filters out until the next rebuild.
+    """
+
+    def __init__(self, directory: str, index_type: str = "flat", nlist: int = 1024, nprobe: int = 16,
+                 hnsw_m: int = 32, ef_search: int = 64):
+        if index_type not in FAISS_INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type: {index_type}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.index_path = self.directory / f"knowledge.{index_type}.faiss"
+        self.lock_path = self.directory / ".flush.lock"
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.directory / "knowledge.sqlite3", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self.index = None
+        self._index_mtime = None
+        self._tombstones = 0
+
+    # Chroma Collection API
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def get(self, ids: Optional[Sequence[str]] = None, include: Sequence[str] = ("documents", "metadatas"),
+            limit: Optional[int] = None, offset: Optional[int] = None) -> Dict[str, list]:
+        with self._lock:
+            if ids is not None:
+                if not ids:
+                    return self._result([], include)
+                rows = []
+                # Stay under SQLite's bound parameter limit
+                for start in range(0, len(ids), 500):
+                    batch = list(ids[start:start + 500])
+                    found = self._db.execute(
+                        f"SELECT id, document, metadata, embedding FROM chunks WHERE id IN ({','.join('?' * len(batch))})",
+                        batch
+                    ).fetchall()
+                    by_id = {row[0]: row for row in found}
+                    rows.extend(by_id[doc_id] for doc_id in batch if doc_id in by_id)
+            else:
+                rows = self._db.execute(
+                    "SELECT id, document, metadata, embedding FROM chunks ORDER BY label LIMIT ? OFFSET ?",
+                    (-1 if limit is None else limit, offset or 0)
+                ).fetchall()
+        return self._result(rows, include)
+
+    def upsert(self, ids: Sequence[str], embeddings, documents: Sequence[str], metadatas: Sequence[Dict[str, Any]]):
+        vectors = _unit(embeddings)
+        with self._lock, self._db:
+            self._tombstone(ids)
+            self._db.executemany(
+                "INSERT INTO chunks (id, document, metadata, embedding) VALUES (?, ?, ?, ?)",
+                [(doc_id, document, json.dumps(metadata or {}), vector.tobytes())
+                 for doc_id, document, metadata, vector in zip(ids, documents, metadatas, vectors)]
+            )
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]):
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE chunks SET metadata = ? WHERE id = ?",
+                [(json.dumps(metadata or {}), doc_id) for doc_id, metadata in zip(ids, metadatas)]
+            )
+
+    def delete(self, ids: Sequence[str]):
+        with self._lock, self._db:
+            self._tombstone(ids)
+
+    def query(self, query_embeddings, n_results: int = 10,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict[str, List[list]]:
+        """Nearest chunks per embedding by cosine similarity, shaped like a Chroma query result"""
+        vectors = _unit(query_embeddings)
+        with self._lock:
+            self._refresh()
+            index, tombstones = self.index, self._tombstones
+        if index is None or index.ntotal == 0:
+            return {key: [[] for _ in vectors] for key in ("ids", *include)}
+        # Over-fetch to make up for tombstoned labels the index still returns
+        scores, labels = index.search(vectors, min(index.ntotal, n_results + tombstones))
+        live = {}
+        with self._lock:
+            wanted = sorted({int(label) for label in labels.ravel() if label >= 0})
+            for start in range(0, len(wanted), 500):
+                batch = wanted[start:start + 500]
+                for row in self._db.execute(
+                    f"SELECT label, id, document, metadata, embedding FROM chunks WHERE label IN ({','.join('?' * len(batch))})",
+                    batch
+                ):
+                    live[row[0]] = row[1:]
+        results = {key: [] for key in ("ids", *include)}
+        for query_scores, query_labels in zip(scores, labels):
+            hits = [(float(score), live[int(label)]) for score, label in zip(query_scores, query_labels)
+                    if int(label) in live][:n_results]
+            page = self._result([row for _, row in hits], include)
+            for key in ("ids", *include):
+                results[key].append([1 - score for score, _ in hits] if key == "distances" else page[key])
+        return results
+
+    # Index maintenance
+
+    def flush(self):
+        """Apply staged writes to the on-disk index and memory-map the result"""
+        with self._lock, self._file_lock():
+            pending = self._db.execute("SELECT COUNT(*) FROM chunks WHERE indexed = 0").fetchone()[0]
+            tombstones = self._db.execute("SELECT COUNT(*) FROM tombstones").fetchone()[0]
+            if not pending and not tombstones and (self.index_path.exists() or not self.count()):
+                self._refresh()
+                return
+
+            index = faiss.read_index(str(self.index_path)) if self.index_path.exists() else None
+            live = self.count()
+            if index is None or self._needs_rebuild(index, live, tombstones):
+                index = self._build()
+            else:
+                rows = self._db.execute("SELECT label, embedding FROM chunks WHERE indexed = 0").fetchall()
+                if rows:
+                    labels = np.array([row[0] for row in rows], dtype=np.int64)
+                    index.add_with_ids(np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]), labels)
+                if tombstones and self.index_type != "hnsw":
+                    dead = np.array([row[0] for row in self._db.execute("SELECT label FROM tombstones")], dtype=np.int64)
+                    index.remove_ids(dead)
+                    self._db.execute("DELETE FROM tombstones")
+            self._db.execute("UPDATE chunks SET indexed = 1 WHERE indexed = 0")
+            self._db.commit()
+
+            temporary = self.index_path.with_suffix(".tmp")
+            faiss.write_index(index, str(temporary))
+            os.replace(temporary, self.index_path)
+            logger.info(f"💾 FAISS {self.index_type} index written: {index.ntotal} vectors")
+            self._refresh(force=True)
+
+    def _needs_rebuild(self, index, live: int, tombstones: int) -> bool:
+        if self.index_type == "hnsw":
+            # HNSW can't remove vectors; rebuild once a quarter of them are dead
+            return tombstones > max(64, live // 4)
+        if self.index_type == "ivf":
+            # Retrain as the corpus grows: on every doubling until it supports the full
+            # nlist centroids, then once it has grown well past the training set
+            trained = max(int(self._meta("trained_on") or 0), 1)
+            if self._nlist(trained) < self.nlist:
+                return live >= 2 * trained
+            return live > 4 * trained
+        return False
+
+    def _nlist(self, live: int) -> int:
+        # FAISS wants ~39 training points per centroid
+        return max(1, min(self.nlist, live // 39))
+
+    def _build(self):
+        """A fresh index over every stored chunk, trained for IVF"""
+        rows = self._db.execute("SELECT label, embedding FROM chunks ORDER BY label").fetchall()
+        vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        dim = vectors.shape[1] if vectors is not None else int(self._meta("dimensions") or 0)
+        if not dim:
+            raise RuntimeError("Cannot build a FAISS index before any embeddings are stored")
+        if self.index_type == "hnsw":
+            base = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif self.index_type == "ivf":
+            nlist = self._nlist(len(rows))
+            base = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            base.train(vectors if vectors is not None else np.zeros((1, dim), dtype=np.float32))
+            self._set_meta("trained_on", len(rows))
+        else:
+            base = faiss.IndexFlatIP(dim)
+        # IVF stores IDs in its inverted lists; an ID map over it would mis-map after removals
+        index = base if self.index_type == "ivf" else faiss.IndexIDMap2(base)
+        if rows:
+            index.add_with_ids(vectors, np.array([row[0] for row in rows], dtype=np.int64))
+        self._set_meta("dimensions", dim)
+        self._db.execute("DELETE FROM tombstones")
+        return index
+
+    def _refresh(self, force: bool = False):
+        """Memory-map the index file again if another worker (or a flush) replaced it"""
+        try:
+            mtime = self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if not force and mtime == self._index_mtime:
+            return
+        if MMAP_FLAG == faiss.IO_FLAG_MMAP and self.index_type != "ivf" and self._index_mtime is None:
+            logger.warning(f"⚠️ FAISS {faiss.__version__} can't memory-map {self.index_type} indexes; "
+                           f"each worker holds its own copy")
+        index = faiss.read_index(str(self.index_path), MMAP_FLAG | faiss.IO_FLAG_READ_ONLY)
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if hasattr(inner, "nprobe"):
+            inner.nprobe = self.nprobe
+        if hasattr(inner, "hnsw"):
+            inner.hnsw.efSearch = max(self.ef_search, 1)
+        self.index, self._index_mtime = index, mtime
+        self._tombstones = self._db.execute("SELECT COUNT(*) FROM tombstones").fetchone()[0]
+
+    def _tombstone(self, ids: Sequence[str]):
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            self._db.execute(
+                f"INSERT OR IGNORE INTO tombstones SELECT label FROM chunks WHERE indexed = 1 AND id IN ({placeholders})",
+                batch
+            )
+            self._tombstones += self._db.execute("SELECT changes()").fetchone()[0]
+            self._db.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize flushes across worker processes"""
+        with open(self.lock_path, "w") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Any):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @staticmethod
+    def _result(rows: Sequence[tuple], include: Sequence[str]) -> Dict[str, list]:
+        result = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(row[2]) for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = [np.frombuffer(row[3], dtype=np.float32) for row in rows]
+        return result
+
+    def memory_mapped_bytes(self) -> int:
+        return self.index_path.stat().st_size if self.index_path.exists() else 0
+
+    def stats(self) -> dict:
+        return {
+            "engine": "faiss",
+            "index_type": self.index_type,
+            "vectors": self.index.ntotal if self.index is not None else 0,
+            "chunks": self.count(),
+            "tombstones": self._tombstones,
+            "index_file_bytes": self.memory_mapped_bytes()
+        }
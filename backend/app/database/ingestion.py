@@ -0,0 +1,186 @@
+"""Incremental ingestion of knowledge documents into the vector store
+
+Documents stream in from a source iterator and are processed in groups, so a
+large corpus never has to fit in memory. Each document is split into chunks
+with stable IDs (`<document id>#<chunk index>`); the first chunk records a
+hash of the whole document, so unchanged documents are skipped without being
+re-chunked, and chunks whose content hash is already stored are not
+re-embedded. New or changed chunks are embedded and upserted in batches.
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+Chunk = Tuple[str, str, Dict[str, Any]]
+
+@dataclass(frozen=True)
+class SourceDocument:
+    id: str
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class IngestionReport:
+    documents: int = 0
+    unchanged_documents: int = 0
+    chunks_embedded: int = 0
+    chunks_skipped: int = 0
+    metadata_updates: int = 0
+    chunks_removed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+def chunk_id(document_id: str, index: int) -> str:
+    return f"{document_id}#{index}"
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def iter_records(records: Iterable[Dict[str, Any]]) -> Iterator[SourceDocument]:
+    """Documents from dicts with `id`, `content` and optional `metadata` (the sample_data format)"""
+    for record in records:
+        yield SourceDocument(id=record["id"], content=record["content"], metadata=record.get("metadata") or {})
+
+def iter_jsonl(path: Path) -> Iterator[SourceDocument]:
+    """Documents from a JSON Lines file of records, read one line at a time"""
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield from iter_records([json.loads(line)])
+
+def iter_text_files(directory: Path, patterns: Sequence[str] = ("*.md", "*.txt")) -> Iterator[SourceDocument]:
+    """One document per text file, identified by its path relative to `directory`"""
+    directory = Path(directory)
+    for pattern in patterns:
+        for path in sorted(directory.rglob(pattern)):
+            relative = path.relative_to(directory).as_posix()
+            yield SourceDocument(
+                id=relative,
+                content=path.read_text(encoding="utf-8"),
+                metadata={"source": "file", "path": relative}
+            )
+
+class KnowledgeIngestor:
+    """Upserts source documents into a VectorStore, embedding only what changed"""
+
+    def __init__(self, store, batch_size: int, chunk_size: int, chunk_overlap: int):
+        self.store = store
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len
+        )
+
+    def document_hash(self, document: SourceDocument) -> str:
+        # The chunking parameters are part of the hash: changing them re-chunks everything
+        return content_hash(
+            document.content,
+            json.dumps(document.metadata, sort_keys=True, default=str),
+            f"{self.chunk_size}/{self.chunk_overlap}"
+        )
+
+    async def ingest(self, documents: Iterable[SourceDocument]) -> IngestionReport:
+        report = IngestionReport()
+        start = time.perf_counter()
+        for group in batched(documents, self.batch_size):
+            await self._ingest_group(group, report)
+        report.seconds = round(time.perf_counter() - start, 3)
+        return report
+
+    async def _ingest_group(self, group: List[SourceDocument], report: IngestionReport):
+        collection = self.store.collection
+        report.documents += len(group)
+
+        heads = await self.store._run(collection.get, ids=[chunk_id(document.id, 0) for document in group],
+                                      include=["metadatas"])
+        previous = {metadata["source_id"]: metadata for metadata in heads["metadatas"] if metadata and "source_id" in metadata}
+
+        chunks: List[Chunk] = []
+        stale: List[str] = []
+        for document in group:
+            document_hash = self.document_hash(document)
+            head = previous.get(document.id, {})
+            if head.get("document_hash") == document_hash:
+                report.unchanged_documents += 1
+                continue
+            texts = self.splitter.split_text(document.content)
+            for index, text in enumerate(texts):
+                metadata = {**document.metadata, "source_id": document.id, "chunk_index": index,
+                            "content_hash": content_hash(text)}
+                if index == 0:
+                    metadata.update(document_hash=document_hash, chunk_count=len(texts))
+                chunks.append((chunk_id(document.id, index), text, metadata))
+            # A document that shrank leaves chunks past its new end
+            stale.extend(chunk_id(document.id, index) for index in range(len(texts), head.get("chunk_count", 0)))
+
+        if chunks:
+            await self._upsert(chunks, report)
+        if stale:
+            await self.store._run(collection.delete, ids=stale)
+            self.store.unindex_chunks(stale)
+            report.chunks_removed += len(stale)
+        if chunks or stale:
+            self.store.cache.invalidate()
+
+    async def _upsert(self, chunks: List[Chunk], report: IngestionReport):
+        collection = self.store.collection
+        existing = await self.store._run(collection.get, ids=[doc_id for doc_id, _, _ in chunks], include=["metadatas"])
+        stored = dict(zip(existing["ids"], existing["metadatas"]))
+
+        to_embed, to_update = [], []
+        for chunk in chunks:
+            doc_id, _, metadata = chunk
+            old = stored.get(doc_id)
+            if old is None or old.get("content_hash") != metadata["content_hash"]:
+                to_embed.append(chunk)
+            elif old != metadata:
+                to_update.append(chunk)
+            else:
+                report.chunks_skipped += 1
+
+        if to_update:
+            # Same text, so the stored embedding is still valid
+            await self.store._run(
+                collection.update,
+                ids=[doc_id for doc_id, _, _ in to_update],
+                metadatas=[metadata for _, _, metadata in to_update]
+            )
+            self.store.index_chunks(to_update)
+            report.metadata_updates += len(to_update)
+
+        for batch in batched(to_embed, self.batch_size):
+            ids = [doc_id for doc_id, _, _ in batch]
+            texts = [text for _, text, _ in batch]
+            embeddings = await self.store.aembed_documents(texts)
+            await self.store._run(
+                collection.upsert,
+                ids=ids,
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[metadata for _, _, metadata in batch]
+            )
+            self.store.index_chunks(batch, embeddings)
+            report.chunks_embedded += len(batch)
+            report.batches += 1
@@ -0,0 +1,108 @@
+"""In-memory BM25 index kept alongside the Chroma collection"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Collection, Dict, Iterable, List, Optional, Tuple
+
+# Words plus identifiers such as REAL_MUM_001, 80CCD(1B) and P/E
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[_/\-]?[a-z0-9]+)*(?:\([a-z0-9]+\))?")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "our", "should", "show", "that", "the", "their",
+    "this", "to", "under", "was", "we", "what", "which", "who", "with", "you",
+})
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms; compound identifiers are kept whole and also split into their parts"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of term -> {document: term frequency}.
+
+    Lookups only touch the postings of the query terms, so a search over the
+    knowledge base costs microseconds.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.documents: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._total_length = 0
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing any earlier version with the same ID"""
+        if doc_id in self.documents:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self.postings[term][doc_id] = frequency
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self._total_length += length
+        self.documents[doc_id] = (text, metadata or {})
+
+    def add_many(self, documents: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        for doc_id, text, metadata in documents:
+            self.add(doc_id, text, metadata)
+
+    def remove(self, doc_id: str):
+        if doc_id not in self.documents:
+            return
+        text, _ = self.documents.pop(doc_id)
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self._total_length -= self.lengths.pop(doc_id)
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """The `k` best matching document IDs with their BM25 scores, best first
+
+        `allowed` restricts scoring to those document IDs.
+        """
+        count = len(self.documents)
+        if not count:
+            return []
+        average_length = self._total_length / count
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def text(self, doc_id: str) -> str:
+        return self.documents[doc_id][0]
+
+    def metadata(self, doc_id: str) -> Dict[str, Any]:
+        return self.documents[doc_id][1]
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int, rrf_k: int = 60) -> List[str]:
+    """Merge ranked ID lists by summing 1 / (rrf_k + rank) per list; returns the top `k` IDs"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
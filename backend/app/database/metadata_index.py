@@ -0,0 +1,85 @@
+"""In-memory inverted index from chunk metadata values to chunk IDs"""
+
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Sequence, Set, Tuple, Union
+
+# {"category": "tax_planning"} or {"category": ["tax_planning", "risk_assessment"], "type": ...}
+MetadataFilter = Mapping[str, Union[Any, Sequence[Any]]]
+
+def _values(value) -> Tuple:
+    return tuple(value) if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+
+def filter_key(where: Optional[MetadataFilter]) -> Hashable:
+    """Order-independent key for a filter, for caching"""
+    if not where:
+        return ()
+    return tuple(sorted((field, tuple(sorted(map(str, _values(value))))) for field, value in where.items()))
+
+class MetadataIndex:
+    """Postings of (field, value) -> chunk IDs for the configured metadata fields.
+
+    A filter matches chunks that, for every field it names, have one of the
+    listed values; the result narrows vector and lexical scoring to those
+    chunks before any scores are computed.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self.postings: Dict[Tuple[str, Any], Set[str]] = defaultdict(set)
+        self._entries: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
+
+    def add(self, doc_id: str, metadata: Optional[Dict[str, Any]]):
+        """Index a chunk, replacing any earlier metadata for the same ID"""
+        self.remove(doc_id)
+        entries = tuple(
+            (field, metadata[field]) for field in self.fields
+            if metadata and metadata.get(field) is not None
+        )
+        for entry in entries:
+            self.postings[entry].add(doc_id)
+        self._entries[doc_id] = entries
+
+    def add_many(self, chunks: Iterable[Tuple[str, Any, Optional[Dict[str, Any]]]]):
+        """Index (id, text, metadata) chunks"""
+        for doc_id, _, metadata in chunks:
+            self.add(doc_id, metadata)
+
+    def remove(self, doc_id: str):
+        for entry in self._entries.pop(doc_id, ()):
+            postings = self.postings.get(entry)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self.postings[entry]
+
+    def match(self, where: MetadataFilter) -> Set[str]:
+        """IDs of the chunks matching every field of `where`"""
+        matched = None
+        # Intersect the smallest unions first so the working set stays small
+        unions = []
+        for field, value in where.items():
+            if field not in self.fields:
+                raise ValueError(f"Metadata field '{field}' is not indexed (METADATA_INDEX_FIELDS)")
+            union = set()
+            for item in _values(value):
+                union |= self.postings.get((field, item), set())
+            unions.append(union)
+        for union in sorted(unions, key=len):
+            matched = union if matched is None else matched & union
+            if not matched:
+                break
+        return matched or set()
+
+    def values(self, field: str) -> Dict[Any, int]:
+        """Chunk count per value of a field"""
+        return {value: len(ids) for (name, value), ids in self.postings.items() if name == field}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "chunks": len(self._entries),
+            "fields": {field: len(self.values(field)) for field in self.fields},
+            "postings": len(self.postings)
+        }
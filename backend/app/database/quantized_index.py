@@ -0,0 +1,202 @@
+"""Compressed in-memory vector index for knowledge base candidate search"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+import numpy as np
+
+QUANTIZED_DTYPES = ("int8", "float16")
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class QuantizedVectorIndex:
+    """Brute-force cosine search over unit-normalized embeddings stored as int8 or float16.
+
+    Each vector also keeps a float32 scale (max |component| / 127 for int8),
+    so a 384-dimension embedding takes 388 bytes as int8 or 772 as float16
+    instead of 1,536. Scores are approximate; callers re-score the top candidates against
+    the full-precision embeddings.
+    """
+
+    def __init__(self, dtype: str = "int8", block_rows: int = 8192):
+        if dtype not in QUANTIZED_DTYPES:
+            raise ValueError(f"Unsupported vector index dtype: {dtype}")
+        self.dtype = dtype
+        self.block_rows = block_rows
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.codes = None
+        self.scales = np.zeros(0, dtype=np.float32)
+        # Searches run on executor threads while ingestion adds and removes on the event loop
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = normalize_rows(vectors)
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _reserve(self, rows: int, dim: int):
+        """Grow the code and scale arrays geometrically so appends stay amortized O(1)"""
+        if self.codes is None:
+            self.codes = np.zeros((max(rows, 16), dim), dtype=self.dtype)
+            self.scales = np.zeros(max(rows, 16), dtype=np.float32)
+            return
+        if rows <= len(self.codes):
+            return
+        capacity = max(rows, 2 * len(self.codes))
+        codes = np.zeros((capacity, self.codes.shape[1]), dtype=self.dtype)
+        codes[:len(self.ids)] = self.codes[:len(self.ids)]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:len(self.ids)] = self.scales[:len(self.ids)]
+        self.codes, self.scales = codes, scales
+
+    def add(self, ids: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Insert or replace vectors by ID"""
+        if not ids:
+            return
+        codes, scales = self._quantize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            new = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self.positions]
+            self._reserve(len(self.ids) + len(new), codes.shape[1])
+            for doc_id in new:
+                self.positions[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+            rows = [self.positions[doc_id] for doc_id in ids]
+            self.codes[rows] = codes
+            self.scales[rows] = scales
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            self._remove(ids)
+
+    def _remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            row = self.positions.pop(doc_id, None)
+            if row is None:
+                continue
+            # Move the last vector into the hole
+            last = len(self.ids) - 1
+            if row != last:
+                moved = self.ids[last]
+                self.ids[row] = moved
+                self.positions[moved] = row
+                self.codes[row] = self.codes[last]
+                self.scales[row] = self.scales[last]
+            self.ids.pop()
+
+    def search(self, query: Sequence[float], k: int) -> List[Tuple[str, float]]:
+        """The `k` most cosine-similar IDs with their approximate scores, best first"""
+        vector = normalize_rows(query)
+        with self._lock:
+            return self._search(vector, k)
+
+    def _search(self, vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        count = len(self.ids)
+        if not count or k <= 0:
+            return []
+        scores = np.empty(count, dtype=np.float32)
+        # Dequantize a block at a time to bound the temporary float32 copy
+        for start in range(0, count, self.block_rows):
+            end = min(start + self.block_rows, count)
+            scores[start:end] = (self.codes[start:end].astype(np.float32) @ vector) * self.scales[start:end]
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top]
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the live vectors and their scales"""
+        if self.codes is None:
+            return 0
+        per_vector = self.codes.shape[1] * self.codes.itemsize + self.scales.itemsize
+        return len(self.ids) * per_vector
+
+    def stats(self) -> dict:
+        dim = 0 if self.codes is None else self.codes.shape[1]
+        float32_bytes = len(self.ids) * dim * 4
+        return {
+            "dtype": self.dtype,
+            "vectors": len(self.ids),
+            "dimensions": dim,
+            "memory_bytes": self.memory_bytes(),
+            "float32_bytes": float32_bytes,
+            "compression": round(float32_bytes / self.memory_bytes(), 2) if self.memory_bytes() else 0.0
+        }
+
+class FullPrecisionStore:
+    """Unit-normalized float32 embeddings in SQLite, for re-scoring quantized candidates.
+
+    Only each query's candidates are read back, so the full-precision copy
+    stays on disk. Serving them from Chroma instead would load its HNSW
+    index, which holds every vector at float32 in memory.
+    """
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, embedding BLOB NOT NULL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def add(self, ids: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Insert or replace vectors by ID"""
+        if not len(ids):
+            return
+        vectors = normalize_rows(embeddings)
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (id, embedding) VALUES (?, ?)",
+                [(doc_id, vector.tobytes()) for doc_id, vector in zip(ids, vectors)]
+            )
+
+    def remove(self, ids: Iterable[str]):
+        ids = list(ids)
+        with self._lock, self._db:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                self._db.execute(f"DELETE FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch)
+
+    def get(self, ids: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """The stored IDs among `ids` and their vectors, one row per ID"""
+        rows = []
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = list(ids[start:start + 500])
+                rows += self._db.execute(
+                    f"SELECT id, embedding FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        return [row[0] for row in rows], np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT id FROM vectors")}
+
+    def pages(self, page_size: int = 10000) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """Every stored (IDs, vectors), `page_size` rows at a time"""
+        after = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT rowid, id, embedding FROM vectors WHERE rowid > ? ORDER BY rowid LIMIT ?", (after, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            after = rows[-1][0]
+            yield [row[1] for row in rows], np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
@@ -0,0 +1,74 @@
+"""Cache of question embeddings and knowledge base retrieval results"""
+
+import sys
+from typing import Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.lru import LRUCache
+from app.core.text import normalize_question
+from app.database.metadata_index import MetadataFilter, filter_key
+
+class RetrievalCache:
+    """Bounded LRU caches for question embeddings and top-k retrieval results.
+
+    Both are keyed by the normalized question. An embedding depends only on
+    the text, so it stays valid until evicted; retrieval results also depend
+    on the collection, so their keys carry a collection version and
+    `invalidate()` drops them whenever documents are added.
+    """
+
+    def __init__(self, max_embeddings: int, max_results: int, enabled: bool = True):
+        self.enabled = enabled
+        self.embeddings = LRUCache(max_embeddings)
+        self.results = LRUCache(max_results)
+        self.version = 0
+
+    def get_embedding(self, text: str) -> Optional[List[float]]:
+        if not self.enabled:
+            return None
+        vector = self.embeddings.get(normalize_question(text))
+        return None if vector is None else vector.tolist()
+
+    def store_embedding(self, text: str, embedding: Sequence[float]):
+        if self.enabled:
+            # float32 holds a 384-dimension embedding in 1.5 KB instead of ~12 KB of Python floats
+            self.embeddings.set(normalize_question(text), np.asarray(embedding, dtype=np.float32))
+
+    def result_key(self, query: str, k: int, mode: str, where: Optional[MetadataFilter] = None) -> Hashable:
+        """Key for the top-`k` results of `query` under `where` against the current collection"""
+        return (normalize_question(query), k, mode, filter_key(where), self.version)
+
+    def get_results(self, key: Hashable) -> Optional[List[str]]:
+        if not self.enabled:
+            return None
+        chunks = self.results.get(key)
+        return None if chunks is None else list(chunks)
+
+    def store_results(self, key: Hashable, chunks: Sequence[str]):
+        # Results of a search that raced a collection change carry the old version and are never read
+        if self.enabled and key[-1] == self.version:
+            self.results.set(key, tuple(chunks))
+
+    def invalidate(self):
+        """Drop retrieval results after the collection changed"""
+        self.version += 1
+        self.results.clear()
+
+    def memory_bytes(self) -> dict:
+        """Approximate memory held by each cache"""
+        embedding_bytes = sum(sys.getsizeof(key) + vector.nbytes for key, vector in self.embeddings.items())
+        result_bytes = sum(
+            sys.getsizeof(key[0]) + sum(sys.getsizeof(chunk) for chunk in chunks)
+            for key, chunks in self.results.items()
+        )
+        return {"embeddings": embedding_bytes, "results": result_bytes}
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "collection_version": self.version,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+            "memory_bytes": self.memory_bytes()
+        }
@@ -2,80 +2,329 @@ import chromadb
 from chromadb.config import Settings as ChromaSettings
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+from langchain.schema import BaseRetriever, Document
 from app.config import settings
+from app.core.micro_batch import MicroBatcher
+from app.database.faiss_store import FaissCollection
+from app.database.ingestion import IngestionReport, KnowledgeIngestor, SourceDocument, iter_records
+from app.database.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.database.metadata_index import MetadataFilter, MetadataIndex
+from app.database.quantized_index import QUANTIZED_DTYPES, FullPrecisionStore, QuantizedVectorIndex, normalize_rows
+from app.database.retrieval_cache import RetrievalCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import asyncio
 import logging
+import numpy as np
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
 class VectorStore:
-    def __init__(self):
+    def __init__(self, in_memory_indexes: bool = True):
+        # Off for one-off ingestion, which never searches and shouldn't hold the corpus in memory
+        self.in_memory_indexes = in_memory_indexes
         self.chroma_client = None
         self.collection = None
         self.embeddings = None
         self.vectorstore = None
-        
-    async def initialize(self):
-        """Initialize ChromaDB vector store"""
+        # Exact terms (symbols, tax sections) the embeddings blur, kept in step with the collection
+        self.lexical_index = BM25Index()
+        # Metadata value -> chunk IDs, to narrow retrieval to categories before scoring
+        self.metadata_index = MetadataIndex(settings.METADATA_INDEX_FIELDS)
+        # Compressed copy of the embeddings for candidate search (VECTOR_INDEX=int8/float16)
+        self.vector_index = None
+        # Full-precision embeddings the compressed candidates are re-scored against (Chroma only;
+        # FAISS keeps them with the chunks in SQLite)
+        self.full_vectors = None
+        # Version file token the in-memory indexes were built from
+        self.knowledge_version = None
+        self._version_checked_at = 0.0
+        self._reload_task = None
+        # Repeated questions skip the model and the collection query
+        self.cache = RetrievalCache(
+            max_embeddings=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            max_results=settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+            enabled=settings.RETRIEVAL_CACHE_ENABLED
+        )
+        # Embedding and search are CPU-bound; a small dedicated pool keeps them off
+        # the event loop without competing with the default executor
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.VECTOR_STORE_WORKERS,
+            thread_name_prefix="vector-store"
+        )
+        # Questions embedded within a few milliseconds of each other share one forward pass
+        self.query_batcher = MicroBatcher(
+            self._embed_batch,
+            window=settings.EMBEDDING_BATCH_WINDOW_MS / 1000,
+            max_batch=settings.EMBEDDING_BATCH_MAX_SIZE
+        )
+        # "stopped" -> "warming" -> "ready", or "failed"
+        self.state = "stopped"
+        self.error = None
+        # Set once initialization finishes, successfully or not
+        self._settled = asyncio.Event()
+        self._warm_up_task = None
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+    
+    def start(self):
+        """Initialize in the background so the API can serve requests that don't need the knowledge base"""
+        if self._warm_up_task is None:
+            self.state = "warming"
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+    
+    async def _warm_up(self):
         try:
-            # Initialize embeddings
-            self.embeddings = SentenceTransformerEmbeddings(
-                model_name=settings.EMBEDDING_MODEL
+            await self.initialize()
+        except Exception:
+            # Logged by initialize; queries answer without knowledge context
+            pass
+    
+    async def wait_ready(self):
+        """Wait until the store is ready; raises if initialization failed"""
+        await self._settled.wait()
+        if self.state == "failed":
+            raise RuntimeError(f"Vector store failed to initialize: {self.error}")
+    
+    @property
+    def database(self) -> str:
+        return "faiss" if settings.VECTOR_ENGINE == "faiss" else "chromadb"
+    
+    def _open(self):
+        """Load the embedding model, open the collection and index its chunks (blocking)"""
+        embeddings = SentenceTransformerEmbeddings(
+            model_name=settings.EMBEDDING_MODEL
+        )
+        
+        chroma_client, vectorstore, full_vectors = None, None, None
+        if settings.VECTOR_ENGINE == "faiss":
+            # Same collection API over SQLite and a memory-mapped FAISS index
+            collection = FaissCollection(
+                settings.FAISS_INDEX_DIRECTORY,
+                index_type=settings.FAISS_INDEX_TYPE,
+                nlist=settings.FAISS_NLIST,
+                nprobe=settings.FAISS_NPROBE,
+                hnsw_m=settings.FAISS_HNSW_M,
+                ef_search=settings.FAISS_EF_SEARCH
             )
-            
+            collection.flush()
+        else:
             # Create persist directory if it doesn't exist
             os.makedirs(settings.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
             
             # Initialize ChromaDB
-            self.chroma_client = chromadb.PersistentClient(
+            chroma_client = chromadb.PersistentClient(
                 path=settings.CHROMA_PERSIST_DIRECTORY
             )
             
             # Create or get collection
-            self.collection = self.chroma_client.get_or_create_collection(
+            collection = chroma_client.get_or_create_collection(
                 name="wealth_portfolio_knowledge",
                 metadata={"hnsw:space": "cosine"}
             )
             
             # Initialize Langchain Chroma wrapper
-            self.vectorstore = Chroma(
-                client=self.chroma_client,
+            vectorstore = Chroma(
+                client=chroma_client,
                 collection_name="wealth_portfolio_knowledge",
-                embedding_function=self.embeddings,
+                embedding_function=embeddings,
                 persist_directory=settings.CHROMA_PERSIST_DIRECTORY
             )
             
-            logger.info("✅ Vector store initialized")
+            if settings.VECTOR_INDEX in QUANTIZED_DTYPES:
+                full_vectors = FullPrecisionStore(os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "full_precision.sqlite3"))
+        
+        return embeddings, chroma_client, collection, vectorstore, full_vectors
+    
+    @property
+    def _version_path(self) -> str:
+        directory = settings.FAISS_INDEX_DIRECTORY if settings.VECTOR_ENGINE == "faiss" else settings.CHROMA_PERSIST_DIRECTORY
+        return os.path.join(directory, "knowledge_version")
+    
+    def _stored_version(self) -> Optional[str]:
+        """Token written by the last ingestion that changed the collection, in any process"""
+        try:
+            with open(self._version_path) as handle:
+                return handle.read().strip()
+        except FileNotFoundError:
+            return None
+    
+    def _publish_version(self) -> str:
+        """Record a collection change for other processes serving the same store (blocking)"""
+        version = f"{time.time_ns()}-{os.getpid()}"
+        temporary = f"{self._version_path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as handle:
+            handle.write(version)
+        os.replace(temporary, self._version_path)
+        return version
+    
+    def _build_indexes(self, collection):
+        """Index the stored chunks in memory, returning the collection version they reflect (blocking)"""
+        # Read before the chunks, so a change made during the scan triggers another reload
+        version = self._stored_version()
+        lexical_index = BM25Index()
+        metadata_index = MetadataIndex(settings.METADATA_INDEX_FIELDS)
+        vector_index = None
+        include = ["metadatas"]
+        if self.in_memory_indexes:
+            include.append("documents")
+            if settings.VECTOR_INDEX in QUANTIZED_DTYPES:
+                vector_index = QuantizedVectorIndex(settings.VECTOR_INDEX)
+                if self.full_vectors is None:
+                    include.append("embeddings")
+        live = set() if self.full_vectors is not None else None
+        
+        # Paged, so the stored chunks and their float32 embeddings are never all read at once
+        page_size = 10000
+        scanned = self.in_memory_indexes or live is not None
+        for offset in range(0, collection.count() if scanned else 0, page_size):
+            page = collection.get(include=include, limit=page_size, offset=offset)
+            if live is not None:
+                live.update(page["ids"])
+            if self.in_memory_indexes:
+                chunks = list(zip(page["ids"], page["documents"], page["metadatas"]))
+                lexical_index.add_many(chunks)
+                metadata_index.add_many(chunks)
+            if vector_index is not None and self.full_vectors is None:
+                vector_index.add(page["ids"], page["embeddings"])
+        
+        if live is not None:
+            self._sync_full_vectors(collection, live)
+            if vector_index is not None:
+                for ids, vectors in self.full_vectors.pages(page_size):
+                    vector_index.add(ids, vectors)
+        
+        return version, lexical_index, metadata_index, vector_index
+    
+    def _sync_full_vectors(self, collection, live: Set[str]):
+        """Match the full-precision store to the collection's chunk IDs (blocking)"""
+        stored = self.full_vectors.ids()
+        self.full_vectors.remove(stored - live)
+        missing = [doc_id for doc_id in live if doc_id not in stored]
+        if missing:
+            # Chunks ingested before VECTOR_INDEX was set; reading their embeddings loads
+            # Chroma's vector index this once
+            logger.info(f"🔄 Copying {len(missing)} embeddings out of Chroma for the quantized index")
+            for start in range(0, len(missing), 500):
+                page = collection.get(ids=missing[start:start + 500], include=["embeddings"])
+                self.full_vectors.add(page["ids"], page["embeddings"])
+    
+    def _legacy_chunks(self) -> List[str]:
+        """IDs of chunks without a source_id, stored before incremental ingestion (blocking)"""
+        legacy = []
+        page_size = 10000
+        for offset in range(0, self.collection.count(), page_size):
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            legacy += [doc_id for doc_id, metadata in zip(page["ids"], page["metadatas"])
+                       if not (metadata or {}).get("source_id")]
+        return legacy
+    
+    async def remove_legacy_chunks(self) -> int:
+        """Delete chunks stored before incremental ingestion, whose random IDs re-ingestion would duplicate
+        
+        A one-off migration run from ingest_knowledge.py --remove-legacy: it also
+        deletes anything written to the collection without a source_id.
+        """
+        if self.collection is None:
+            raise RuntimeError("Vector store not initialized")
+        legacy = await self._run(self._legacy_chunks)
+        if legacy:
+            for start in range(0, len(legacy), 500):
+                await self._run(self.collection.delete, ids=legacy[start:start + 500])
+            self.unindex_chunks(legacy)
+            if isinstance(self.collection, FaissCollection):
+                await self._run(self.collection.flush)
+            self.cache.invalidate()
+            self.knowledge_version = await self._run(self._publish_version)
+        return len(legacy)
+    
+    async def _load_indexes(self):
+        (self.knowledge_version, self.lexical_index,
+         self.metadata_index, self.vector_index) = await self._run(self._build_indexes, self.collection)
+        self.cache.invalidate()
+    
+    def _check_version(self):
+        """Reload the in-memory indexes in the background if another process changed the collection
+        
+        Ingestion by another process (ingest_knowledge.py) only shows up in the
+        version file, checked at most every KNOWLEDGE_VERSION_CHECK_SECONDS.
+        """
+        now = time.monotonic()
+        if self._reload_task is not None or now - self._version_checked_at < settings.KNOWLEDGE_VERSION_CHECK_SECONDS:
+            return
+        self._version_checked_at = now
+        if self._stored_version() != self.knowledge_version:
+            self._reload_task = asyncio.create_task(self._reload())
+    
+    async def _reload(self):
+        try:
+            if isinstance(self.collection, FaissCollection):
+                # Maps the index file the other process rewrote
+                await self._run(self.collection.flush)
+            await self._load_indexes()
+            logger.info(f"🔄 Knowledge base changed by another process, reindexed {len(self.lexical_index)} chunks")
+        except Exception as e:
+            logger.error(f"❌ Failed to reload the knowledge base indexes: {e}")
+        finally:
+            self._reload_task = None
+    
+    async def initialize(self):
+        """Initialize ChromaDB vector store"""
+        self.state = "warming"
+        self._settled.clear()
+        started = time.perf_counter()
+        try:
+            # Model loading and Chroma I/O run on the executor, keeping the event loop free
+            (self.embeddings, self.chroma_client, self.collection,
+             self.vectorstore, self.full_vectors) = await self._run(self._open)
+            await self._load_indexes()
+            
+            # Only new or changed domain knowledge is embedded
+            await self.add_domain_knowledge()
             
-            # Add domain knowledge if collection is empty
-            if self.collection.count() == 0:
-                await self.add_domain_knowledge()
+            self.state = "ready"
+            self._settled.set()
+            logger.info(
+                f"✅ Vector store initialized ({len(self.lexical_index)} chunks indexed) "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
                 
         except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            self._settled.set()
             logger.error(f"❌ Failed to initialize vector store: {e}")
             raise
     
     async def health_check(self):
         """Check vector store health"""
+        if self.state == "warming":
+            return {"status": "warming", "database": self.database}
+        if self.state == "failed":
+            return {"status": "unhealthy", "database": self.database, "error": self.error}
         try:
             if self.collection:
                 count = self.collection.count()
                 return {
                     "status": "healthy", 
-                    "database": "chromadb",
+                    "database": self.database,
                     "documents": count
                 }
-            return {"status": "disconnected", "database": "chromadb"}
+            return {"status": "disconnected", "database": self.database}
         except Exception as e:
-            return {"status": "unhealthy", "database": "chromadb", "error": str(e)}
+            return {"status": "unhealthy", "database": self.database, "error": str(e)}
     
     async def add_domain_knowledge(self):
         """Add wealth management domain knowledge to vector store"""
         
         domain_knowledge = [
             {
+                "id": "builtin_overview",
                 "content": """
                 Wealth Portfolio Management for High Net Worth Individuals:
                 
@@ -93,6 +342,7 @@ class VectorStore:
                 "metadata": {"type": "service_overview", "category": "wealth_management"}
             },
             {
+                "id": "builtin_risk_profiles",
                 "content": """
                 Client Risk Profiles:
                 
@@ -108,6 +358,7 @@ class VectorStore:
                 "metadata": {"type": "risk_management", "category": "client_profiling"}
             },
             {
+                "id": "builtin_asset_classes",
                 "content": """
                 Investment Categories and Asset Classes:
                 
@@ -124,6 +375,7 @@ class VectorStore:
                 "metadata": {"type": "investment_products", "category": "asset_classes"}
             },
             {
+                "id": "builtin_performance_metrics",
                 "content": """
                 Key Performance Metrics for Portfolio Analysis:
                 
@@ -143,6 +395,7 @@ class VectorStore:
                 "metadata": {"type": "analytics", "category": "performance_metrics"}
             },
             {
+                "id": "builtin_query_patterns",
                 "content": """
                 Common Query Types and Business Intelligence:
                 
@@ -157,6 +410,7 @@ class VectorStore:
                 "metadata": {"type": "business_intelligence", "category": "query_patterns"}
             },
             {
+                "id": "builtin_data_structure",
                 "content": """
                 Database Schema and Data Structure:
                 
@@ -179,40 +433,314 @@ class VectorStore:
         ]
         
         try:
-            # Convert to LangChain documents
-            documents = []
-            for knowledge in domain_knowledge:
-                doc = Document(
-                    page_content=knowledge["content"],
-                    metadata=knowledge["metadata"]
-                )
-                documents.append(doc)
-            
-            # Split documents into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len
+            report = await self.ingest(iter_records(domain_knowledge))
+            logger.info(
+                f"✅ Domain knowledge up to date: {report.chunks_embedded} chunks embedded, "
+                f"{report.unchanged_documents}/{report.documents} documents unchanged"
             )
             
-            split_docs = text_splitter.split_documents(documents)
-            
-            # Add to vector store
-            self.vectorstore.add_documents(split_docs)
-            
-            logger.info(f"✅ Added {len(split_docs)} knowledge chunks to vector store")
-            
         except Exception as e:
             logger.error(f"❌ Failed to add domain knowledge: {e}")
     
-    def similarity_search(self, query: str, k: int = 5):
-        """Search for similar documents"""
-        if self.vectorstore:
-            return self.vectorstore.similarity_search(query, k=k)
-        return []
+    async def ingest(self, documents: Iterable[SourceDocument], batch_size: Optional[int] = None) -> IngestionReport:
+        """Chunk, deduplicate and upsert documents, embedding only new or changed chunks"""
+        if self.collection is None or self.embeddings is None:
+            raise RuntimeError("Vector store not initialized")
+        ingestor = KnowledgeIngestor(
+            self,
+            batch_size=batch_size or settings.INGESTION_BATCH_SIZE,
+            chunk_size=settings.INGESTION_CHUNK_SIZE,
+            chunk_overlap=settings.INGESTION_CHUNK_OVERLAP
+        )
+        report = await ingestor.ingest(documents)
+        if isinstance(self.collection, FaissCollection):
+            # Staged writes become searchable once the index file is rewritten
+            await self._run(self.collection.flush)
+            self.cache.invalidate()
+        if report.chunks_embedded or report.metadata_updates or report.chunks_removed:
+            # This process's indexes are already current; other processes reload theirs
+            self.knowledge_version = await self._run(self._publish_version)
+        return report
+    
+    def index_chunks(self, chunks: Sequence[Tuple[str, str, Dict[str, Any]]], embeddings=None):
+        """Add upserted (id, text, metadata) chunks to the in-memory indexes"""
+        if self.full_vectors is not None and embeddings is not None:
+            self.full_vectors.add([doc_id for doc_id, _, _ in chunks], embeddings)
+        if not self.in_memory_indexes:
+            return
+        self.lexical_index.add_many(chunks)
+        self.metadata_index.add_many(chunks)
+        if self.vector_index is not None and embeddings is not None:
+            self.vector_index.add([doc_id for doc_id, _, _ in chunks], embeddings)
+    
+    def unindex_chunks(self, ids: Sequence[str]):
+        """Drop deleted chunks from the in-memory indexes"""
+        if self.full_vectors is not None:
+            self.full_vectors.remove(ids)
+        if not self.in_memory_indexes:
+            return
+        for doc_id in ids:
+            self.lexical_index.remove(doc_id)
+            self.metadata_index.remove(doc_id)
+        if self.vector_index is not None:
+            self.vector_index.remove(ids)
+    
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking call on the vector store executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+    
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # Identical questions in one batch are embedded once
+        unique = list(dict.fromkeys(texts))
+        vectors = dict(zip(unique, await self._run(self.embeddings.embed_documents, unique)))
+        return [vectors[text] for text in texts]
+    
+    async def aembed_query(self, text: str):
+        """Embed a query off the event loop, or return None if embeddings aren't loaded
+        
+        Cached embeddings are reused; concurrent misses are batched into one
+        model forward pass.
+        """
+        if self.embeddings is None:
+            return None
+        embedding = self.cache.get_embedding(text)
+        if embedding is None:
+            embedding = await self.query_batcher.submit(text)
+            self.cache.store_embedding(text, embedding)
+        return embedding
+    
+    async def aembed_queries(self, texts: List[str]):
+        """Embed several questions, reusing cached embeddings and embedding the rest in one model call
+        
+        Returns None if embeddings aren't loaded.
+        """
+        if self.embeddings is None:
+            return None
+        embeddings = [self.cache.get_embedding(text) for text in texts]
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = await self._embed_batch([texts[index] for index in missing])
+            for index, embedding in zip(missing, computed):
+                embeddings[index] = embedding
+                self.cache.store_embedding(texts[index], embedding)
+        return embeddings
+    
+    async def aembed_documents(self, texts: List[str]):
+        """Embed several texts in one model call, or return None if embeddings aren't loaded"""
+        if self.embeddings is None:
+            return None
+        return await self._run(self.embeddings.embed_documents, texts)
+    
+    def _hybrid(self, queries: Optional[Sequence[str]]) -> bool:
+        return settings.RETRIEVAL_MODE == "hybrid" and queries is not None and len(self.lexical_index) > 0
+    
+    def _candidates(self, k: int, hybrid: bool, allowed: Optional[Set[str]] = None) -> int:
+        """Dense results to fetch: a deeper pool when they are fused with lexical results"""
+        if not hybrid:
+            return k
+        available = len(allowed) if allowed is not None else len(self.lexical_index)
+        return max(1, min(max(k, settings.RETRIEVAL_CANDIDATES), available))
+    
+    def _allowed(self, where: Optional[MetadataFilter]) -> Optional[Set[str]]:
+        """Chunk IDs matching a metadata filter, or None to search everything"""
+        if not where:
+            return None
+        allowed = self.metadata_index.match(where)
+        if not allowed:
+            # Better unfiltered context than none when the knowledge base has no such chunks
+            logger.debug(f"No knowledge chunks match {dict(where)}, searching all chunks")
+            return None
+        return allowed
+    
+    def _rank(self, query: Optional[str], ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+              k: int, hybrid: bool, allowed: Optional[Set[str]] = None) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Top `k` (id, text, metadata), fusing the dense ranking with BM25 when hybrid"""
+        found = {doc_id: (text, metadata or {}) for doc_id, text, metadata in zip(ids, documents, metadatas)}
+        if not hybrid:
+            ranked = ids[:k]
+        else:
+            lexical_ids = [
+                doc_id for doc_id, _ in self.lexical_index.search(query, settings.RETRIEVAL_CANDIDATES, allowed=allowed)
+            ]
+            ranked = reciprocal_rank_fusion([ids, lexical_ids], k, settings.RRF_K)
+        return [(doc_id, *(found.get(doc_id) or self.lexical_index.documents[doc_id])) for doc_id in ranked]
+    
+    async def asearch_by_vectors(self, embeddings: List[List[float]], k: int = 5,
+                                 queries: Optional[Sequence[str]] = None,
+                                 where: Optional[MetadataFilter] = None) -> List[List[str]]:
+        """Nearest chunks for each query embedding, most relevant first, in one collection query
+        
+        With the query texts, results are cached per question and, when
+        RETRIEVAL_MODE=hybrid, each dense ranking is fused with a BM25 ranking
+        by reciprocal rank fusion. `where` restricts the search to chunks whose
+        metadata matches, e.g. {"category": ["tax_planning"]}.
+        """
+        if self.collection is None:
+            raise RuntimeError("Vector store not initialized")
+        self._check_version()
+        if queries is None:
+            return await self._search(embeddings, k, None, where)
+        
+        keys = [self.cache.result_key(query, k, settings.RETRIEVAL_MODE, where) for query in queries]
+        results = [self.cache.get_results(key) for key in keys]
+        missing = [index for index, chunks in enumerate(results) if chunks is None]
+        if missing:
+            found = await self._search(
+                [embeddings[index] for index in missing], k, [queries[index] for index in missing], where
+            )
+            for index, chunks in zip(missing, found):
+                results[index] = chunks
+                self.cache.store_results(keys[index], chunks)
+        return results
     
-    def as_retriever(self, k: int = 5):
+    async def _search(self, embeddings: List[List[float]], k: int, queries: Optional[Sequence[str]],
+                      where: Optional[MetadataFilter] = None) -> List[List[str]]:
+        hybrid = self._hybrid(queries)
+        allowed = self._allowed(where)
+        results = await self._run(self._query, embeddings, self._candidates(k, hybrid, allowed), allowed)
+        return [
+            [text for _, text, _ in self._rank(
+                queries[index] if hybrid else None, ids, documents, metadatas, k, hybrid, allowed
+            )]
+            for index, (ids, documents, metadatas) in enumerate(
+                zip(results["ids"], results["documents"], results["metadatas"])
+            )
+        ]
+    
+    def _query(self, embeddings: List[List[float]], n_results: int,
+               allowed: Optional[Set[str]] = None) -> Dict[str, List[list]]:
+        """Dense nearest neighbours per embedding, shaped like a Chroma query result (blocking)
+        
+        With `allowed`, only those chunks are ranked: a small set is scored
+        exactly, a large one is searched deeper and filtered.
+        """
+        if allowed is not None:
+            if len(allowed) <= settings.FILTERED_SEARCH_MAX_CANDIDATES:
+                return self._rescore(embeddings, [list(allowed)] * len(embeddings), n_results)
+            results = self._query(embeddings, n_results * settings.FILTERED_SEARCH_OVERFETCH)
+            for position, ids in enumerate(results["ids"]):
+                keep = [index for index, doc_id in enumerate(ids) if doc_id in allowed][:n_results]
+                for field in ("ids", "documents", "metadatas"):
+                    results[field][position] = [results[field][position][index] for index in keep]
+            return results
+        if self.vector_index is None:
+            return self.collection.query(
+                query_embeddings=embeddings,
+                n_results=n_results,
+                include=["documents", "metadatas"]
+            )
+        return self._quantized_query(embeddings, n_results)
+    
+    def _quantized_query(self, embeddings: List[List[float]], n_results: int) -> Dict[str, List[list]]:
+        """Candidates from the compressed index, re-scored against the full-precision embeddings"""
+        pool = max(n_results, settings.VECTOR_INDEX_RESCORE_CANDIDATES)
+        candidates = [[doc_id for doc_id, _ in self.vector_index.search(embedding, pool)] for embedding in embeddings]
+        return self._rescore(embeddings, candidates, n_results)
+    
+    def _full_precision(self, ids: List[str]) -> Tuple[List[str], np.ndarray, Dict[str, Tuple[str, Dict[str, Any]]]]:
+        """Found IDs, their unit vectors and {id: (text, metadata)} for the candidates being re-scored"""
+        if self.full_vectors is None:
+            stored = self.collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+            found = stored["ids"]
+            vectors = normalize_rows(np.asarray(stored["embeddings"], dtype=np.float32).reshape(len(found), -1))
+        else:
+            # Chroma only serves text and metadata, which never loads its vector index
+            found, vectors = self.full_vectors.get(ids)
+            stored = self.collection.get(ids=found, include=["documents", "metadatas"]) if found else {
+                "ids": [], "documents": [], "metadatas": []
+            }
+        chunks = {doc_id: (text, metadata or {})
+                  for doc_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+        return found, vectors, chunks
+    
+    def _rescore(self, embeddings: List[List[float]], candidates: List[List[str]],
+                 n_results: int) -> Dict[str, List[list]]:
+        """Rank each query's candidate IDs by exact cosine similarity to its full-precision embedding"""
+        unique = list(dict.fromkeys(doc_id for ids in candidates for doc_id in ids))
+        found, vectors, chunks = self._full_precision(unique) if unique else ([], None, {})
+        rows = {doc_id: row for row, doc_id in enumerate(found)}
+        results = {"ids": [], "documents": [], "metadatas": []}
+        for embedding, ids in zip(embeddings, candidates):
+            ids = [doc_id for doc_id in ids if doc_id in rows and doc_id in chunks]
+            ranked = []
+            if ids:
+                scores = vectors[[rows[doc_id] for doc_id in ids]] @ normalize_rows(embedding)
+                ranked = [ids[index] for index in np.argsort(-scores)[:n_results]]
+            results["ids"].append(ranked)
+            results["documents"].append([chunks[doc_id][0] for doc_id in ranked])
+            results["metadatas"].append([chunks[doc_id][1] for doc_id in ranked])
+        return results
+    
+    async def aretrieve(self, query: str, k: int = 5, embedding: Optional[List[float]] = None,
+                        where: Optional[MetadataFilter] = None) -> List[str]:
+        """Most relevant chunks for a query, best first, without blocking the event loop
+        
+        Pass `embedding` when the query was already embedded. Cached results
+        are returned without embedding the query. `where` restricts the search
+        to chunks whose metadata matches.
+        """
+        if self.collection is None or self.embeddings is None:
+            raise RuntimeError("Vector store not initialized")
+        self._check_version()
+        key = self.cache.result_key(query, k, settings.RETRIEVAL_MODE, where)
+        chunks = self.cache.get_results(key)
+        if chunks is not None:
+            return chunks
+        if embedding is None:
+            embedding = await self.aembed_query(query)
+        chunks = (await self._search([list(embedding)], k, [query], where))[0]
+        self.cache.store_results(key, chunks)
+        return chunks
+    
+    async def close(self):
+        """Stop the background initialization and the embedding and search workers"""
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "knowledge_version": self.knowledge_version,
+            "workers": settings.VECTOR_STORE_WORKERS,
+            "retrieval_mode": settings.RETRIEVAL_MODE,
+            "lexical_index": {"documents": len(self.lexical_index), "terms": len(self.lexical_index.postings)},
+            "metadata_index": self.metadata_index.stats(),
+            "embedding_batches": self.query_batcher.stats(),
+            "cache": self.cache.stats(),
+            "vector_index": self.vector_index.stats() if self.vector_index is not None else {"dtype": "chroma"},
+            "engine": self.collection.stats() if isinstance(self.collection, FaissCollection) else {"engine": "chroma"}
+        }
+    
+    def similarity_search(self, query: str, k: int = 5, where: Optional[MetadataFilter] = None):
+        """Search for relevant documents, fusing dense and BM25 rankings in hybrid mode
+        
+        `where` restricts the search to chunks whose metadata matches.
+        """
+        if self.collection is None or self.embeddings is None:
+            return []
+        hybrid = self._hybrid([query])
+        allowed = self._allowed(where)
+        results = self._query([self.embeddings.embed_query(query)], self._candidates(k, hybrid, allowed), allowed)
+        ranked = self._rank(
+            query, results["ids"][0], results["documents"][0], results["metadatas"][0], k, hybrid, allowed
+        )
+        return [Document(page_content=text, metadata=metadata) for _, text, metadata in ranked]
+    
+    def as_retriever(self, k: int = 5, where: Optional[MetadataFilter] = None):
         """Get retriever interface"""
-        if self.vectorstore:
-            return self.vectorstore.as_retriever(search_kwargs={"k": k})
+        if self.collection is not None:
+            return KnowledgeRetriever(store=self, k=k, where=where)
         return None
+
+class KnowledgeRetriever(BaseRetriever):
+    """LangChain retriever over VectorStore.similarity_search, whichever engine backs it"""
+    store: Any
+    k: int = 5
+    where: Optional[Dict[str, Any]] = None
+    
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.store.similarity_search(query, k=self.k, where=self.where)
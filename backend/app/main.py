@@ -7,6 +7,8 @@ from contextlib import asynccontextmanager
 from app.config import settings
 from app.routers import query, analytics, auth, data
 from app.database import mongodb, mysql_db, vector_store
+from app.services import llm_client, conversation_store, hot_questions
+from app.core.data_version import data_version
 from app.core.exceptions import setup_exception_handlers
 from app.middleware.logging import setup_logging
 
@@ -19,7 +21,17 @@ async def lifespan(app: FastAPI):
     # Initialize databases
     await mongodb.connect()
     await mysql_db.connect()
-    await vector_store.initialize()
+    # The embedding model and Chroma load in the background; until they are
+    # ready, queries are answered without knowledge base context
+    if settings.VECTOR_STORE_BACKGROUND_INIT:
+        vector_store.start()
+    else:
+        await vector_store.initialize()
+    await llm_client.start()
+    
+    # Answer the popular questions in the background
+    if settings.HOT_QUESTIONS_ENABLED:
+        await hot_questions.start(query.precompute_answer)
     
     print("✅ All systems ready!")
     
@@ -27,8 +39,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("🔄 Shutting down...")
+    await hot_questions.close()
     await mongodb.disconnect()
     await mysql_db.disconnect()
+    await llm_client.close()
+    await vector_store.close()
+    await conversation_store.close()
+    await data_version.close()
     print("✅ Shutdown complete!")
 
 # Create FastAPI application
@@ -6,6 +6,7 @@ from typing import List, Dict, Any, Optional
 import logging
 
 from app.database import mongodb, mysql_db
+from app.core.data_version import data_version
 from app.routers.auth import verify_token
 
 router = APIRouter()
@@ -24,6 +25,7 @@ async def initialize_sample_data(current_user: dict = Depends(verify_token)):
         
         # Initialize MySQL sample data  
         await mysql_db.insert_sample_data()
+        await data_version.bump()
         
         return DataResponse(
             message="Sample data initialized successfully",
@@ -126,6 +128,7 @@ async def reset_all_data(current_user: dict = Depends(verify_token)):
         
         # Clear MySQL tables
         await mysql_db.execute_query("DELETE FROM transactions")
+        await data_version.bump()
         
         return DataResponse(
             message="All data reset successfully",
@@ -1,16 +1,28 @@
-"""Natural language query router with Cohere integration"""
+"""Natural language query router with LLM integration"""
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import replace
+from functools import partial
 import asyncio
+import contextlib
 import json
 import logging
-
-import cohere
-from langchain.memory import ConversationBufferWindowMemory
+import time
 
 from app.database import mongodb, mysql_db, vector_store
+from app.services import llm_client, answer_cache, intent_router, conversation_store, prompt_builder, query_planner, hot_questions
+from app.services.conversation_store import parse_cursor
+from app.services.intent import ChartSpec, MongoQuery, QueryPlan, SQLQuery, knowledge_categories
+from app.services.transactions import TransactionSummary
+from app.services.prompt_builder import DataSection, PromptStats
+from app.core.data_version import data_version
+from app.core.request_cache import memoized_read, read_key, read_scope
+from app.core.single_flight import SingleFlight
+from app.core.text import normalize_question
+from app.core.timing import server_timing_header, timed, timed_stage, timing_scope
 from app.routers.auth import verify_token
 from app.config import settings
 
@@ -28,256 +40,646 @@ class QueryResponse(BaseModel):
     chart_data: Optional[Dict[str, Any]] = None
     conversation_id: str
     sources: List[str] = []
+    timed_out_sources: List[str] = []
+    diagnostics: Dict[str, Any] = {}
+    timings: Optional[Dict[str, float]] = None  # Milliseconds per stage, when QUERY_TIMINGS_ENABLED
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    include_charts: bool = False
+    stream: bool = False  # NDJSON, one line per answer as it completes
 
-# Memory store for conversations
-conversation_memories = {}
+class BatchAnswer(BaseModel):
+    index: int
+    question: str
+    answer: str
+    chart_data: Optional[Dict[str, Any]] = None
+    sources: List[str] = []
+    timed_out_sources: List[str] = []
+    diagnostics: Dict[str, Any] = {}
 
-# Initialize Cohere client
-def get_cohere_client():
-    """Get Cohere client instance"""
-    return cohere.Client(api_key=settings.COHERE_API_KEY)
+class BatchQueryResponse(BaseModel):
+    answers: List[BatchAnswer]
+    diagnostics: Dict[str, Any] = {}
 
-async def query_mongodb_data(question: str) -> str:
-    """Query MongoDB for relevant data based on the question"""
+# Identical questions in flight at the same time share one computation
+query_flights = SingleFlight()
+
+NO_ANSWER_MESSAGE = "I apologize, but I couldn't generate a response. Please try again."
+ERROR_ANSWER_MESSAGE = "I apologize, but I encountered an error while processing your question. Please try again later."
+
+async def run_mongo_query(query: MongoQuery) -> List[Dict[str, Any]]:
+    """Execute a planned MongoDB read, shared with identical reads in the same request"""
+    async def fetch():
+        collection = mongodb.get_collection(query.collection)
+        if query.pipeline is not None:
+            pipeline = query.pipeline + [{"$project": query.projection}] if query.projection else query.pipeline
+            return await collection.aggregate(pipeline).to_list(length=query.limit)
+        cursor = collection.find({}, query.projection)
+        if query.sort:
+            cursor = cursor.sort(*query.sort)
+        return await cursor.limit(query.limit).to_list(length=query.limit)
+    
+    key = read_key("mongo", query.collection, query.pipeline, query.sort, query.limit, query.projection)
+    return await memoized_read(key, fetch)
+
+async def run_sql_query(sql: str, params=None) -> List[Dict[str, Any]]:
+    """Execute a MySQL read, shared with identical reads in the same request"""
+    key = read_key("mysql", sql, params)
+    return await memoized_read(key, lambda: mysql_db.execute_query(sql, params))
+
+@timed("mongodb")
+async def query_mongodb_data(plan: QueryPlan) -> DataSection:
+    """Query MongoDB for the data selected by the query plan"""
     try:
-        # Parse the question to determine what data to fetch
-        question_lower = question.lower()
-        
-        if "top" in question_lower and "portfolio" in question_lower:
-            # Query for top portfolios
-            collection = mongodb.get_collection("clients")
-            cursor = collection.find().sort("total_portfolio_value", -1).limit(5)
-            results = await cursor.to_list(length=5)
-            return f"Top portfolios: {json.dumps(results, default=str)}"
-        
-        elif "relationship manager" in question_lower:
-            if "top" in question_lower:
-                # Top relationship managers by AUM
-                pipeline = [
-                    {"$group": {
-                        "_id": "$relationship_manager_id",
-                        "manager_name": {"$first": "$relationship_manager_name"},
-                        "total_aum": {"$sum": "$total_portfolio_value"},
-                        "client_count": {"$sum": 1}
-                    }},
-                    {"$sort": {"total_aum": -1}},
-                    {"$limit": 5}
-                ]
-                collection = mongodb.get_collection("clients")
-                results = await collection.aggregate(pipeline).to_list(length=5)
-                return f"Top relationship managers: {json.dumps(results, default=str)}"
-            else:
-                # Portfolio breakup by relationship manager
-                pipeline = [
-                    {"$group": {
-                        "_id": "$relationship_manager_id",
-                        "manager_name": {"$first": "$relationship_manager_name"},
-                        "total_portfolio_value": {"$sum": "$total_portfolio_value"},
-                        "client_count": {"$sum": 1}
-                    }},
-                    {"$sort": {"total_portfolio_value": -1}}
-                ]
-                collection = mongodb.get_collection("clients")
-                results = await collection.aggregate(pipeline).to_list(length=10)
-                return f"Portfolio distribution by RM: {json.dumps(results, default=str)}"
-        
-        elif "portfolio" in question_lower:
-            # General portfolio query
-            collection = mongodb.get_collection("clients")
-            cursor = collection.find().limit(10)
-            results = await cursor.to_list(length=10)
-            return f"Portfolio data: {json.dumps(results, default=str)}"
-        
-        return "No relevant MongoDB data found"
+        if plan.mongo is None:
+            return DataSection("MongoDB", "No relevant MongoDB data found")
+        results = await run_mongo_query(plan.mongo)
+        if plan.mongo.top_n:
+            results = results[:plan.mongo.top_n]
+        return DataSection("MongoDB", plan.mongo.label, results)
         
     except Exception as e:
         logger.error(f"MongoDB query error: {e}")
-        return f"Error querying MongoDB: {str(e)}"
+        return DataSection("MongoDB", f"Error querying MongoDB: {str(e)}")
 
-async def query_mysql_data(question: str) -> str:
-    """Query MySQL for relevant transaction data"""
+@timed("mysql")
+async def query_mysql_data(plan: QueryPlan) -> DataSection:
+    """Query MySQL for the transaction data selected by the query plan"""
     try:
-        question_lower = question.lower()
-        
-        if "transaction" in question_lower or "trading" in question_lower:
-            cursor = await mysql_db.execute_query(
-                "SELECT client_id, transaction_type, amount, transaction_date FROM transactions ORDER BY transaction_date DESC LIMIT 10"
-            )
-            results = await cursor.fetchall()
-            return f"Recent transactions: {json.dumps(results, default=str)}"
-        
-        elif "volume" in question_lower:
-            cursor = await mysql_db.execute_query(
-                "SELECT transaction_type, SUM(amount) as total_volume FROM transactions GROUP BY transaction_type"
-            )
-            results = await cursor.fetchall()
-            return f"Transaction volumes: {json.dumps(results, default=str)}"
-        
-        return "No relevant MySQL data found"
+        if plan.mysql is None:
+            return DataSection("MySQL", "No relevant MySQL data found")
+        if isinstance(plan.mysql, TransactionSummary):
+            # Filters, grouping and limits run in MySQL; only summary rows come back
+            sql, params = plan.mysql.render(plan.transactions)
+            label = plan.mysql.describe(plan.transactions)
+        else:
+            sql, params, label = plan.mysql.sql, plan.mysql.params, plan.mysql.label
+        results = await run_sql_query(sql, params)
+        return DataSection("MySQL", label, results)
         
     except Exception as e:
         logger.error(f"MySQL query error: {e}")
-        return f"Error querying MySQL: {str(e)}"
+        return DataSection("MySQL", f"Error querying MySQL: {str(e)}")
 
-async def generate_ai_response(question: str, context: str, database_data: str) -> str:
-    """Generate AI response using Cohere"""
+@timed("planner")
+async def complete_plan(plan: QueryPlan) -> QueryPlan:
+    """Plan a database query with the LLM when no intent rule matched the question"""
+    if plan.mongo or plan.mysql or not settings.QUERY_PLANNER_ENABLED:
+        return plan
     try:
-        client = get_cohere_client()
+        planned = await asyncio.wait_for(query_planner.plan(plan.question), timeout=settings.QUERY_PLANNER_DEADLINE)
+    except Exception as e:
+        logger.warning(f"Query planning failed for '{plan.question}': {e}")
+        return plan
+    if isinstance(planned, MongoQuery):
+        return replace(plan, mongo=planned)
+    if isinstance(planned, SQLQuery):
+        return replace(plan, mysql=planned)
+    return plan
+
+@timed("prompt")
+def build_prompt(question: str, results: Dict[str, Any]) -> Tuple[str, PromptStats]:
+    """Pack the sources that answered in time into the prompt under the token budget"""
+    sections = [results[name] for name in ("MongoDB", "MySQL") if name in results]
+    return prompt_builder.build(question, results.get("Knowledge Base", []), sections)
+
+@timed("llm")
+async def generate_ai_response(prompt: str) -> str:
+    """Generate AI response with the configured LLM provider"""
+    try:
+        answer = await llm_client.generate(prompt)
+        
+        if answer:
+            return answer
+        else:
+            return NO_ANSWER_MESSAGE
         
-        prompt = f"""
-You are an expert wealth management analyst for a high-net-worth asset management firm. 
-You help analyze portfolios for film stars and sports personalities who have invested 100+ crores.
+    except Exception as e:
+        logger.error(f"LLM API error: {e}")
+        return f"{ERROR_ANSWER_MESSAGE} Error: {str(e)}"
 
-Context from knowledge base:
-{context}
+@timed("answer_cache")
+async def lookup_cached_answer(question: str, plan: QueryPlan, embedding=None):
+    """Embed the question (unless already embedded) and look it up in the semantic answer cache
+    
+    Only answers given for the same plan signature are reused. Returns the
+    question embedding (None if unavailable) and the cached entry (None on a miss).
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None, None
+    if embedding is None:
+        try:
+            embedding = await vector_store.aembed_query(question)
+        except Exception as e:
+            logger.warning(f"Question embedding failed, skipping answer cache: {e}")
+            return None, None
+    if embedding is None:
+        return None, None
+    return embedding, answer_cache.lookup(question, embedding, data_version.current, plan.signature)
 
-Relevant data from databases:
-{database_data}
+def cache_answer(question: str, plan: QueryPlan, embedding, answer: str, sources: List[str], timed_out: List[str]):
+    """Cache a complete answer; partial or failed answers are not reused"""
+    if embedding is None or timed_out:
+        return
+    if answer == NO_ANSWER_MESSAGE or answer.startswith(ERROR_ANSWER_MESSAGE):
+        return
+    answer_cache.store(question, embedding, answer, sources, data_version.current, plan.signature)
 
-Question: {question}
+@timed("knowledge_base")
+async def retrieve_context(question: str, embedding=None, categories: Tuple[str, ...] = ()) -> List[str]:
+    """Retrieve relevant knowledge base chunks for the question, most relevant first
+    
+    Restricted to chunks of the given knowledge `categories` when any are given.
+    While the vector store is warming up, waits up to VECTOR_STORE_READY_TIMEOUT;
+    past that the timeout drops the knowledge base from the answer.
+    """
+    if not vector_store.is_ready:
+        await asyncio.wait_for(vector_store.wait_ready(), timeout=settings.VECTOR_STORE_READY_TIMEOUT)
+    return await vector_store.aretrieve(question, k=3, embedding=embedding, where=knowledge_filter(categories))
 
-Please provide a comprehensive answer that:
-1. Analyzes the relevant data from the context and databases
-2. Presents the information in a clear, business-friendly format
-3. Includes specific numbers and insights where relevant
-4. Suggests actionable recommendations when appropriate
+def knowledge_filter(categories: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """Metadata filter for the knowledge categories a question is about, None to search everything"""
+    if not categories or not settings.KNOWLEDGE_CATEGORY_FILTER_ENABLED:
+        return None
+    return {"category": list(categories)}
 
-Answer:
-"""
-        
-        response = client.generate(
-            model=settings.LLM_MODEL,
-            prompt=prompt,
-            max_tokens=settings.MAX_TOKENS,
-            temperature=settings.TEMPERATURE
+async def gather_sources(plan: QueryPlan, context: Optional[List[str]] = None,
+                         embedding=None) -> Tuple[Dict[str, Any], List[str]]:
+    """Query all sources concurrently, each bounded by its own deadline.
+    
+    Questions no intent rule matched are planned by the LLM while the
+    knowledge base is searched; the database reads start once the plan is
+    ready, and their deadlines run from then.
+    Knowledge base retrieval is skipped when `context` was already retrieved,
+    and reuses the question `embedding` when the answer cache computed one.
+    Returns the results of the sources that answered in time (keyed by source
+    name) and the names of the sources that missed their deadline.
+    """
+    planning = asyncio.ensure_future(complete_plan(plan))
+    
+    async def after_planning(query, deadline: float):
+        return await asyncio.wait_for(query(await planning), timeout=deadline)
+    
+    stages = {}
+    if context is None:
+        stages["Knowledge Base"] = (
+            asyncio.wait_for(
+                retrieve_context(plan.question, embedding, plan.knowledge_categories),
+                timeout=settings.KNOWLEDGE_BASE_DEADLINE
+            ),
+            settings.KNOWLEDGE_BASE_DEADLINE
         )
-        
-        if response and response.generations and len(response.generations) > 0:
-            return response.generations[0].text.strip()
+    stages["MongoDB"] = (after_planning(query_mongodb_data, settings.MONGODB_QUERY_DEADLINE), settings.MONGODB_QUERY_DEADLINE)
+    stages["MySQL"] = (after_planning(query_mysql_data, settings.MYSQL_QUERY_DEADLINE), settings.MYSQL_QUERY_DEADLINE)
+    try:
+        outcomes = await asyncio.gather(*(stage for stage, _ in stages.values()), return_exceptions=True)
+    finally:
+        planning.cancel()
+    
+    results = {} if context is None else {"Knowledge Base": context}
+    timed_out = []
+    for name, outcome in zip(stages, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            logger.warning(f"{name} missed its {stages[name][1]}s deadline, dropping it from the prompt")
+            timed_out.append(name)
+        elif isinstance(outcome, Exception):
+            logger.error(f"{name} query failed: {outcome}")
         else:
-            return "I apologize, but I couldn't generate a response. Please try again."
+            results[name] = outcome
+    return results, timed_out
+
+async def resolve_conversation(conversation_id: Optional[str]) -> str:
+    """Return the existing conversation ID or start a new conversation"""
+    if conversation_id and await conversation_store.exists(conversation_id):
+        return conversation_id
+    return await conversation_store.create()
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def run_pipeline(question: str, include_charts: bool, embedding=None,
+                       context: Optional[List[str]] = None,
+                       generation_slots: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """Plan, fetch and answer one question within the caller's read scope
+    
+    Batches pass the question embedding and knowledge context they computed
+    up front, and a semaphore bounding their concurrent generations.
+    """
+    # Classify the question once; every stage works from the same plan
+    plan = intent_router.classify(question)
+    
+    # Start chart generation early so it overlaps with the other stages
+    chart_task = None
+    if include_charts:
+        chart_task = asyncio.create_task(chart_within_deadline(plan))
+    
+    try:
+        # Near-identical questions against unchanged data reuse a cached answer
+        embedding, cached = await lookup_cached_answer(question, plan, embedding)
+        prompt_stats = None
+        if cached:
+            answer_text, sources, timed_out = cached.answer, cached.sources, []
+        else:
+            # Fan out to the knowledge base and databases concurrently
+            results, timed_out = await gather_sources(plan, context, embedding)
+            sources = list(results)
+            prompt, prompt_stats = build_prompt(question, results)
+            
+            # Generate AI response
+            async with generation_slots or contextlib.nullcontext():
+                answer_text = await generate_ai_response(prompt)
+            cache_answer(question, plan, embedding, answer_text, sources, timed_out)
         
-    except Exception as e:
-        logger.error(f"Cohere API error: {e}")
-        return f"I apologize, but I encountered an error while processing your question. Please try again later. Error: {str(e)}"
+        # Extract data for charts (simplified)
+        chart_data = await chart_task if chart_task else None
+    finally:
+        # Nothing awaits the chart once a stage has failed
+        if chart_task and not chart_task.done():
+            chart_task.cancel()
+    
+    diagnostics = {}
+    if prompt_stats:
+        diagnostics["prompt"] = prompt_stats.as_dict()
+    
+    return {
+        "answer": answer_text,
+        "chart_data": chart_data,
+        "sources": sources,
+        "timed_out_sources": timed_out,
+        "diagnostics": diagnostics,
+        "timings": None
+    }
+
+async def answer_question(question: str, include_charts: bool) -> Dict[str, Any]:
+    """Run the full query pipeline for a question
+    
+    Returns the QueryResponse fields other than the conversation ID.
+    """
+    # Identical database reads within this request run once
+    with read_scope() as reads, timing_scope(settings.QUERY_TIMINGS_ENABLED) as timings:
+        result = await run_pipeline(question, include_charts)
+    
+    if reads.saved_round_trips:
+        logger.info(f"Saved {reads.saved_round_trips} of {reads.round_trips + reads.saved_round_trips} database reads for '{question}'")
+    
+    result["diagnostics"] = {**reads.stats(), **result["diagnostics"]}
+    result["timings"] = timings.as_dict() if timings else None
+    return result
+
+async def precompute_answer(question: str, include_charts: bool) -> Optional[Dict[str, Any]]:
+    """Answer a popular question ahead of time; partial or failed answers are not kept"""
+    result = await answer_question(question, include_charts)
+    if result["timed_out_sources"] or result["answer"] == NO_ANSWER_MESSAGE or result["answer"].startswith(ERROR_ANSWER_MESSAGE):
+        return None
+    return result
 
 @router.post("/ask", response_model=QueryResponse)
 async def process_query(
     request: QueryRequest,
+    response: Response,
     current_user: dict = Depends(verify_token)
 ):
-    """Process natural language query"""
+    """Process natural language query
+    
+    With QUERY_TIMINGS_ENABLED, per-stage durations are returned in `timings`
+    and in a Server-Timing header.
+    """
+    started_at = time.perf_counter()
     try:
         # Get or create conversation memory
-        if request.conversation_id and request.conversation_id in conversation_memories:
-            memory = conversation_memories[request.conversation_id]
-        else:
-            conversation_id = f"conv_{len(conversation_memories) + 1}"
-            memory = ConversationBufferWindowMemory(k=5, return_messages=True)
-            conversation_memories[conversation_id] = memory
-            request.conversation_id = conversation_id
+        request.conversation_id = await resolve_conversation(request.conversation_id)
         
-        # Get relevant context from vector store
-        context = ""
-        try:
-            if vector_store.vectorstore:
-                retriever = vector_store.vectorstore.as_retriever(k=3)
-                relevant_docs = retriever.get_relevant_documents(request.question)
-                context = "\n".join([doc.page_content for doc in relevant_docs])
-            else:
-                context = "Vector store not initialized"
-        except Exception as e:
-            logger.warning(f"Vector store query failed: {e}")
-            context = "No vector store context available"
+        # Pick up data written by other workers before choosing what to reuse
+        await data_version.sync()
         
-        # Query relevant data from databases
-        mongodb_data = await query_mongodb_data(request.question)
-        mysql_data = await query_mysql_data(request.question)
-        database_data = f"MongoDB: {mongodb_data}\nMySQL: {mysql_data}"
+        # Popular questions are answered ahead of time
+        hot_questions.observe(request.question, request.include_charts)
+        result = hot_questions.lookup(request.question, request.include_charts)
+        if result:
+            diagnostics = {**result["diagnostics"], "precomputed": True}
+            timings = {}
+        else:
+            # Concurrent requests for the same question and data wait on one computation
+            flight_key = ("ask", normalize_question(request.question), request.include_charts, data_version.current)
+            result, coalesced = await query_flights.do(
+                flight_key,
+                lambda: answer_question(request.question, request.include_charts)
+            )
+            diagnostics = {**result["diagnostics"], "coalesced": coalesced}
+            timings = result.get("timings")
         
-        # Generate AI response
-        answer_text = await generate_ai_response(request.question, context, database_data)
+        await conversation_store.append_turn(request.conversation_id, request.question, result["answer"])
         
-        # Extract data for charts (simplified)
-        chart_data = None
-        if request.include_charts:
-            chart_data = await generate_chart_data(request.question)
+        if settings.QUERY_TIMINGS_ENABLED:
+            timings = {**(timings or {}), "total": round((time.perf_counter() - started_at) * 1000, 3)}
+            response.headers["Server-Timing"] = server_timing_header(timings)
+        else:
+            timings = None
         
         return QueryResponse(
-            answer=answer_text,
-            chart_data=chart_data,
+            answer=result["answer"],
+            chart_data=result["chart_data"],
             conversation_id=request.conversation_id,
-            sources=["MongoDB", "MySQL", "Knowledge Base"]
+            sources=result["sources"],
+            timed_out_sources=result["timed_out_sources"],
+            diagnostics=diagnostics,
+            timings=timings
         )
         
     except Exception as e:
         logger.error(f"Query processing error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process query: {str(e)}")
 
-async def generate_chart_data(question: str) -> Optional[Dict[str, Any]]:
-    """Generate chart data based on the question"""
+@router.post("/ask/stream")
+async def process_query_stream(
+    request: QueryRequest,
+    current_user: dict = Depends(verify_token)
+):
+    """Process natural language query, streaming the answer as Server-Sent Events
+    
+    Events: `conversation` first, then one `token` per LLM chunk, followed by
+    `chart_data`, `sources` and a closing `done`.
+    """
+    conversation_id = await resolve_conversation(request.conversation_id)
+    
+    async def event_stream():
+        with read_scope() as reads, timing_scope(settings.QUERY_TIMINGS_ENABLED) as timings:
+            await data_version.sync()
+            plan = intent_router.classify(request.question)
+            chart_task = None
+            if request.include_charts:
+                chart_task = asyncio.create_task(chart_within_deadline(plan))
+            try:
+                yield sse_event("conversation", {"conversation_id": conversation_id})
+                
+                embedding, cached = await lookup_cached_answer(request.question, plan)
+                prompt_stats = None
+                if cached:
+                    answer_text, sources, timed_out = cached.answer, cached.sources, []
+                    yield sse_event("token", {"text": cached.answer})
+                else:
+                    results, timed_out = await gather_sources(plan, embedding=embedding)
+                    sources = list(results)
+                    prompt, prompt_stats = build_prompt(request.question, results)
+                    
+                    tokens = []
+                    try:
+                        # Same stage as generate_ai_response; includes handing tokens to the client
+                        with timed_stage("llm"):
+                            async for token in llm_client.stream(prompt):
+                                tokens.append(token)
+                                yield sse_event("token", {"text": token})
+                        answer_text = "".join(tokens).strip()
+                        cache_answer(request.question, plan, embedding, answer_text, sources, timed_out)
+                    except Exception as e:
+                        logger.error(f"LLM streaming error: {e}")
+                        yield sse_event("error", {"message": f"Failed to generate answer: {str(e)}"})
+                        answer_text = "".join(tokens).strip()
+                
+                await conversation_store.append_turn(conversation_id, request.question, answer_text)
+                
+                chart_data = await chart_task if chart_task else None
+                yield sse_event("chart_data", chart_data)
+                yield sse_event("sources", {"sources": sources, "timed_out_sources": timed_out})
+                diagnostics = reads.stats()
+                if prompt_stats:
+                    diagnostics["prompt"] = prompt_stats.as_dict()
+                done = {"diagnostics": diagnostics}
+                if timings:
+                    done["timings"] = timings.as_dict()
+                yield sse_event("done", done)
+            finally:
+                # The client may disconnect mid-stream
+                if chart_task and not chart_task.done():
+                    chart_task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def prepare_batch(questions: List[str]) -> Tuple[List[Any], List[Optional[List[str]]]]:
+    """Embed the questions in one model call and retrieve their context in one collection query per knowledge filter
+    
+    Returns per-question embeddings and knowledge chunks; None entries fall
+    back to the per-question path in the pipeline.
+    """
+    missing = [None] * len(questions)
+    if not vector_store.is_ready:
+        # Each question waits for the warming store on its own path
+        return missing, missing
+    try:
+        embeddings = await vector_store.aembed_queries(questions)
+    except Exception as e:
+        logger.warning(f"Batch embedding failed, embedding questions individually: {e}")
+        return missing, missing
+    if embeddings is None:
+        return missing, missing
+    # One collection query per distinct knowledge filter among the questions
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for index, question in enumerate(questions):
+        groups.setdefault(knowledge_categories(question), []).append(index)
+    contexts = list(missing)
+    try:
+        found = await asyncio.gather(*(
+            vector_store.asearch_by_vectors(
+                [embeddings[index] for index in indices], k=3,
+                queries=[questions[index] for index in indices], where=knowledge_filter(categories)
+            )
+            for categories, indices in groups.items()
+        ))
+    except Exception as e:
+        logger.warning(f"Batch retrieval failed, retrieving context per question: {e}")
+        return embeddings, missing
+    for indices, chunks in zip(groups.values(), found):
+        for index, context in zip(indices, chunks):
+            contexts[index] = context
+    return embeddings, contexts
+
+async def answer_batch_question(question: str, include_charts: bool, embedding,
+                                context: Optional[List[str]], generation_slots: asyncio.Semaphore) -> Tuple[Dict[str, Any], bool]:
+    """Answer one batch question, sharing the work with identical batch questions in flight elsewhere
+    
+    Batch results carry no per-request read diagnostics or timings, so they are
+    not shared with /ask requests.
+    """
     try:
-        if "portfolio" in question.lower() and "top" in question.lower():
-            # Generate data for top portfolios chart
-            collection = mongodb.get_collection("clients")
-            cursor = collection.find().sort("total_portfolio_value", -1).limit(5)
-            results = await cursor.to_list(length=5)
+        flight_key = ("batch", normalize_question(question), include_charts, data_version.current)
+        return await query_flights.do(
+            flight_key,
+            partial(run_pipeline, question, include_charts, embedding, context, generation_slots)
+        )
+    except Exception as e:
+        logger.error(f"Batch question failed for '{question}': {e}")
+        return {
+            "answer": f"{ERROR_ANSWER_MESSAGE} Error: {str(e)}",
+            "chart_data": None,
+            "sources": [],
+            "timed_out_sources": [],
+            "diagnostics": {},
+            "timings": None
+        }, False
+
+def batch_answers(indices: List[int], question_texts: List[str], result: Dict[str, Any], coalesced: bool) -> List[BatchAnswer]:
+    """Expand one answered question to every position it was asked at"""
+    return [
+        BatchAnswer(
+            index=index,
+            question=question_texts[index],
+            answer=result["answer"],
+            chart_data=result["chart_data"],
+            sources=result["sources"],
+            timed_out_sources=result["timed_out_sources"],
+            diagnostics={**result["diagnostics"], "coalesced": coalesced}
+        )
+        for index in indices
+    ]
+
+@router.post("/ask-batch", response_model=BatchQueryResponse)
+async def process_query_batch(
+    request: BatchQueryRequest,
+    current_user: dict = Depends(verify_token)
+):
+    """Answer a list of questions in one call
+    
+    Questions are embedded in one batch and their knowledge context retrieved
+    in one vector query. Repeated questions are answered once, database reads
+    are shared across the whole batch and generations run at most
+    BATCH_MAX_CONCURRENCY at a time. With `stream`, answers are sent as NDJSON
+    lines in completion order; otherwise the response lists them in request order.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_QUESTIONS} questions per batch, got {len(request.questions)}"
+        )
+    
+    # Repeated questions (ignoring case and punctuation) are answered once
+    positions: Dict[str, List[int]] = {}
+    for index, question in enumerate(request.questions):
+        positions.setdefault(normalize_question(question), []).append(index)
+    groups = list(positions.values())
+    unique_questions = [request.questions[indices[0]] for indices in groups]
+    diagnostics = {"questions": len(request.questions), "unique_questions": len(unique_questions)}
+    
+    async def run_batch():
+        """Yield the answers for each unique question as it completes"""
+        await data_version.sync()
+        # Every question in the batch shares one read scope
+        with read_scope() as reads:
+            embeddings, contexts = await prepare_batch(unique_questions)
+            generation_slots = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
             
-            return {
-                "type": "bar",
-                "title": "Top 5 Portfolios by Value",
-                "data": {
-                    "labels": [client["name"] for client in results],
-                    "datasets": [{
-                        "label": "Portfolio Value (₹ Crores)",
-                        "data": [client["total_portfolio_value"] / 10000000 for client in results],
-                        "backgroundColor": "rgba(54, 162, 235, 0.6)"
-                    }]
-                }
-            }
-        
-        elif "relationship manager" in question.lower():
-            # Generate data for RM performance
-            pipeline = [
-                {"$group": {
-                    "_id": "$relationship_manager_id",
-                    "manager_name": {"$first": "$relationship_manager_name"},
-                    "total_aum": {"$sum": "$total_portfolio_value"},
-                    "client_count": {"$sum": 1}
-                }},
-                {"$sort": {"total_aum": -1}}
-            ]
-            collection = mongodb.get_collection("clients")
-            results = await collection.aggregate(pipeline).to_list(length=10)
+            async def answer_group(position: int):
+                result, coalesced = await answer_batch_question(
+                    unique_questions[position], request.include_charts,
+                    embeddings[position], contexts[position], generation_slots
+                )
+                return batch_answers(groups[position], request.questions, result, coalesced)
             
-            return {
-                "type": "pie",
-                "title": "Portfolio Distribution by Relationship Manager",
-                "data": {
-                    "labels": [rm["manager_name"] for rm in results],
-                    "datasets": [{
-                        "data": [rm["total_aum"] / 10000000 for rm in results],
-                        "backgroundColor": [
-                            "rgba(255, 99, 132, 0.6)",
-                            "rgba(54, 162, 235, 0.6)", 
-                            "rgba(255, 205, 86, 0.6)",
-                            "rgba(75, 192, 192, 0.6)",
-                            "rgba(153, 102, 255, 0.6)"
-                        ]
-                    }]
-                }
-            }
+            tasks = [asyncio.create_task(answer_group(position)) for position in range(len(groups))]
+            try:
+                for completed in asyncio.as_completed(tasks):
+                    yield await completed
+            finally:
+                # The client may disconnect mid-stream
+                for task in tasks:
+                    task.cancel()
         
-        return None
+        diagnostics["batch_embedded"] = embeddings[0] is not None
+        diagnostics.update(reads.stats())
+    
+    if request.stream:
+        async def ndjson_stream():
+            async for group_answers in run_batch():
+                for answer in group_answers:
+                    yield answer.model_dump_json() + "\n"
+            # Closing line with the batch totals
+            yield json.dumps({"diagnostics": diagnostics}) + "\n"
+        
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+    
+    try:
+        answers = []
+        async for group_answers in run_batch():
+            answers.extend(group_answers)
+        answers.sort(key=lambda answer: answer.index)
+        return BatchQueryResponse(answers=answers, diagnostics=diagnostics)
+        
+    except Exception as e:
+        logger.error(f"Batch query processing error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to process batch: {str(e)}")
+
+def build_chart(spec: ChartSpec, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Render query rows as a Chart.js payload"""
+    dataset = {}
+    if spec.dataset_label:
+        dataset["label"] = spec.dataset_label
+    dataset["data"] = [row[spec.value_field] / spec.value_scale for row in rows]
+    dataset["backgroundColor"] = spec.background_color
+    return {
+        "type": spec.chart_type,
+        "title": spec.title,
+        "data": {
+            "labels": [row[spec.label_field] for row in rows],
+            "datasets": [dataset]
+        }
+    }
+
+@timed("chart")
+async def generate_chart_data(plan: QueryPlan) -> Optional[Dict[str, Any]]:
+    """Generate the chart selected by the query plan"""
+    try:
+        if plan.chart is None:
+            return None
+        rows = await run_mongo_query(plan.chart.query)
+        return build_chart(plan.chart, rows)
         
     except Exception as e:
         logger.error(f"Chart generation error: {e}")
         return None
 
+async def chart_within_deadline(plan: QueryPlan) -> Optional[Dict[str, Any]]:
+    """Generate the chart, giving up at MONGODB_QUERY_DEADLINE like the MongoDB source"""
+    try:
+        return await asyncio.wait_for(generate_chart_data(plan), timeout=settings.MONGODB_QUERY_DEADLINE)
+    except asyncio.TimeoutError:
+        logger.warning(f"Chart missed its {settings.MONGODB_QUERY_DEADLINE}s deadline, answering without it")
+        return None
+
+@router.get("/stats")
+async def get_query_stats(current_user: dict = Depends(verify_token)):
+    """Get query pipeline cache statistics"""
+    await data_version.sync()
+    return {
+        "data_version": data_version.current,
+        "answer_cache": answer_cache.stats(),
+        "single_flight": query_flights.stats(),
+        "query_planner": query_planner.stats(),
+        "hot_questions": hot_questions.stats(),
+        "vector_store": vector_store.stats()
+    }
+
 @router.get("/conversations")
-async def get_conversations(current_user: dict = Depends(verify_token)):
-    """Get list of conversation IDs"""
-    return {"conversations": list(conversation_memories.keys())}
+async def get_conversations(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(verify_token)
+):
+    """Page through conversation IDs, most recently active first"""
+    # Cursors are the keysets handed out as `next_cursor`
+    if cursor is not None:
+        try:
+            parse_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    conversation_ids, next_cursor = await conversation_store.list(cursor, limit)
+    return {"conversations": conversation_ids, "next_cursor": next_cursor}
 
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(
@@ -285,7 +687,6 @@ async def delete_conversation(
     current_user: dict = Depends(verify_token)
 ):
     """Delete a conversation"""
-    if conversation_id in conversation_memories:
-        del conversation_memories[conversation_id]
+    if await conversation_store.delete(conversation_id):
         return {"message": "Conversation deleted"}
     raise HTTPException(status_code=404, detail="Conversation not found")
@@ -0,0 +1,43 @@
+"""Shared service modules"""
+
+from app.config import settings
+from .llm import create_llm_client
+from .answer_cache import SemanticAnswerCache
+from .intent import IntentRouter, MONGO_RULES, MYSQL_RULES, CHART_RULES
+from .conversation_store import create_conversation_store
+from .prompt_builder import PromptBuilder, TokenCounter
+from .serialization import render_table
+from .query_planner import QueryPlanner
+from .hot_questions import HotQuestionRegistry
+
+# Create singleton instances
+llm_client = create_llm_client()
+answer_cache = SemanticAnswerCache(
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+)
+intent_router = IntentRouter(MONGO_RULES, MYSQL_RULES, CHART_RULES)
+conversation_store = create_conversation_store()
+prompt_builder = PromptBuilder(
+    budget=settings.PROMPT_TOKEN_BUDGET,
+    counter=TokenCounter(settings.PROMPT_TOKENIZER),
+    render_rows=render_table
+)
+query_planner = QueryPlanner(
+    llm_client,
+    max_entries=settings.QUERY_PLANNER_MAX_ENTRIES,
+    ttl_seconds=settings.QUERY_PLANNER_TTL_SECONDS,
+    rejected_ttl_seconds=settings.QUERY_PLANNER_REJECTED_TTL_SECONDS,
+    max_rows=settings.QUERY_PLANNER_MAX_ROWS
+)
+hot_questions = HotQuestionRegistry(
+    max_entries=settings.HOT_QUESTIONS_MAX_ENTRIES,
+    min_count=settings.HOT_QUESTIONS_MIN_COUNT,
+    max_tracked=settings.HOT_QUESTIONS_MAX_TRACKED,
+    refresh_seconds=settings.HOT_QUESTIONS_REFRESH_SECONDS,
+    check_seconds=settings.HOT_QUESTIONS_CHECK_SECONDS,
+    seed_questions=settings.HOT_QUESTIONS_SEED
+)
+
+__all__ = ["llm_client", "answer_cache", "intent_router", "conversation_store", "prompt_builder", "query_planner", "hot_questions"]
@@ -0,0 +1,103 @@
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Hashable, List, Optional
+import numpy as np
+import logging
+from app.core.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+@dataclass
+class CachedAnswer:
+    question: str
+    embedding: np.ndarray
+    answer: str
+    sources: List[str]
+    data_version: int
+    numbers: frozenset
+    signature: Hashable = None
+    created_at: float = field(default_factory=time.monotonic)
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of LLM answers keyed by question embedding.
+    
+    A lookup hits when a cached question is at least `similarity_threshold`
+    cosine-similar to the new one, mentions the same numbers ("top 5" must not
+    answer "top 10"), has the same query plan signature ("this month" must not
+    answer "last month", "buys" must not answer "sells") and was answered
+    against the current data version.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # Recency, eviction and hit counts; lookups scan every entry for the most similar question
+        self.entries = LRUCache(max_entries)
+        self._next_key = 0
+    
+    def lookup(self, question: str, embedding, data_version: int, signature: Hashable = None) -> Optional[CachedAnswer]:
+        """Return the most similar fresh answer, or None on a miss"""
+        self._evict_stale(data_version)
+        vector = _normalize(embedding)
+        numbers = _numbers(question)
+        
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self.entries.items():
+            if entry.numbers != numbers or entry.signature != signature:
+                continue
+            score = float(np.dot(vector, entry.embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+        
+        if best_key is None:
+            # No key to look up, so the miss is counted here
+            self.entries.misses += 1
+            return None
+        
+        # Marks the entry most recently used and counts the hit
+        entry = self.entries.get(best_key)
+        logger.info(f"Answer cache hit ({best_score:.3f}): '{question}' ~ '{entry.question}'")
+        return entry
+    
+    def store(self, question: str, embedding, answer: str, sources: List[str], data_version: int,
+              signature: Hashable = None):
+        """Cache an answer, evicting the least recently used entry when full"""
+        self.entries.set(self._next_key, CachedAnswer(
+            question=question,
+            embedding=_normalize(embedding),
+            answer=answer,
+            sources=list(sources),
+            data_version=data_version,
+            numbers=_numbers(question),
+            signature=signature
+        ))
+        self._next_key += 1
+    
+    def clear(self):
+        self.entries.clear()
+    
+    def stats(self) -> dict:
+        return self.entries.stats()
+    
+    def _evict_stale(self, data_version: int):
+        """Drop entries that expired or were answered against older data"""
+        # Answers age from when they were generated, not from when they were last read
+        cutoff = time.monotonic() - self.ttl_seconds
+        stale = [
+            key for key, entry in self.entries.items()
+            if entry.created_at < cutoff or entry.data_version != data_version
+        ]
+        for key in stale:
+            self.entries.pop(key)
+        self.entries.evictions += len(stale)
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _numbers(question: str) -> frozenset:
+    return frozenset(NUMBER_PATTERN.findall(question))
@@ -0,0 +1,188 @@
+import json
+import math
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.core.lru import LRUCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+def new_conversation_id() -> str:
+    """Collision-free conversation ID, safe across workers"""
+    return f"conv_{uuid.uuid4().hex}"
+
+# Conversation listings page by keyset, "<last activity>:<conversation id>" of the
+# last entry served, so conversations touched between fetches don't shift pages
+
+def format_cursor(last_updated: float, conversation_id: str) -> str:
+    return f"{last_updated!r}:{conversation_id}"
+
+def parse_cursor(cursor: str) -> Tuple[float, str]:
+    """(last activity, conversation ID) of a `format_cursor` cursor; ValueError if malformed"""
+    last_updated, _, conversation_id = cursor.partition(":")
+    last_updated = float(last_updated)
+    if not conversation_id or not math.isfinite(last_updated):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return last_updated, conversation_id
+
+def keyset_page(entries: List[Tuple[float, str]], limit: int) -> Tuple[List[str], Optional[str]]:
+    """IDs of the first `limit` (last activity, ID) entries, newest first, and the cursor after them"""
+    page = entries[:limit]
+    next_cursor = format_cursor(*page[-1]) if len(entries) > limit else None
+    return [conversation_id for _, conversation_id in page], next_cursor
+
+class InMemoryConversationStore:
+    """Per-process conversation store with an LRU size cap and idle-TTL eviction
+
+    Each entry holds the turns and the wall-clock time of the last write, the
+    same activity time the Redis store scores its index by.
+    """
+
+    def __init__(self, max_entries: int, idle_ttl_seconds: float, window: int):
+        self.window = window
+        self.conversations = LRUCache(max_entries=max_entries, ttl_seconds=idle_ttl_seconds)
+
+    async def create(self) -> str:
+        conversation_id = new_conversation_id()
+        self.conversations.set(conversation_id, {"turns": deque(maxlen=self.window), "last_updated": time.time()})
+        return conversation_id
+
+    async def exists(self, conversation_id: str) -> bool:
+        return conversation_id in self.conversations
+
+    async def append_turn(self, conversation_id: str, question: str, answer: str):
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            conversation = {"turns": deque(maxlen=self.window)}
+            self.conversations.set(conversation_id, conversation)
+        conversation["last_updated"] = time.time()
+        conversation["turns"].append({"question": question, "answer": answer, "timestamp": conversation["last_updated"]})
+
+    async def get_turns(self, conversation_id: str) -> List[Dict]:
+        conversation = self.conversations.get(conversation_id)
+        return list(conversation["turns"]) if conversation is not None else []
+
+    async def delete(self, conversation_id: str) -> bool:
+        return self.conversations.pop(conversation_id) is not None
+
+    async def list(self, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        """Page through conversation IDs, most recently active first"""
+        entries = sorted(
+            ((conversation["last_updated"], conversation_id) for conversation_id, conversation in self.conversations.items()),
+            reverse=True
+        )
+        if cursor:
+            after = parse_cursor(cursor)
+            entries = [entry for entry in entries if entry < after]
+        return keyset_page(entries, limit)
+
+    async def close(self):
+        pass
+
+class RedisConversationStore:
+    """Conversation store shared by every worker through Redis
+
+    Each conversation is a marker key plus a capped list of turns, both expiring
+    after the idle TTL. A sorted set scored by last activity backs paging and
+    the size cap.
+    """
+
+    INDEX_KEY = "conversations"
+
+    def __init__(self, url: str, max_entries: int, idle_ttl_seconds: float, window: int):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url, decode_responses=True)
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = int(idle_ttl_seconds)
+        self.window = window
+
+    @staticmethod
+    def _key(conversation_id: str) -> str:
+        return f"conversation:{conversation_id}"
+
+    @staticmethod
+    def _turns_key(conversation_id: str) -> str:
+        return f"conversation:{conversation_id}:turns"
+
+    async def create(self) -> str:
+        conversation_id = new_conversation_id()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(conversation_id), time.time(), ex=self.idle_ttl_seconds)
+            pipe.zadd(self.INDEX_KEY, {conversation_id: time.time()})
+            await pipe.execute()
+        await self._prune()
+        return conversation_id
+
+    async def exists(self, conversation_id: str) -> bool:
+        return bool(await self.redis.exists(self._key(conversation_id)))
+
+    async def append_turn(self, conversation_id: str, question: str, answer: str):
+        turn = json.dumps({"question": question, "answer": answer, "timestamp": time.time()})
+        turns_key = self._turns_key(conversation_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(turns_key, turn)
+            pipe.ltrim(turns_key, -self.window, -1)
+            pipe.expire(turns_key, self.idle_ttl_seconds)
+            pipe.set(self._key(conversation_id), time.time(), ex=self.idle_ttl_seconds)
+            pipe.zadd(self.INDEX_KEY, {conversation_id: time.time()})
+            await pipe.execute()
+
+    async def get_turns(self, conversation_id: str) -> List[Dict]:
+        turns = await self.redis.lrange(self._turns_key(conversation_id), 0, -1)
+        return [json.loads(turn) for turn in turns]
+
+    async def delete(self, conversation_id: str) -> bool:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(conversation_id), self._turns_key(conversation_id))
+            pipe.zrem(self.INDEX_KEY, conversation_id)
+            deleted, _ = await pipe.execute()
+        return bool(deleted)
+
+    async def list(self, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        """Page through conversation IDs, most recently active first"""
+        await self._prune()
+        if not cursor:
+            rows = await self.redis.zrevrangebyscore(self.INDEX_KEY, "+inf", "-inf", start=0, num=limit + 1, withscores=True)
+            return keyset_page([(score, member) for member, score in rows], limit)
+        after = parse_cursor(cursor)
+        # Equal scores come back in descending member order; fetch past the ties
+        # at the cursor's score and drop those already served
+        ties = await self.redis.zcount(self.INDEX_KEY, after[0], after[0])
+        rows = await self.redis.zrevrangebyscore(self.INDEX_KEY, after[0], "-inf", start=0, num=limit + 1 + ties, withscores=True)
+        return keyset_page([(score, member) for member, score in rows if (score, member) < after], limit)
+
+    async def close(self):
+        await self.redis.aclose()
+
+    async def _prune(self):
+        """Drop index entries past the idle TTL and the oldest conversations over the cap"""
+        await self.redis.zremrangebyscore(self.INDEX_KEY, "-inf", time.time() - self.idle_ttl_seconds)
+        overflow = await self.redis.zcard(self.INDEX_KEY) - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = await self.redis.zrange(self.INDEX_KEY, 0, overflow - 1)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for conversation_id in evicted:
+                pipe.delete(self._key(conversation_id), self._turns_key(conversation_id))
+            pipe.zrem(self.INDEX_KEY, *evicted)
+            await pipe.execute()
+        logger.info(f"Evicted {len(evicted)} conversations over the {self.max_entries} cap")
+
+def create_conversation_store():
+    """Build the conversation store selected by CONVERSATION_STORE_BACKEND"""
+    if settings.CONVERSATION_STORE_BACKEND == "redis":
+        return RedisConversationStore(
+            url=settings.REDIS_URL,
+            max_entries=settings.CONVERSATION_MAX_ENTRIES,
+            idle_ttl_seconds=settings.CONVERSATION_IDLE_TTL_SECONDS,
+            window=settings.CONVERSATION_WINDOW
+        )
+    return InMemoryConversationStore(
+        max_entries=settings.CONVERSATION_MAX_ENTRIES,
+        idle_ttl_seconds=settings.CONVERSATION_IDLE_TTL_SECONDS,
+        window=settings.CONVERSATION_WINDOW
+    )
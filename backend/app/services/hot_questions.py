@@ -0,0 +1,175 @@
+"""Precomputed answers for the most frequently asked questions"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from app.core.data_version import data_version
+from app.core.text import normalize_question
+from app.services.transactions import DateRange, parse_date_range
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class HotAnswer:
+    question: str
+    include_charts: bool
+    result: Optional[Dict[str, Any]] = None
+    data_version: int = -1
+    period: Optional[DateRange] = None  # Date window the question resolved to when computed
+    computed_at: float = 0.0
+    retry_at: float = 0.0
+    hits: int = 0
+
+class HotQuestionRegistry:
+    """Keeps the `max_entries` most asked questions answered ahead of time.
+
+    Every request is counted; questions asked at least `min_count` times are
+    promoted and answered by a background task, which recomputes an answer
+    when the data version changes, the date window of a relative question
+    ("this month", "last 7 days") moves on, or it is older than `refresh_seconds`.
+    Failed or partial answers are retried after a tenth of that period.
+    Counts are halved every refresh period so the registry follows current
+    traffic. Seed questions start out promoted and drop out like any other
+    question once they stop being asked.
+    """
+
+    def __init__(self, max_entries: int, min_count: int, max_tracked: int, refresh_seconds: float,
+                 check_seconds: float, seed_questions: Sequence[str] = ()):
+        self.max_entries = max_entries
+        self.min_count = min_count
+        self.max_tracked = max_tracked
+        self.refresh_seconds = refresh_seconds
+        self.check_seconds = check_seconds
+        self.counts: Dict[Hashable, Tuple[int, str]] = {}
+        self.entries: Dict[Hashable, HotAnswer] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._compute = None
+        self._task = None
+        self._decayed_at = time.monotonic()
+        for question in seed_questions:
+            self.counts[self._key(question, True)] = (min_count, question)
+
+    def _key(self, question: str, include_charts: bool) -> Hashable:
+        return normalize_question(question), include_charts
+
+    def observe(self, question: str, include_charts: bool):
+        """Count one request for the question"""
+        key = self._key(question, include_charts)
+        count, _ = self.counts.get(key, (0, question))
+        if not count and len(self.counts) >= self.max_tracked:
+            # Make room by forgetting the least asked question
+            del self.counts[min(self.counts, key=lambda tracked: self.counts[tracked][0])]
+        self.counts[key] = (count + 1, question)
+
+    def lookup(self, question: str, include_charts: bool) -> Optional[Dict[str, Any]]:
+        """Return the precomputed result for the question if it is current"""
+        entry = self.entries.get(self._key(question, include_charts))
+        if entry is None or not self._current(entry):
+            self.misses += 1
+            return None
+        entry.hits += 1
+        self.hits += 1
+        return entry.result
+
+    async def start(self, compute: Callable[[str, bool], Awaitable[Optional[Dict[str, Any]]]]):
+        """Answer the hot questions in the background with `compute`
+
+        `compute` returns the result to serve, or None if the answer is
+        incomplete and should not be kept.
+        """
+        self._compute = compute
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Hot question refresh failed: {e}")
+            await asyncio.sleep(self.check_seconds)
+
+    async def refresh(self):
+        """Promote the most asked questions and recompute stale answers"""
+        if time.monotonic() - self._decayed_at > self.refresh_seconds:
+            self._decay()
+        self._promote()
+
+        await data_version.sync()
+        now = time.monotonic()
+        stale = [
+            entry for entry in self.entries.values()
+            if (not self._current(entry) or now - entry.computed_at > self.refresh_seconds)
+            and now >= entry.retry_at
+        ]
+        # One at a time, so refreshing never competes with live traffic for more than one LLM slot
+        for entry in stale:
+            version, period = data_version.current, parse_date_range(entry.question)
+            try:
+                result = await self._compute(entry.question, entry.include_charts)
+            except Exception as e:
+                logger.warning(f"Precomputing '{entry.question}' failed: {e}")
+                result = None
+            if result is None:
+                # Back off instead of retrying a failing question on every check
+                entry.retry_at = time.monotonic() + self.refresh_seconds / 10
+                continue
+            entry.result, entry.data_version, entry.period = result, version, period
+            entry.computed_at = time.monotonic()
+            self.refreshes += 1
+
+    def _current(self, entry: HotAnswer) -> bool:
+        """Whether the entry's answer is for the current data and the period its question names today"""
+        return (entry.result is not None and entry.data_version == data_version.current
+                and entry.period == parse_date_range(entry.question))
+
+    def _decay(self):
+        self.counts = {key: (count // 2, question) for key, (count, question) in self.counts.items() if count > 1}
+        self._decayed_at = time.monotonic()
+
+    def _promote(self):
+        ranked = sorted(
+            (item for item in self.counts.items() if item[1][0] >= self.min_count),
+            key=lambda item: item[1][0],
+            reverse=True
+        )[:self.max_entries]
+        hot = {}
+        for key, (_, question) in ranked:
+            hot[key] = self.entries.get(key) or HotAnswer(question=question, include_charts=key[1])
+        self.entries = hot
+
+    def questions(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "question": entry.question,
+                "include_charts": entry.include_charts,
+                "ready": self._current(entry),
+                "hits": entry.hits
+            }
+            for entry in self.entries.values()
+        ]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "tracked_questions": len(self.counts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "questions": self.questions()
+        }
@@ -0,0 +1,271 @@
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from app.services.transactions import (
+    ASSET_TYPE_SUMMARY, NET_FLOWS, RECENT_TRANSACTIONS, TRANSACTION_VOLUME,
+    TransactionFilter, TransactionSummary, transaction_filter
+)
+
+@dataclass(frozen=True)
+class MongoQuery:
+    """A read against a MongoDB collection: an aggregation pipeline or a sorted find()"""
+    name: str
+    label: str
+    collection: str
+    pipeline: Optional[List[Dict[str, Any]]] = None
+    sort: Optional[Tuple[str, int]] = None
+    limit: int = 10
+    top_n: Optional[int] = None  # Rows kept for the prompt; the read itself stays shareable
+    projection: Optional[Dict[str, int]] = None  # Fields fetched for this intent
+
+@dataclass(frozen=True)
+class SQLQuery:
+    """A read against the MySQL transactions database"""
+    name: str
+    label: str
+    sql: str
+    params: Tuple[Any, ...] = ()  # Values for the %s placeholders in `sql`
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """A Chart.js payload built from the rows of a MongoDB query"""
+    name: str
+    chart_type: str
+    title: str
+    query: MongoQuery
+    label_field: str
+    value_field: str
+    background_color: Union[str, List[str]]
+    dataset_label: Optional[str] = None
+    value_scale: float = 10000000  # Rupees to crores
+
+@dataclass(frozen=True)
+class IntentRule:
+    """Selects `target` when every `all_of` keyword and at least one `any_of` keyword is present"""
+    target: Union[MongoQuery, SQLQuery, TransactionSummary, ChartSpec]
+    all_of: Tuple[str, ...] = ()
+    any_of: Tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """What to fetch and chart for one question, decided once per request"""
+    question: str
+    mongo: Optional[MongoQuery] = None
+    mysql: Optional[Union[SQLQuery, TransactionSummary]] = None
+    chart: Optional[ChartSpec] = None
+
+    @property
+    def intent(self) -> str:
+        """Names of the selected reads, part of the answer cache signature"""
+        names = [spec.name for spec in (self.mongo, self.mysql) if spec is not None]
+        return "+".join(names) if names else "general"
+
+    @cached_property
+    def transactions(self) -> TransactionFilter:
+        """Date window, client and type stated in the question, pushed down into transaction summaries"""
+        return transaction_filter(self.question)
+
+    @cached_property
+    def knowledge_categories(self) -> Tuple[str, ...]:
+        """Knowledge base categories the question is about, to narrow retrieval to"""
+        return knowledge_categories(self.question)
+
+    @property
+    def signature(self) -> Tuple:
+        """What the answer depends on beyond the wording: intent, transaction filters and knowledge categories"""
+        return (self.intent, self.transactions, self.knowledge_categories)
+
+# Client fields an answer about portfolios can use; contact details and audit
+# timestamps stay in the database
+CLIENT_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "client_id": 1,
+    "name": 1,
+    "type": 1,
+    "risk_appetite": 1,
+    "risk_tolerance": 1,
+    "total_portfolio_value": 1,
+    "relationship_manager_name": 1,
+}
+
+# Query catalogue
+TOP_PORTFOLIOS = MongoQuery(
+    name="top_portfolios",
+    label="Top portfolios",
+    collection="clients",
+    sort=("total_portfolio_value", -1),
+    limit=5,
+    projection=CLIENT_SUMMARY_PROJECTION
+)
+
+# Shared by the RM answers and the RM chart so one request reads it once
+RM_AUM_PIPELINE = [
+    {"$group": {
+        "_id": "$relationship_manager_id",
+        "manager_name": {"$first": "$relationship_manager_name"},
+        "total_aum": {"$sum": "$total_portfolio_value"},
+        "client_count": {"$sum": 1}
+    }},
+    {"$sort": {"total_aum": -1}}
+]
+
+TOP_RELATIONSHIP_MANAGERS = MongoQuery(
+    name="top_relationship_managers",
+    label="Top relationship managers",
+    collection="clients",
+    pipeline=RM_AUM_PIPELINE,
+    limit=10,
+    top_n=5
+)
+
+PORTFOLIO_BY_RELATIONSHIP_MANAGER = MongoQuery(
+    name="portfolio_by_relationship_manager",
+    label="Portfolio distribution by RM",
+    collection="clients",
+    pipeline=RM_AUM_PIPELINE,
+    limit=10
+)
+
+PORTFOLIO_OVERVIEW = MongoQuery(
+    name="portfolio_overview",
+    label="Portfolio data",
+    collection="clients",
+    limit=10,
+    projection=CLIENT_SUMMARY_PROJECTION
+)
+
+TOP_PORTFOLIOS_CHART = ChartSpec(
+    name="top_portfolios",
+    chart_type="bar",
+    title="Top 5 Portfolios by Value",
+    query=TOP_PORTFOLIOS,
+    label_field="name",
+    value_field="total_portfolio_value",
+    dataset_label="Portfolio Value (₹ Crores)",
+    background_color="rgba(54, 162, 235, 0.6)"
+)
+
+RM_AUM_CHART = ChartSpec(
+    name="rm_aum",
+    chart_type="pie",
+    title="Portfolio Distribution by Relationship Manager",
+    query=PORTFOLIO_BY_RELATIONSHIP_MANAGER,
+    label_field="manager_name",
+    value_field="total_aum",
+    background_color=[
+        "rgba(255, 99, 132, 0.6)",
+        "rgba(54, 162, 235, 0.6)",
+        "rgba(255, 205, 86, 0.6)",
+        "rgba(75, 192, 192, 0.6)",
+        "rgba(153, 102, 255, 0.6)"
+    ]
+)
+
+# Routing tables - first matching rule wins within each table
+MONGO_RULES = [
+    IntentRule(TOP_PORTFOLIOS, all_of=("top", "portfolio")),
+    IntentRule(TOP_RELATIONSHIP_MANAGERS, all_of=("relationship manager", "top")),
+    IntentRule(PORTFOLIO_BY_RELATIONSHIP_MANAGER, all_of=("relationship manager",)),
+    IntentRule(PORTFOLIO_OVERVIEW, all_of=("portfolio",)),
+]
+
+# Summaries before the generic transaction listing, which matches most transaction questions
+MYSQL_RULES = [
+    IntentRule(NET_FLOWS, any_of=("net flow", "inflow", "outflow")),
+    IntentRule(ASSET_TYPE_SUMMARY, any_of=("asset type", "asset class")),
+    IntentRule(TRANSACTION_VOLUME, all_of=("volume",)),
+    IntentRule(RECENT_TRANSACTIONS, any_of=("transaction", "trading")),
+]
+
+CHART_RULES = [
+    IntentRule(TOP_PORTFOLIOS_CHART, all_of=("portfolio", "top")),
+    IntentRule(RM_AUM_CHART, all_of=("relationship manager",)),
+]
+
+# Question patterns -> knowledge base chunk categories (sample_data/vector_data.py);
+# every matching rule contributes, and no match searches all categories
+KNOWLEDGE_CATEGORY_RULES = [
+    (re.compile(r"\btax|\b80c\b|\belss\b|deduction"), ("tax_planning",)),
+    (re.compile(r"\brisk (tolerance|profile|appetite|assessment)|\bconservative|\baggressive"),
+     ("risk_assessment", "client_profiling")),
+    (re.compile(r"\ballocat|\bdiversif"), ("asset_allocation",)),
+    (re.compile(r"\breal estate|\breits?\b|\bpropert"), ("real_estate",)),
+    (re.compile(r"\bemergency fund|\bliquidity"), ("liquidity_management",)),
+    (re.compile(r"\binternational|\bglobal|\bforeign|\boverseas"), ("international_investing",)),
+    (re.compile(r"\bcrypto|\bbitcoin|\bethereum"), ("cryptocurrency",)),
+    (re.compile(r"\binsurance"), ("insurance_planning",)),
+    (re.compile(r"\bestate planning|\b(a|my|your) will\b|\bwills\b|\bsuccession|\btrusts?\b|\bnominat"), ("estate_planning",)),
+    (re.compile(r"\bbenchmark|\bnifty|\bsharpe"), ("performance_measurement", "performance_metrics")),
+    (re.compile(r"\brebalanc|\bharvest"), ("portfolio_management",)),
+    (re.compile(r"\besg\b|\bsustainab"), ("esg_investing",)),
+    (re.compile(r"\bcash flow|\birregular income|\bwithdrawal"), ("cash_flow_planning",)),
+    (re.compile(r"p/e\b|\bdue diligence|\bfundamental analysis|\bdebt-to-equity"), ("equity_analysis",)),
+    (re.compile(r"\basset class"), ("asset_classes",)),
+]
+
+def knowledge_categories(question: str) -> Tuple[str, ...]:
+    """Categories of every matching KNOWLEDGE_CATEGORY_RULES pattern, in rule order"""
+    question_lower = question.lower()
+    categories = {}
+    for pattern, targets in KNOWLEDGE_CATEGORY_RULES:
+        if pattern.search(question_lower):
+            categories.update(dict.fromkeys(targets))
+    return tuple(categories)
+
+class IntentRouter:
+    """Classifies a question into a QueryPlan from declarative routing tables
+    
+    Each rule table is evaluated against one keyword bitmask, so adding an intent
+    is a table entry rather than another if/elif chain in every stage. The rule
+    matches for each distinct mask are computed once and reused.
+    """
+
+    def __init__(self, mongo_rules: Sequence[IntentRule], mysql_rules: Sequence[IntentRule],
+                 chart_rules: Sequence[IntentRule]):
+        vocabulary = sorted({
+            keyword
+            for rule in list(mongo_rules) + list(mysql_rules) + list(chart_rules)
+            for keyword in rule.all_of + rule.any_of
+        })
+        self._bits = {keyword: 1 << index for index, keyword in enumerate(vocabulary)}
+        self._vocabulary = tuple(self._bits.items())
+        self._mongo = self._compile(mongo_rules)
+        self._mysql = self._compile(mysql_rules)
+        self._charts = self._compile(chart_rules)
+        # Keyword mask -> (mongo, mysql, chart); at most 2 ** len(vocabulary) entries
+        self._routes: Dict[int, Tuple] = {}
+
+    def _compile(self, rules: Sequence[IntentRule]):
+        return [
+            (sum(self._bits[k] for k in rule.all_of), sum(self._bits[k] for k in rule.any_of), rule.target)
+            for rule in rules
+        ]
+
+    def routes(self, question: str) -> Tuple:
+        """The (mongo, mysql, chart) targets selected for a question"""
+        # Keywords match as substrings, like the checks they replaced ("portfolios" contains "portfolio")
+        question_lower = question.lower()
+        mask = 0
+        for keyword, bit in self._vocabulary:
+            if keyword in question_lower:
+                mask |= bit
+        routes = self._routes.get(mask)
+        if routes is None:
+            routes = self._routes[mask] = (
+                _first_match(self._mongo, mask),
+                _first_match(self._mysql, mask),
+                _first_match(self._charts, mask)
+            )
+        return routes
+
+    def classify(self, question: str) -> QueryPlan:
+        """Build the query plan for a question"""
+        mongo, mysql, chart = self.routes(question)
+        return QueryPlan(question, mongo, mysql, chart)
+
+def _first_match(compiled_rules, mask: int):
+    for all_mask, any_mask, target in compiled_rules:
+        if mask & all_mask == all_mask and (not any_mask or mask & any_mask):
+            return target
+    return None
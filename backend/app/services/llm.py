@@ -0,0 +1,187 @@
+import asyncio
+import random
+import re
+from typing import AsyncIterator, Tuple
+import httpx
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_model(model: str) -> Tuple[str, str]:
+    """Split LLM_MODEL into (provider, model name); a bare name is a Cohere model"""
+    provider, separator, name = model.partition("/")
+    if not separator:
+        return "cohere", model
+    return provider.lower(), name
+
+class LLMClient:
+    """Provider-independent part of the LLM client shared by every request on the worker
+
+    Caps concurrent generations per worker; providers implement `_generate`
+    and `_stream`.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.semaphore = None
+
+    async def start(self):
+        # Cap concurrent generations so a burst can't exhaust the pool or the API quota
+        self.semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+    async def close(self):
+        pass
+
+    async def generate(self, prompt: str) -> str:
+        """Generate a completion for the prompt, yielding the event loop while waiting"""
+        if self.semaphore is None:
+            raise RuntimeError("LLM client not started")
+
+        async with self.semaphore:
+            return await self._generate(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield completion tokens for the prompt as soon as the provider sends them"""
+        if self.semaphore is None:
+            raise RuntimeError("LLM client not started")
+
+        async with self.semaphore:
+            async for token in self._stream(prompt):
+                yield token
+
+    async def _generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def _stream(self, prompt: str) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+class CohereLLMClient(LLMClient):
+    """Long-lived async Cohere client over a pooled HTTP connection"""
+
+    def __init__(self, model: str):
+        super().__init__(model)
+        self.http_client = None
+        self.client = None
+
+    async def start(self):
+        """Open the pooled HTTP connection and the Cohere client"""
+        import cohere
+
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=settings.LLM_TIMEOUT
+        )
+        self.client = cohere.AsyncClient(
+            api_key=settings.COHERE_API_KEY,
+            httpx_client=self.http_client,
+            timeout=settings.LLM_TIMEOUT
+        )
+        await super().start()
+        logger.info(f"✅ LLM client ready (cohere/{self.model})")
+
+    async def close(self):
+        """Close the pooled HTTP connections"""
+        if self.http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+            self.client = None
+            logger.info("🔌 LLM client closed")
+
+    async def _generate(self, prompt: str) -> str:
+        response = await self.client.generate(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=settings.MAX_TOKENS,
+            temperature=settings.TEMPERATURE
+        )
+
+        if response and response.generations:
+            return response.generations[0].text.strip()
+        return ""
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        async for event in self.client.generate_stream(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=settings.MAX_TOKENS,
+            temperature=settings.TEMPERATURE
+        ):
+            if event.event_type == "text-generation":
+                yield event.text
+            elif event.event_type == "stream-error":
+                raise RuntimeError(f"Cohere stream error: {event.err}")
+
+class LocalLLMClient(LLMClient):
+    """Offline stand-in that answers with templated text at a simulated speed
+
+    Each call waits a time-to-first-token of LOCAL_LLM_LATENCY_MS plus an
+    exponentially distributed LOCAL_LLM_LATENCY_JITTER_MS (a long tail like a
+    real API), then emits LOCAL_LLM_ANSWER_TOKENS words at
+    LOCAL_LLM_TOKENS_PER_SECOND. A LOCAL_LLM_ERROR_RATE fraction of calls
+    fail. Draws come from one generator seeded with LOCAL_LLM_SEED, so a run
+    with the same request order is reproducible.
+    """
+
+    FILLER = (
+        "The portfolio data above indicates a diversified allocation across equity, debt "
+        "and alternative assets with risk levels in line with each client's stated appetite "
+        "and a recommendation to review concentration and rebalance periodically"
+    ).split()
+
+    def __init__(self, model: str):
+        super().__init__(model)
+        self.random = random.Random(settings.LOCAL_LLM_SEED)
+
+    async def start(self):
+        await super().start()
+        logger.info(
+            f"✅ LLM client ready (local/{self.model}: {settings.LOCAL_LLM_LATENCY_MS:.0f}ms "
+            f"+ {settings.LOCAL_LLM_TOKENS_PER_SECOND:.0f} tokens/s, error rate {settings.LOCAL_LLM_ERROR_RATE})"
+        )
+
+    def _answer_tokens(self, prompt: str):
+        match = re.search(r"^Question: (.*)$", prompt, re.MULTILINE)
+        question = match.group(1).strip() if match else "your question"
+        tokens = f"[{self.model}] Answer to: {question}.".split()
+        count = min(settings.LOCAL_LLM_ANSWER_TOKENS, settings.MAX_TOKENS)
+        tokens.extend(self.FILLER[i % len(self.FILLER)] for i in range(max(count - len(tokens), 0)))
+        return [f"{token} " for token in tokens[:count]]
+
+    def _first_token_delay(self) -> float:
+        jitter = settings.LOCAL_LLM_LATENCY_JITTER_MS
+        delay = settings.LOCAL_LLM_LATENCY_MS + (self.random.expovariate(1 / jitter) if jitter > 0 else 0)
+        return delay / 1000
+
+    def _maybe_fail(self):
+        if self.random.random() < settings.LOCAL_LLM_ERROR_RATE:
+            raise RuntimeError("Injected local LLM error")
+
+    async def _generate(self, prompt: str) -> str:
+        tokens = self._answer_tokens(prompt)
+        await asyncio.sleep(self._first_token_delay())
+        self._maybe_fail()
+        await asyncio.sleep(len(tokens) / settings.LOCAL_LLM_TOKENS_PER_SECOND)
+        return "".join(tokens).strip()
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        tokens = self._answer_tokens(prompt)
+        await asyncio.sleep(self._first_token_delay())
+        self._maybe_fail()
+        interval = 1 / settings.LOCAL_LLM_TOKENS_PER_SECOND
+        for token in tokens:
+            yield token
+            await asyncio.sleep(interval)
+
+def create_llm_client() -> LLMClient:
+    """Build the LLM client for the provider named in LLM_MODEL ("cohere/..." or "local/...")"""
+    provider, model = parse_model(settings.LLM_MODEL)
+    if provider == "local":
+        return LocalLLMClient(model)
+    if provider == "cohere":
+        return CohereLLMClient(model)
+    raise ValueError(f"Unknown LLM provider '{provider}' in LLM_MODEL={settings.LLM_MODEL}")
@@ -0,0 +1,176 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TEMPLATE = """
+You are an expert wealth management analyst for a high-net-worth asset management firm.
+You help analyze portfolios for film stars and sports personalities who have invested 100+ crores.
+
+Context from knowledge base:
+{context}
+
+Relevant data from databases:
+{database_data}
+
+Question: {question}
+
+Please provide a comprehensive answer that:
+1. Analyzes the relevant data from the context and databases
+2. Presents the information in a clear, business-friendly format
+3. Includes specific numbers and insights where relevant
+4. Suggests actionable recommendations when appropriate
+
+Answer:
+"""
+
+# Fields removed first when a prompt is over budget, least useful to an answer first
+LOW_VALUE_FIELDS = [
+    "_id", "contact", "phone", "email", "address", "created_at", "last_updated",
+    "updated_at", "join_date", "settlement_date", "transaction_id", "broker",
+    "exchange", "notes", "investment_preferences", "gender", "age",
+]
+
+@dataclass
+class DataSection:
+    """Rows returned by one database for the prompt; without rows, `label` is the status message"""
+    source: str
+    label: str
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+
+@dataclass
+class PromptStats:
+    budget: int
+    tokens_used: int = 0
+    tokens_dropped: int = 0
+    fields_dropped: List[str] = field(default_factory=list)
+    rows_dropped: int = 0
+    chunks_dropped: int = 0
+    over_budget: bool = False
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+class TokenCounter:
+    """Counts tokens with tiktoken, falling back to ~4 characters per token if it can't load"""
+
+    def __init__(self, encoding_name: str):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._load_failed = False
+
+    def count(self, text: str) -> int:
+        if self._encoding is None and not self._load_failed:
+            self._load()
+        if self._encoding is None:
+            return (len(text) + 3) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def _load(self):
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        except Exception as e:
+            logger.warning(f"tiktoken encoding '{self.encoding_name}' unavailable, estimating tokens: {e}")
+            self._load_failed = True
+
+def render_rows_json(rows: List[Dict[str, Any]]) -> str:
+    return json.dumps(rows, default=str)
+
+class PromptBuilder:
+    """Packs knowledge context and database rows into the prompt under a token budget
+
+    When the prompt is over budget, content is trimmed from the least to the most
+    valuable: low-value fields first, then the lowest-ranked knowledge chunks,
+    then the trailing (lowest-ranked) rows of the largest data section. The
+    question and instructions are never trimmed.
+    """
+
+    def __init__(self, budget: int, counter: TokenCounter,
+                 render_rows: Callable[[List[Dict[str, Any]]], str] = render_rows_json,
+                 template: str = PROMPT_TEMPLATE):
+        self.budget = budget
+        self.counter = counter
+        self.render_rows = render_rows
+        self.template = template
+
+    def render_section(self, section: DataSection) -> str:
+        if not section.rows:
+            return f"{section.source}: {section.label}"
+        return f"{section.source}: {section.label}: {self.render_rows(section.rows)}"
+
+    def render(self, question: str, chunks: Sequence[str], sections: Sequence[DataSection]) -> str:
+        return self.template.format(
+            context="\n".join(chunks),
+            database_data="\n".join(self.render_section(section) for section in sections),
+            question=question
+        )
+
+    def build(self, question: str, chunks: Sequence[str],
+              sections: Sequence[DataSection]) -> Tuple[str, PromptStats]:
+        """Return the prompt and a report of the tokens used and dropped"""
+        chunks = list(chunks)
+        # Rows may be shared with other consumers of the same read, trim copies
+        sections = [
+            DataSection(section.source, section.label, [dict(row) for row in section.rows])
+            for section in sections
+        ]
+        stats = PromptStats(budget=self.budget)
+
+        prompt = self.render(question, chunks, sections)
+        original_tokens = tokens = self.counter.count(prompt)
+
+        for field_name in LOW_VALUE_FIELDS:
+            if tokens <= self.budget:
+                break
+            removed = False
+            for section in sections:
+                for row in section.rows:
+                    if row.pop(field_name, None) is not None:
+                        removed = True
+            if removed:
+                stats.fields_dropped.append(field_name)
+                prompt = self.render(question, chunks, sections)
+                tokens = self.counter.count(prompt)
+
+        # Keep the most relevant chunk until the rows have been trimmed too
+        while tokens > self.budget and len(chunks) > 1:
+            chunks.pop()
+            stats.chunks_dropped += 1
+            prompt = self.render(question, chunks, sections)
+            tokens = self.counter.count(prompt)
+
+        while tokens > self.budget and any(section.rows for section in sections):
+            largest = max(sections, key=lambda section: len(section.rows))
+            # Binary search the longest prefix of the ranked rows that fits
+            rows = largest.rows
+            low, high = 0, len(rows) - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                largest.rows = rows[:middle]
+                if self.counter.count(self.render(question, chunks, sections)) <= self.budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            largest.rows = rows[:low]
+            stats.rows_dropped += len(rows) - low
+            prompt = self.render(question, chunks, sections)
+            tokens = self.counter.count(prompt)
+
+        if tokens > self.budget and chunks:
+            stats.chunks_dropped += len(chunks)
+            chunks = []
+            prompt = self.render(question, chunks, sections)
+            tokens = self.counter.count(prompt)
+
+        stats.tokens_used = tokens
+        stats.tokens_dropped = original_tokens - tokens
+        stats.over_budget = tokens > self.budget
+        if stats.tokens_dropped:
+            logger.info(
+                f"Prompt trimmed to {tokens}/{self.budget} tokens: dropped {stats.tokens_dropped} tokens "
+                f"({stats.rows_dropped} rows, {stats.chunks_dropped} chunks, fields {stats.fields_dropped})"
+            )
+        return prompt, stats
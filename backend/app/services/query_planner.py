@@ -0,0 +1,533 @@
+"""Text-to-query planning for questions the intent router has no rule for"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.lru import LRUCache
+from app.core.single_flight import SingleFlight
+from app.core.text import normalize_question
+from app.services.intent import MongoQuery, SQLQuery
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields the planner may read, per MongoDB collection and MySQL table
+MONGO_SCHEMA = {
+    "clients": (
+        "client_id", "name", "type", "age", "gender", "location", "risk_tolerance",
+        "risk_appetite", "investment_horizon", "total_portfolio_value", "annual_income",
+        "relationship_manager_id", "relationship_manager_name",
+    ),
+    "portfolio_holdings": (
+        "client_id", "stock_symbol", "stock_name", "quantity", "avg_price", "current_price",
+        "current_value", "gain_loss", "gain_loss_percent",
+    ),
+}
+
+SQL_SCHEMA = {
+    "transactions": (
+        "transaction_id", "client_id", "transaction_type", "asset_type", "asset_name", "symbol",
+        "quantity", "price_per_unit", "total_amount", "fees", "transaction_date",
+        "settlement_date", "status",
+    ),
+}
+
+# Read-only aggregation stages; anything that writes ($out, $merge) or runs code is rejected
+ALLOWED_STAGES = frozenset({
+    "$match", "$group", "$sort", "$limit", "$skip", "$project", "$count", "$unwind",
+    "$addFields", "$lookup",
+})
+FORBIDDEN_OPERATORS = frozenset({"$where", "$function", "$accumulator", "$out", "$merge"})
+
+SQL_FORBIDDEN = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|REPLACE|DROP|ALTER|CREATE|TRUNCATE|RENAME|GRANT|REVOKE|CALL|DO|"
+    r"HANDLER|LOAD|LOCK|UNLOCK|SET|INTO|OUTFILE|DUMPFILE|SLEEP|BENCHMARK|FOR)\b",
+    re.IGNORECASE
+)
+SQL_STRING = r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\""
+SQL_TOKEN = re.compile(
+    rf"\s*(?:(?P<string>{SQL_STRING})"
+    r"|(?P<placeholder>%s)"
+    r"|(?P<number>\d+(?:\.\d+)?)"
+    r"|(?P<name>`\w+`|[A-Za-z_]\w*)"
+    r"|(?P<symbol><=|>=|<>|!=|[(),.*=<>+\-/]))"
+)
+SQL_KEYWORDS = frozenset({
+    "SELECT", "DISTINCT", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "BETWEEN",
+    "AS", "ON", "JOIN", "INNER", "LEFT", "RIGHT", "OUTER", "CROSS", "GROUP", "BY", "ORDER", "ASC", "DESC",
+    "HAVING", "LIMIT", "OFFSET", "CASE", "WHEN", "THEN", "ELSE", "END", "INTERVAL", "DAY", "WEEK", "MONTH",
+    "QUARTER", "YEAR", "TRUE", "FALSE", "CURRENT_DATE", "CURRENT_TIMESTAMP",
+})
+SQL_FUNCTIONS = frozenset({
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "ROUND", "ABS", "COALESCE", "IFNULL", "NULLIF", "IF", "GREATEST",
+    "LEAST", "DATE", "YEAR", "MONTH", "DAY", "WEEK", "QUARTER", "NOW", "CURDATE", "DATE_SUB", "DATE_ADD",
+    "DATEDIFF", "LOWER", "UPPER", "TRIM", "LENGTH", "CONCAT",
+})
+# Clauses that end the FROM clause
+SQL_FROM_END = frozenset({"WHERE", "GROUP", "ORDER", "HAVING", "LIMIT"})
+# LIMIT count | LIMIT offset, count | LIMIT count OFFSET offset, each a number or a placeholder
+SQL_LIMIT = re.compile(
+    r"\s+LIMIT\s+(?P<first>\d+|%s)(?:\s*,\s*(?P<second>\d+|%s)|\s+OFFSET\s+(?P<offset>\d+|%s))?\s*$",
+    re.IGNORECASE
+)
+
+# Literal values in a question become placeholders, so "holdings of client_007" and
+# "holdings of client_042" share one plan
+PARAMETER_PATTERN = re.compile(
+    r"\"(?P<quoted>[^\"]+)\""
+    r"|(?P<client_id>\bclient_\d+\b)"
+    r"|(?P<date>\b\d{4}-\d{2}-\d{2}\b)"
+    r"|(?P<number>\b\d+(?:\.\d+)?\b)",
+    re.IGNORECASE
+)
+PLACEHOLDER_PATTERN = re.compile(r"^<p(\d+)>$")
+
+PLANNER_PROMPT = """
+You translate questions about a wealth management firm's data into one read-only database query.
+
+MongoDB collections (fields):
+{mongo_schema}
+
+MySQL tables (columns):
+{sql_schema}
+
+Values in the question were replaced by placeholders <p0>, <p1>, ... Use a placeholder
+wherever its value belongs; never inline the values themselves.
+Placeholders: {placeholders}
+
+Question template: {template}
+
+Read only the listed fields. In SQL, join tables with JOIN ... ON, name computed
+columns with AS, and do not use subqueries or SELECT *.
+
+Reply with a single JSON object and nothing else, in one of these forms:
+{{"source": "mongodb", "collection": "<collection>", "label": "<short description>", "pipeline": [<aggregation stages>]}}
+{{"source": "mysql", "label": "<short description>", "sql": "SELECT ... WHERE client_id = %s", "params": ["<p0>"]}}
+{{"source": "none"}} if the question is not answerable from these schemas.
+"""
+
+class PlanRejected(ValueError):
+    """A generated plan failed validation"""
+
+@dataclass(frozen=True)
+class PlanTemplate:
+    """A validated plan whose literal values are still <pN> placeholders"""
+    source: str  # "mongodb", "mysql" or "none"
+    label: str = ""
+    collection: Optional[str] = None
+    pipeline: Optional[List[Dict[str, Any]]] = None
+    sql: Optional[str] = None  # Without its LIMIT, which is clamped to max_rows when bound
+    params: Tuple[Any, ...] = ()
+    limit: Any = None  # Row count: a number, a placeholder or None for max_rows
+    offset: Any = None
+
+UNANSWERABLE = PlanTemplate(source="none")
+
+def templatize(question: str) -> Tuple[str, Tuple[Any, ...]]:
+    """Replace the literal values in a question by placeholders
+
+    Returns the normalized template and the values in placeholder order.
+    """
+    values = []
+
+    def substitute(match: re.Match) -> str:
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "client_id":
+            # Stored lowercase; MySQL compares case-insensitively but MongoDB doesn't, and
+            # transaction filters lowercase them too
+            value = value.lower()
+        values.append(value)
+        return f"<p{len(values) - 1}>"
+
+    template = PARAMETER_PATTERN.sub(substitute, question)
+    return normalize_question(template), tuple(values)
+
+def parse_plan(text: str) -> Dict[str, Any]:
+    """Extract the JSON object from an LLM reply, tolerating code fences and prose around it"""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise PlanRejected("No JSON object in planner reply")
+    try:
+        plan = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise PlanRejected(f"Invalid JSON in planner reply: {e}")
+    if not isinstance(plan, dict):
+        raise PlanRejected("Planner reply is not a JSON object")
+    return plan
+
+def validate_plan(plan: Dict[str, Any], parameter_count: int, max_rows: int) -> PlanTemplate:
+    """Check a parsed plan against the schemas and the read-only rules"""
+    source = plan.get("source")
+    label = str(plan.get("label") or "Planned query")[:80]
+    if source == "none":
+        return UNANSWERABLE
+    if source == "mongodb":
+        collection = plan.get("collection")
+        if collection not in MONGO_SCHEMA:
+            raise PlanRejected(f"Unknown collection '{collection}'")
+        pipeline = plan.get("pipeline")
+        if not isinstance(pipeline, list) or not pipeline:
+            raise PlanRejected("Pipeline must be a non-empty list of stages")
+        for stage in pipeline:
+            _validate_stage(stage)
+        _validate_fields(collection, pipeline)
+        _validate_placeholders(pipeline, parameter_count)
+        if not any("$limit" in stage for stage in pipeline):
+            pipeline = pipeline + [{"$limit": max_rows}]
+        pipeline = _restrict_fields(collection, pipeline)
+        return PlanTemplate(source="mongodb", label=label, collection=collection, pipeline=pipeline)
+    if source == "mysql":
+        sql = plan.get("sql")
+        if not isinstance(sql, str):
+            raise PlanRejected("SQL must be a string")
+        sql = _validate_sql(sql)
+        params = plan.get("params") or []
+        if not isinstance(params, list) or sql.count("%s") != len(params):
+            raise PlanRejected("SQL placeholders and params do not match")
+        _validate_placeholders(params, parameter_count)
+        sql, params, limit, offset = _split_limit(sql, params)
+        return PlanTemplate(source="mysql", label=label, sql=sql, params=tuple(params), limit=limit, offset=offset)
+    raise PlanRejected(f"Unknown source '{source}'")
+
+def _validate_stage(stage: Any):
+    if not isinstance(stage, dict) or len(stage) != 1:
+        raise PlanRejected("Each pipeline stage must be an object with one operator")
+    (operator, body), = stage.items()
+    if operator not in ALLOWED_STAGES:
+        raise PlanRejected(f"Stage '{operator}' is not allowed")
+    if operator == "$lookup":
+        if not isinstance(body, dict) or body.get("from") not in MONGO_SCHEMA or "pipeline" in body:
+            raise PlanRejected("$lookup may only join a known collection by field")
+    _reject_operators(body)
+
+def _validate_fields(collection: str, pipeline: List[Dict[str, Any]]):
+    """Reject field paths outside MONGO_SCHEMA, other than fields the pipeline itself defines"""
+    known = set(MONGO_SCHEMA[collection]) | {"_id"}
+    joined: Dict[str, Tuple[str, ...]] = {}  # $lookup `as` -> fields of the joined collection
+
+    def field(path: Any):
+        if not isinstance(path, str):
+            raise PlanRejected("Field paths must be strings")
+        root, _, rest = path.partition(".")
+        if root in joined:
+            if rest and rest.split(".")[0] not in joined[root]:
+                raise PlanRejected(f"Field '{path}' is not readable")
+        elif root not in known:
+            raise PlanRejected(f"Field '{path}' is not readable")
+
+    def expression(value: Any):
+        if isinstance(value, str):
+            if value.startswith("$") and not value.startswith("$$"):
+                field(value[1:])
+        elif isinstance(value, dict):
+            for item in value.values():
+                expression(item)
+        elif isinstance(value, list):
+            for item in value:
+                expression(item)
+
+    def query(conditions: Any):
+        if not isinstance(conditions, dict):
+            raise PlanRejected("$match conditions must be an object")
+        for key, item in conditions.items():
+            if key in ("$and", "$or", "$nor") and isinstance(item, list):
+                for condition in item:
+                    query(condition)
+            elif key == "$expr":
+                expression(item)
+            elif key.startswith("$"):
+                raise PlanRejected(f"Operator '{key}' is not allowed in $match")
+            else:
+                field(key)
+                expression(item)
+
+    for stage in pipeline:
+        (operator, body), = stage.items()
+        if operator == "$match":
+            query(body)
+        elif operator in ("$group", "$addFields"):
+            if not isinstance(body, dict):
+                raise PlanRejected(f"{operator} must be an object")
+            expression(list(body.values()))
+            known.update(body)
+        elif operator == "$project":
+            if not isinstance(body, dict):
+                raise PlanRejected("$project must be an object")
+            for key, item in body.items():
+                if isinstance(item, (bool, int)):
+                    field(key)
+                else:
+                    expression(item)
+                    known.add(key.split(".")[0])
+        elif operator == "$sort":
+            if not isinstance(body, dict):
+                raise PlanRejected("$sort must be an object")
+            for key in body:
+                field(key)
+        elif operator == "$unwind":
+            expression(body.get("path") if isinstance(body, dict) else body)
+        elif operator == "$count":
+            if not isinstance(body, str):
+                raise PlanRejected("$count takes a field name")
+            known.add(body)
+        elif operator == "$lookup":
+            foreign = MONGO_SCHEMA[body["from"]]
+            if body.get("foreignField") not in foreign or not isinstance(body.get("as"), str):
+                raise PlanRejected("$lookup must join on a readable field into a named field")
+            field(body.get("localField"))
+            joined[body["as"]] = foreign
+
+def _restrict_fields(collection: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Confine the pipeline to MONGO_SCHEMA fields, so unlisted fields (contact details)
+    never reach the prompt, even through fields a stage copies wholesale
+    """
+    restricted = [{"$project": {"_id": 0, **{name: 1 for name in MONGO_SCHEMA[collection]}}}]
+    for stage in pipeline:
+        restricted.append(stage)
+        if "$lookup" in stage:
+            lookup = stage["$lookup"]
+            restricted.append({"$addFields": {lookup["as"]: {"$map": {
+                "input": f"${lookup['as']}",
+                "in": {name: f"$$this.{name}" for name in MONGO_SCHEMA[lookup["from"]]}
+            }}}})
+    return restricted
+
+def _reject_operators(value: Any):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in FORBIDDEN_OPERATORS:
+                raise PlanRejected(f"Operator '{key}' is not allowed")
+            _reject_operators(item)
+    elif isinstance(value, list):
+        for item in value:
+            _reject_operators(item)
+
+def _validate_sql(sql: str) -> str:
+    sql = sql.strip().rstrip(";").strip()
+    if not re.match(r"SELECT\b", sql, re.IGNORECASE):
+        raise PlanRejected("Only SELECT statements are allowed")
+    if "<p" in sql:
+        raise PlanRejected("Placeholders belong in params, not in the SQL text")
+    if re.search(r"%(?!s)", sql):
+        raise PlanRejected("Literal '%' is not allowed; pass patterns as params")
+    # Keywords and comment markers only count outside string literals ("WHERE status = 'FOR REVIEW'");
+    # an unterminated quote is left in place and rejected by the tokenizer
+    code = re.sub(SQL_STRING, "''", sql)
+    if ";" in code or "--" in code or "/*" in code or "#" in code:
+        raise PlanRejected("SQL must be a single statement without comments")
+    forbidden = SQL_FORBIDDEN.search(code)
+    if forbidden:
+        raise PlanRejected(f"Keyword '{forbidden.group(1).upper()}' is not allowed")
+    _validate_sql_references(_sql_tokens(sql))
+    return sql
+
+def _sql_tokens(sql: str) -> List[Tuple[str, str]]:
+    """(kind, text) tokens of a SELECT; anything outside the supported subset is rejected"""
+    tokens, position = [], 0
+    while position < len(sql):
+        match = SQL_TOKEN.match(sql, position)
+        if not match:
+            raise PlanRejected(f"Unsupported SQL near '{sql[position:position + 20].strip()}'")
+        kind = match.lastgroup
+        text = match.group(kind)
+        tokens.append((kind, text.strip("`") if kind == "name" else text))
+        position = match.end()
+    return tokens
+
+def _validate_sql_references(tokens: List[Tuple[str, str]]):
+    """Every table must be in SQL_SCHEMA and every column readable from the tables read"""
+    words = [text.upper() if kind == "name" else None for kind, text in tokens]
+    if words.count("SELECT") != 1 or "UNION" in words:
+        raise PlanRejected("Subqueries and UNION are not allowed")
+
+    def text_at(index: int) -> str:
+        return tokens[index][1] if 0 <= index < len(tokens) else ""
+
+    # Tables and their aliases; a comma or parenthesis in FROM would hide another table
+    tables: Dict[str, str] = {}
+    in_from, depth = False, 0
+    for index, (kind, text) in enumerate(tokens):
+        word = words[index]
+        if kind == "symbol" and text in "()":
+            depth += 1 if text == "(" else -1
+        elif word in ("FROM", "JOIN"):
+            in_from = True
+            table = text_at(index + 1)
+            if words[index + 1:index + 2] == [None] or table not in SQL_SCHEMA or text_at(index + 2) == ".":
+                raise PlanRejected(f"Query may only read {', '.join(SQL_SCHEMA)}")
+            tables[table] = table
+            alias = index + 3 if text_at(index + 2).upper() == "AS" else index + 2
+            if alias < len(tokens) and tokens[alias][0] == "name" and words[alias] not in SQL_KEYWORDS:
+                tables[tokens[alias][1]] = table
+        elif word in SQL_FROM_END and depth == 0:
+            in_from = False
+        elif kind == "symbol" and text == "," and in_from and depth == 0:
+            raise PlanRejected("Join tables with JOIN ... ON, not commas")
+    if not tables:
+        raise PlanRejected(f"Query may only read {', '.join(SQL_SCHEMA)}")
+
+    columns = set().union(*(SQL_SCHEMA[table] for table in tables.values()))
+    aliases = {text_at(index + 1) for index, word in enumerate(words) if word == "AS"}
+    for index, (kind, text) in enumerate(tokens):
+        previous, following = text_at(index - 1), text_at(index + 1)
+        if kind == "symbol" and text == "*":
+            if previous == "(" and words[index - 2] == "COUNT":
+                continue
+            if words[index - 1] in ("SELECT", "DISTINCT") or previous in (",", "."):
+                raise PlanRejected("Select named columns, not *")
+            continue
+        if kind != "name":
+            continue
+        word = words[index]
+        if following == "(" and word in SQL_FUNCTIONS:
+            continue
+        if word in SQL_KEYWORDS:
+            continue
+        if following == "(":
+            raise PlanRejected(f"Function '{text}' is not allowed")
+        if following == ".":
+            if text not in tables:
+                raise PlanRejected(f"Unknown table '{text}'")
+        elif previous == ".":
+            if text not in SQL_SCHEMA[tables[text_at(index - 2)]]:
+                raise PlanRejected(f"Column '{text}' is not readable")
+        elif text not in columns and text not in aliases and text not in tables:
+            raise PlanRejected(f"Column '{text}' is not readable")
+
+def _split_limit(sql: str, params: List[Any]) -> Tuple[str, List[Any], Any, Any]:
+    """Separate a trailing LIMIT from the SQL, with the params its %s placeholders take"""
+    match = SQL_LIMIT.search(sql)
+    if match is None:
+        if re.search(r"\bLIMIT\b", sql, re.IGNORECASE):
+            raise PlanRejected("LIMIT must end the query and take numbers or placeholders")
+        return sql, params, None, None
+    terms = [match.group(name) for name in ("first", "second", "offset")]
+    placeholders = terms.count("%s")
+    limit_params = iter(params[len(params) - placeholders:])
+    values = [None if term is None else next(limit_params) if term == "%s" else int(term) for term in terms]
+    first, second, offset = values
+    # LIMIT offset, count puts the count second
+    limit, offset = (second, first) if second is not None else (first, offset)
+    return sql[:match.start()], params[:len(params) - placeholders], limit, offset
+
+def row_limit(value: Any, max_rows: int) -> int:
+    """A requested row count clamped to 1..max_rows; anything that is not a positive integer gets max_rows"""
+    try:
+        rows = int(value)
+    except (TypeError, ValueError):
+        return max_rows
+    return min(rows, max_rows) if rows > 0 else max_rows
+
+def _validate_placeholders(value: Any, parameter_count: int):
+    if isinstance(value, str):
+        match = PLACEHOLDER_PATTERN.match(value)
+        if match and int(match.group(1)) >= parameter_count:
+            raise PlanRejected(f"Placeholder {value} has no value")
+    elif isinstance(value, dict):
+        for item in value.values():
+            _validate_placeholders(item, parameter_count)
+    elif isinstance(value, list):
+        for item in value:
+            _validate_placeholders(item, parameter_count)
+
+def bind(value: Any, parameters: Sequence[Any]) -> Any:
+    """Substitute the question's values for the placeholders in a plan template"""
+    if isinstance(value, str):
+        match = PLACEHOLDER_PATTERN.match(value)
+        return parameters[int(match.group(1))] if match else value
+    if isinstance(value, dict):
+        return {key: bind(item, parameters) for key, item in value.items()}
+    if isinstance(value, list):
+        return [bind(item, parameters) for item in value]
+    return value
+
+class QueryPlanner:
+    """Turns questions into validated read-only MongoDB or MySQL queries with the LLM
+
+    Plans are cached by question template, so a question that differs from an
+    earlier one only in its values ("holdings of client_007" vs "client_042")
+    is bound to the cached plan without another LLM call. Questions the LLM
+    could not plan are cached too. A plan that failed validation may be a bad
+    generation rather than a bad question, so it is retried after
+    `rejected_ttl_seconds`.
+    """
+
+    def __init__(self, llm_client, max_entries: int, ttl_seconds: float, max_rows: int,
+                 rejected_ttl_seconds: float = 60.0):
+        self.llm_client = llm_client
+        self.max_rows = max_rows
+        self.plans = LRUCache(max_entries, ttl_seconds)
+        self.rejections = LRUCache(max_entries, rejected_ttl_seconds)
+        self.flights = SingleFlight()
+        self.planned = 0
+        self.rejected = 0
+
+    async def plan(self, question: str) -> Optional[Union[MongoQuery, SQLQuery]]:
+        """Return the query answering the question, or None if it has no database answer"""
+        template, parameters = templatize(question)
+        plan_template = self.plans.get(template) or self.rejections.get(template)
+        if plan_template is None:
+            # Concurrent questions with the same template share one planning call
+            plan_template, _ = await self.flights.do(
+                template, lambda: self._plan_template(template, len(parameters))
+            )
+
+        if plan_template.source == "mongodb":
+            pipeline = [
+                {"$limit": row_limit(stage["$limit"], self.max_rows)} if "$limit" in stage else stage
+                for stage in bind(plan_template.pipeline, parameters)
+            ]
+            return MongoQuery(
+                name="planned_mongodb",
+                label=plan_template.label,
+                collection=plan_template.collection,
+                pipeline=pipeline,
+                limit=self.max_rows
+            )
+        if plan_template.source == "mysql":
+            limit, offset = bind([plan_template.limit, plan_template.offset], parameters)
+            sql = f"{plan_template.sql} LIMIT {row_limit(limit, self.max_rows)}"
+            try:
+                offset = max(int(offset or 0), 0)
+            except (TypeError, ValueError):
+                offset = 0
+            if offset:
+                sql = f"{sql} OFFSET {offset}"
+            return SQLQuery(
+                name="planned_mysql",
+                label=plan_template.label,
+                sql=sql,
+                params=tuple(bind(list(plan_template.params), parameters))
+            )
+        return None
+
+    async def _plan_template(self, template: str, parameter_count: int) -> PlanTemplate:
+        prompt = PLANNER_PROMPT.format(
+            mongo_schema=_describe(MONGO_SCHEMA),
+            sql_schema=_describe(SQL_SCHEMA),
+            placeholders=", ".join(f"<p{index}>" for index in range(parameter_count)) or "none",
+            template=template
+        )
+        reply = await self.llm_client.generate(prompt)
+        try:
+            plan_template = validate_plan(parse_plan(reply), parameter_count, self.max_rows)
+        except PlanRejected as e:
+            logger.warning(f"Rejected query plan for '{template}': {e}")
+            self.rejected += 1
+            self.rejections.set(template, UNANSWERABLE)
+            return UNANSWERABLE
+        self.planned += 1
+        self.plans.set(template, plan_template)
+        return plan_template
+
+    def stats(self) -> dict:
+        return {**self.plans.stats(), "planned": self.planned, "rejected": self.rejected,
+                "rejections_cached": len(self.rejections)}
+
+def _describe(schema: Dict[str, Tuple[str, ...]]) -> str:
+    return "\n".join(f"- {name}: {', '.join(fields)}" for name, fields in schema.items())
@@ -0,0 +1,46 @@
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+def format_value(value: Any) -> str:
+    """Render one cell compactly: short dates, trimmed numbers, flattened nesting"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if value.hour == value.minute == value.second == 0:
+            return value.strftime("%Y-%m-%d")
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (float, Decimal)):
+        # NaN and infinities (e.g. from MongoDB doubles) have no integer form
+        if not (value.is_finite() if isinstance(value, Decimal) else math.isfinite(value)):
+            return str(value)
+        return str(int(value)) if value == int(value) else f"{float(value):.2f}"
+    if isinstance(value, dict):
+        return "; ".join(f"{key}={format_value(item)}" for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return ", ".join(format_value(item) for item in value)
+    return str(value).replace("|", "/").replace("\n", " ")
+
+def table_columns(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    """Union of the row keys in first-seen order"""
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+    return list(columns)
+
+def render_table(rows: Sequence[Dict[str, Any]], columns: Optional[List[str]] = None) -> str:
+    """Render result rows as a header line plus one pipe-separated line per row
+
+    Keys are written once instead of once per row, which roughly halves the
+    tokens of a typical result set compared with JSON.
+    """
+    if not rows:
+        return ""
+    columns = columns or table_columns(rows)
+    lines = [" | ".join(columns)]
+    lines.extend(" | ".join(format_value(row.get(column)) for column in columns) for row in rows)
+    return "\n" + "\n".join(lines)
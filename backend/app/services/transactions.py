@@ -0,0 +1,223 @@
+"""Transaction summaries computed in MySQL
+
+Every query aggregates, filters and limits inside the database against the
+`transactions` schema created by insert_enhanced_data.py, so only the summary
+rows reach the application.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+TRANSACTION_TYPES = ("BUY", "SELL", "DIVIDEND", "INTEREST", "FEE")
+
+# Buys bring money into the portfolio, sells take it out
+NET_FLOW = "CASE transaction_type WHEN 'BUY' THEN total_amount WHEN 'SELL' THEN -total_amount ELSE 0 END"
+
+@dataclass(frozen=True)
+class DateRange:
+    """Half-open [start, end) window on transaction_date; a missing bound is unbounded"""
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    label: str = ""
+
+@dataclass(frozen=True)
+class TransactionFilter:
+    """Predicates pushed down into the WHERE clause of a transaction summary"""
+    date_range: Optional[DateRange] = None
+    client_id: Optional[str] = None
+    transaction_type: Optional[str] = None
+    date_unrecognized: bool = False  # The question named a period no window matched
+
+    def where(self) -> Tuple[str, Tuple[Any, ...]]:
+        """WHERE clause (empty if unfiltered) and its parameters"""
+        predicates, params = [], []
+        if self.date_range and self.date_range.start:
+            predicates.append("transaction_date >= %s")
+            params.append(self.date_range.start)
+        if self.date_range and self.date_range.end:
+            predicates.append("transaction_date < %s")
+            params.append(self.date_range.end)
+        if self.client_id:
+            predicates.append("client_id = %s")
+            params.append(self.client_id)
+        if self.transaction_type:
+            predicates.append("transaction_type = %s")
+            params.append(self.transaction_type)
+        clause = f" WHERE {' AND '.join(predicates)}" if predicates else ""
+        return clause, tuple(params)
+
+    def describe(self) -> str:
+        parts = [part for part in (
+            self.date_range.label if self.date_range else "",
+            "period not recognized, no date filter" if self.date_unrecognized else "",
+            self.client_id or "",
+            self.transaction_type or "",
+        ) if part]
+        return f" ({', '.join(parts)})" if parts else ""
+
+@dataclass(frozen=True)
+class TransactionSummary:
+    """A read of the transactions table with its aggregation pushed into MySQL"""
+    name: str
+    label: str
+    select: str
+    order_by: str
+    limit: int
+    group_by: Optional[str] = None
+
+    def render(self, filters: TransactionFilter) -> Tuple[str, Tuple[Any, ...]]:
+        """SQL and parameters for this summary under `filters`"""
+        where, params = filters.where()
+        group_by = f" GROUP BY {self.group_by}" if self.group_by else ""
+        sql = f"SELECT {self.select} FROM transactions{where}{group_by} ORDER BY {self.order_by} LIMIT {self.limit}"
+        return sql, params
+
+    def describe(self, filters: TransactionFilter) -> str:
+        return f"{self.label}{filters.describe()}"
+
+RECENT_TRANSACTIONS = TransactionSummary(
+    name="recent_transactions",
+    label="Recent transactions",
+    select="client_id, transaction_type, asset_type, asset_name, symbol, quantity, total_amount, transaction_date, status",
+    order_by="transaction_date DESC",
+    limit=10
+)
+
+TRANSACTION_VOLUME = TransactionSummary(
+    name="transaction_volume",
+    label="Transaction volumes",
+    select="transaction_type, COUNT(*) AS transaction_count, SUM(total_amount) AS total_volume, SUM(fees) AS total_fees",
+    group_by="transaction_type",
+    order_by="total_volume DESC",
+    limit=len(TRANSACTION_TYPES)
+)
+
+# Parameters are always passed, so literal percent signs are doubled for the driver
+NET_FLOWS = TransactionSummary(
+    name="net_flows",
+    label="Monthly net flows",
+    select=(
+        "DATE_FORMAT(transaction_date, '%%Y-%%m') AS month, "
+        "SUM(CASE WHEN transaction_type = 'BUY' THEN total_amount ELSE 0 END) AS inflow, "
+        "SUM(CASE WHEN transaction_type = 'SELL' THEN total_amount ELSE 0 END) AS outflow, "
+        f"SUM({NET_FLOW}) AS net_flow"
+    ),
+    group_by="month",
+    order_by="month DESC",
+    limit=12
+)
+
+ASSET_TYPE_SUMMARY = TransactionSummary(
+    name="asset_type_summary",
+    label="Transactions by asset type",
+    select=(
+        "asset_type, COUNT(*) AS transaction_count, SUM(total_amount) AS total_volume, "
+        f"SUM({NET_FLOW}) AS net_flow"
+    ),
+    group_by="asset_type",
+    order_by="total_volume DESC",
+    limit=20
+)
+
+CLIENT_ID_PATTERN = re.compile(r"\bclient_\d+\b", re.IGNORECASE)
+MONTH_NAMES = ("january", "february", "march", "april", "may", "june", "july",
+               "august", "september", "october", "november", "december")
+MONTHS = "|".join(MONTH_NAMES)
+# Whole period words only: "monthly" and "over the years" don't name a period. Months and
+# years count after a preposition ("in may", "since 2024"), so "may I" and amounts don't
+DATE_HINT_PATTERN = re.compile(
+    r"\b(?:today|yesterday|days?|week|month|quarter|year|ytd)\b"
+    rf"|\b(?:in|during|for|of|since|from)\s+(?:{MONTHS}|(?:19|20)\d{{2}})\b"
+    r"|\b(?:last|past|recent|previous)(?:\s+\w+){0,2}\s+(?:weeks|months|quarters|years)\b"
+)
+MONTH_PERIOD_PATTERN = re.compile(rf"\b(in|during|for|of|since|from)\s+({MONTHS})(?:\s+((?:19|20)\d{{2}}))?\b")
+YEAR_PERIOD_PATTERN = re.compile(r"\b(in|during|for|of|since|from)\s+((?:19|20)\d{2})\b")
+LAST_N_PATTERN = re.compile(r"\b(?:last|past)\s+(\d+)\s+(day|week|month|year)s?\b")
+PAST_UNIT_PATTERN = re.compile(r"\bpast\s+(day|week|month|year)\b")
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+TYPE_KEYWORDS = {
+    "buy": "BUY", "bought": "BUY", "purchase": "BUY",
+    "sell": "SELL", "sold": "SELL", "sale": "SELL",
+    "dividend": "DIVIDEND",
+}
+TYPE_PATTERN = re.compile(rf"\b({'|'.join(TYPE_KEYWORDS)})")
+
+def parse_date_range(question: str, now: Optional[datetime] = None) -> Optional[DateRange]:
+    """The transaction_date window a question asks about ("this quarter", "last 30 days", "in 2024"), if any"""
+    text = question.lower()
+    if not DATE_HINT_PATTERN.search(text):
+        return None
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today.replace(day=1)
+
+    # Rolling windows start at midnight, so the same question asked twice in a day
+    # plans the same filter (and shares cached answers)
+    match = LAST_N_PATTERN.search(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        return DateRange(start=today - timedelta(days=UNIT_DAYS[unit] * count), label=f"last {count} {unit}s")
+    # "past week" is a rolling window; "last week" is the previous calendar week, like "last month"
+    match = PAST_UNIT_PATTERN.search(text)
+    if match:
+        unit = match.group(1)
+        return DateRange(start=today - timedelta(days=UNIT_DAYS[unit]), label=f"past {unit}")
+    if "yesterday" in text:
+        return DateRange(start=today - timedelta(days=1), end=today, label="yesterday")
+    if "today" in text:
+        return DateRange(start=today, label="today")
+    week_start = today - timedelta(days=today.weekday())
+    if "last week" in text:
+        return DateRange(start=week_start - timedelta(days=7), end=week_start, label="last week")
+    if "this week" in text:
+        return DateRange(start=week_start, label="this week")
+    if "last month" in text:
+        previous = (month_start - timedelta(days=1)).replace(day=1)
+        return DateRange(start=previous, end=month_start, label="last month")
+    if "this month" in text:
+        return DateRange(start=month_start, label="this month")
+    if "quarter" in text:
+        quarter_start = month_start.replace(month=3 * ((now.month - 1) // 3) + 1)
+        if "last quarter" in text:
+            previous = (quarter_start - timedelta(days=1)).replace(day=1)
+            previous = previous.replace(month=3 * ((previous.month - 1) // 3) + 1)
+            return DateRange(start=previous, end=quarter_start, label="last quarter")
+        return DateRange(start=quarter_start, label="this quarter")
+    if "last year" in text:
+        return DateRange(start=today.replace(year=now.year - 1, month=1, day=1),
+                         end=today.replace(month=1, day=1), label="last year")
+    if "this year" in text or "ytd" in text or "year to date" in text:
+        return DateRange(start=today.replace(month=1, day=1), label="this year")
+    match = MONTH_PERIOD_PATTERN.search(text)
+    if match:
+        preposition, name, year = match.groups()
+        month = MONTH_NAMES.index(name) + 1
+        # Without a year, the latest such month that has started
+        year = int(year) if year else now.year if month <= now.month else now.year - 1
+        start = datetime(year, month, 1)
+        if preposition in ("since", "from"):
+            return DateRange(start=start, label=f"since {name} {year}")
+        return DateRange(start=start, end=datetime(year + month // 12, month % 12 + 1, 1), label=f"{name} {year}")
+    match = YEAR_PERIOD_PATTERN.search(text)
+    if match:
+        preposition, year = match.group(1), int(match.group(2))
+        if preposition in ("since", "from"):
+            return DateRange(start=datetime(year, 1, 1), label=f"since {year}")
+        return DateRange(start=datetime(year, 1, 1), end=datetime(year + 1, 1, 1), label=str(year))
+    return None
+
+def transaction_filter(question: str, now: Optional[datetime] = None) -> TransactionFilter:
+    """Filters stated in a question: a date window, a client ID and a single transaction type"""
+    text = question.lower()
+    client = CLIENT_ID_PATTERN.search(question)
+    types = {TYPE_KEYWORDS[keyword] for keyword in TYPE_PATTERN.findall(text)}
+    date_range = parse_date_range(question, now)
+    return TransactionFilter(
+        date_range=date_range,
+        date_unrecognized=date_range is None and bool(DATE_HINT_PATTERN.search(text)),
+        client_id=client.group(0).lower() if client else None,
+        # "buys and sells" compares types rather than filtering to one
+        transaction_type=types.pop() if len(types) == 1 else None
+    )
@@ -0,0 +1,100 @@
+"""
+Concurrency benchmark for /query/ask
+
+Fires a burst of concurrent questions at a running backend and reports how much
+the requests overlapped. With a blocking LLM call the requests serialize and the
+overlap factor stays close to 1; with the async client it approaches the
+configured LLM concurrency cap.
+
+Each request carries a distinct request number, so single-flight coalescing,
+the semantic answer cache (which requires equal numbers) and precomputed hot
+questions cannot collapse the burst into one LLM call. --same-question sends
+the question verbatim instead, to measure coalescing.
+
+Usage:
+    python benchmarks/concurrent_ask.py --url http://localhost:8000 --requests 32
+    python benchmarks/concurrent_ask.py --requests 32 --same-question
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+API_PREFIX = "/api/v1"
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """Get a bearer token for the benchmark user"""
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        json={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def ask(client: httpx.AsyncClient, token: str, question: str):
+    """Send one question and return its (start, end, status) timestamps"""
+    start = time.perf_counter()
+    response = await client.post(
+        f"{API_PREFIX}/query/ask",
+        json={"question": question, "include_charts": False},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    return start, time.perf_counter(), response.status_code
+
+def peak_overlap(intervals) -> int:
+    """Maximum number of requests that were in flight at the same moment"""
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    in_flight = peak = 0
+    for _, delta in events:
+        in_flight += delta
+        peak = max(peak, in_flight)
+    return peak
+
+def burst_questions(question: str, requests: int, same_question: bool):
+    """The questions to send, one per request"""
+    if same_question:
+        return [question] * requests
+    return [f"{question} (request {number})" for number in range(1, requests + 1)]
+
+async def run(args):
+    """Run the burst and print the summary"""
+    limits = httpx.Limits(max_connections=args.requests)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        token = await login(client, args.username, args.password)
+
+        questions = burst_questions(args.question, args.requests, args.same_question)
+        kind = "identical" if args.same_question else "distinct"
+        print(f"🚀 Sending {args.requests} concurrent {kind} requests to {args.url}")
+        wall_start = time.perf_counter()
+        results = await asyncio.gather(*(ask(client, token, question) for question in questions))
+        wall_time = time.perf_counter() - wall_start
+
+    latencies = [end - start for start, end, _ in results]
+    failures = sum(1 for _, _, status in results if status != 200)
+    overlap = sum(latencies) / wall_time if wall_time else 0.0
+
+    print(f"  ⏱️  Wall time:        {wall_time:.2f}s")
+    print(f"  ⏱️  Mean latency:     {statistics.mean(latencies):.2f}s")
+    print(f"  ⏱️  Max latency:      {max(latencies):.2f}s")
+    print(f"  🔀 Overlap factor:   {overlap:.1f}x (1.0x = fully serialized)")
+    print(f"  🔀 Peak in flight:   {peak_overlap([(s, e) for s, e, _ in results])}")
+    if failures:
+        print(f"  ❌ Failed requests:  {failures}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--question", default="Show me the top 5 portfolios")
+    parser.add_argument("--same-question", action="store_true",
+                        help="Send the question verbatim every time, letting identical requests coalesce")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
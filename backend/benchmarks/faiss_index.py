@@ -0,0 +1,165 @@
+"""
+Benchmark for the FAISS index engine (flat, IVF, HNSW) against Chroma
+
+Loads a corpus of embedding-like vectors into a FaissCollection of each index
+type (in a scratch directory), flushes it to disk, then reopens it memory-mapped
+in a fresh worker process and times single-query searches through the same
+collection API VectorStore uses. The worker reports how much its resident
+memory grew: private (RssAnon, paid by every uvicorn worker) and file-backed
+(RssFile, page cache shared by every worker mapping the file). Recall@k is
+measured against exact cosine search; the Chroma cosine index is measured the
+same way when chromadb is installed. Build time, open time, p50/p95 latency,
+recall, per-worker memory and index file size are printed and written as JSON.
+
+Usage:
+    python benchmarks/faiss_index.py
+    python benchmarks/faiss_index.py --vectors 100000 --types flat,hnsw --output faiss.json
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.config import settings
+from app.database.faiss_store import FAISS_INDEX_TYPES, FaissCollection
+from benchmarks.quantized_index import (
+    chroma_search, exact_top_k, make_corpus, process_memory, release_free_memory, timed_search
+)
+
+def load(collection: FaissCollection, corpus, batch_size: int = 5000):
+    for start in range(0, len(corpus), batch_size):
+        rows = range(start, min(start + batch_size, len(corpus)))
+        collection.upsert(
+            ids=[str(row) for row in rows],
+            embeddings=corpus[start:start + batch_size],
+            documents=[f"chunk {row}" for row in rows],
+            metadatas=[{"row": row} for row in rows]
+        )
+    collection.flush()
+
+def faiss_collection(directory: Path, index_type: str) -> FaissCollection:
+    return FaissCollection(
+        str(directory),
+        index_type=index_type,
+        nlist=settings.FAISS_NLIST,
+        nprobe=settings.FAISS_NPROBE,
+        hnsw_m=settings.FAISS_HNSW_M,
+        ef_search=settings.FAISS_EF_SEARCH
+    )
+
+def open_worker(scratch: Path, index_type: str, k: int) -> dict:
+    """Open a flushed index as a fresh uvicorn worker would and search it, reporting this process's memory growth"""
+    queries = np.load(scratch / "queries.npy")
+    truth = [set(row) for row in json.loads((scratch / "truth.json").read_text())]
+    baseline = process_memory()
+    start = time.perf_counter()
+    collection = faiss_collection(scratch / index_type, index_type)
+    collection.query([queries[0]], n_results=1, include=[])
+    open_seconds = time.perf_counter() - start
+
+    def search(query):
+        result = collection.query([query], n_results=k, include=[])
+        return [int(doc_id) for doc_id in result["ids"][0]]
+
+    result = {"open_s": round(open_seconds, 3), **timed_search(search, queries, truth, k)}
+    release_free_memory()
+    memory = process_memory()
+    result.update({name: memory[name] - baseline[name] for name in memory})
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000, help="Corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 embeds to 384 dimensions")
+    parser.add_argument("--topics", type=int, default=200, help="Clusters in the generated corpus")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default=",".join(FAISS_INDEX_TYPES), help="Comma-separated FAISS index types")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="faiss_index.json", help="JSON results path")
+    # Set for the per-index worker processes
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--scratch", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(open_worker(Path(args.scratch), args.worker, args.k)))
+        return
+
+    print(f"🧮 Generating {args.vectors:,} vectors of {args.dim} dimensions")
+    corpus, queries = make_corpus(args.vectors, args.queries, args.dim, args.topics, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+
+    results = {}
+    start = time.perf_counter()
+    search, _ = chroma_search(corpus, args.k)
+    if search is None:
+        print("⚠️ chromadb not installed, skipping the Chroma baseline")
+    else:
+        results["chroma"] = {"build_s": round(time.perf_counter() - start, 2),
+                             **timed_search(search, queries, truth, args.k)}
+
+    scratch = Path(tempfile.mkdtemp(prefix="faiss_benchmark_"))
+    try:
+        np.save(scratch / "queries.npy", queries)
+        (scratch / "truth.json").write_text(json.dumps([sorted(expected) for expected in truth]))
+        for index_type in args.types.split(","):
+            directory = scratch / index_type
+            print(f"🔨 Building {index_type} index")
+            start = time.perf_counter()
+            collection = faiss_collection(directory, index_type)
+            load(collection, corpus)
+            build_seconds = time.perf_counter() - start
+
+            worker = subprocess.run(
+                [sys.executable, __file__, *sys.argv[1:], "--worker", index_type, "--scratch", str(scratch)],
+                capture_output=True, text=True, check=True
+            )
+            results[f"faiss_{index_type}"] = {
+                "build_s": round(build_seconds, 2),
+                **json.loads(worker.stdout.splitlines()[-1]),
+                "index_file_bytes": collection.memory_mapped_bytes(),
+            }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"\n📊 {args.queries} queries, exact top-{args.k} as ground truth; worker memory growth in MiB")
+    print(f"  {'index':<12} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p95 ms':>9} {'build s':>8} "
+          f"{'file MiB':>9} {'private':>8} {'shared':>8}")
+    for name, result in results.items():
+        size = result.get("index_file_bytes")
+        private, shared = result.get("rss_anon_bytes"), result.get("rss_file_bytes")
+        print(f"  {name:<12} {result[f'recall@{args.k}']:>10.4f} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['build_s']:>8.2f} {(size / 2**20 if size else float('nan')):>9.1f} "
+              f"{(private / 2**20 if private is not None else float('nan')):>8.1f} "
+              f"{(shared / 2**20 if shared is not None else float('nan')):>8.1f}")
+
+    report = {
+        "benchmark": "faiss_index",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "vectors": args.vectors,
+        "queries": args.queries,
+        "dimensions": args.dim,
+        "k": args.k,
+        "settings": {"nlist": settings.FAISS_NLIST, "nprobe": settings.FAISS_NPROBE,
+                     "hnsw_m": settings.FAISS_HNSW_M, "ef_search": settings.FAISS_EF_SEARCH},
+        "indexes": results,
+    }
+    output = Path(args.output)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+if __name__ == "__main__":
+    main()
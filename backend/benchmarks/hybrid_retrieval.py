@@ -0,0 +1,147 @@
+"""
+Benchmark for knowledge base retrieval: dense, BM25 and hybrid (rank fusion)
+
+Indexes the domain knowledge from sample_data/vector_data.py in an in-memory
+Chroma collection with the configured embedding model and a BM25 index, then
+runs a set of labelled questions through each retrieval mode the way
+VectorStore does. Recall@1/3/5 and p50/p95 latency per mode are printed and
+written as JSON. Questions that name exact terms (tax sections, index names,
+ratios) are where lexical matching is expected to help.
+
+Usage:
+    python benchmarks/hybrid_retrieval.py
+    python benchmarks/hybrid_retrieval.py --candidates 20 --rrf-k 60 --output hybrid.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import chromadb
+from langchain_community.embeddings import SentenceTransformerEmbeddings
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.config import settings
+from app.database.lexical_index import BM25Index, reciprocal_rank_fusion
+from sample_data.vector_data import DOMAIN_KNOWLEDGE
+
+# (question, ID of the knowledge entry that answers it)
+LABELLED_QUESTIONS = [
+    ("How much can I deduct under 80CCD(1B)?", "knowledge_004"),
+    ("ELSS for 80C deductions", "knowledge_004"),
+    ("Which ratios like P/E should I check before buying a stock?", "knowledge_015"),
+    ("debt-to-equity and ROE screening", "knowledge_015"),
+    ("What benchmark should I use for mid-cap exposure, Nifty Midcap 100?", "knowledge_011"),
+    ("CRISIL Composite Bond Fund Index", "knowledge_011"),
+    ("Are REITs a good way to hold real estate?", "knowledge_005"),
+    ("Rental yields in Mumbai and Bangalore", "knowledge_005"),
+    ("How much Bitcoin or Ethereum should a client hold?", "knowledge_008"),
+    ("How much term life insurance does a celebrity need?", "knowledge_009"),
+    ("umbrella liability cover", "knowledge_009"),
+    ("How often should a portfolio be rebalanced?", "knowledge_012"),
+    ("tax-loss harvesting", "knowledge_012"),
+    ("What is ESG investing?", "knowledge_013"),
+    ("How big should an emergency fund be?", "knowledge_006"),
+    ("Should we invest in US and European markets?", "knowledge_007"),
+    ("Who should get power of attorney and how do trusts help with succession?", "knowledge_010"),
+    ("systematic withdrawal plans for irregular income", "knowledge_014"),
+    ("Risk tolerance for young athletes", "knowledge_003"),
+    ("What percentage should be in equity versus fixed income?", "knowledge_002"),
+]
+
+def build_indexes(model_name: str):
+    embeddings = SentenceTransformerEmbeddings(model_name=model_name)
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(name="hybrid_retrieval_benchmark", metadata={"hnsw:space": "cosine"})
+    ids = [entry["id"] for entry in DOMAIN_KNOWLEDGE]
+    texts = [entry["content"] for entry in DOMAIN_KNOWLEDGE]
+    metadatas = [entry["metadata"] for entry in DOMAIN_KNOWLEDGE]
+    collection.add(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings.embed_documents(texts))
+    lexical = BM25Index()
+    lexical.add_many(zip(ids, texts, metadatas))
+    return embeddings, collection, lexical
+
+def retrievers(embeddings, collection, lexical: BM25Index, k: int, candidates: int, rrf_k: int) -> dict:
+    def dense_ids(question: str, n_results: int):
+        results = collection.query(query_embeddings=[embeddings.embed_query(question)], n_results=n_results)
+        return results["ids"][0]
+
+    def lexical_ids(question: str, n_results: int):
+        return [doc_id for doc_id, _ in lexical.search(question, n_results)]
+
+    def hybrid_ids(question: str, n_results: int):
+        pool = min(max(n_results, candidates), len(lexical))
+        return reciprocal_rank_fusion([dense_ids(question, pool), lexical_ids(question, candidates)], n_results, rrf_k)
+
+    return {
+        "dense": lambda question: dense_ids(question, k),
+        "lexical": lambda question: lexical_ids(question, k),
+        "hybrid": lambda question: hybrid_ids(question, k),
+    }
+
+def evaluate(retrieve, iterations: int) -> dict:
+    hits = {1: 0, 3: 0, 5: 0}
+    samples = []
+    misses = []
+    for question, expected in LABELLED_QUESTIONS:
+        ranked = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            ranked = retrieve(question)
+            samples.append(time.perf_counter() - start)
+        for cutoff in hits:
+            hits[cutoff] += expected in ranked[:cutoff]
+        if expected not in ranked[:1]:
+            misses.append({"question": question, "expected": expected, "ranked": ranked})
+    ordered = sorted(samples)
+    return {
+        **{f"recall@{cutoff}": round(count / len(LABELLED_QUESTIONS), 3) for cutoff, count in hits.items()},
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 3),
+        "top1_misses": misses,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Sentence transformer model")
+    parser.add_argument("--candidates", type=int, default=settings.RETRIEVAL_CANDIDATES, help="Results per ranking before fusion")
+    parser.add_argument("--rrf-k", type=int, default=settings.RRF_K, help="Reciprocal rank fusion constant")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed runs per question")
+    parser.add_argument("--output", default="hybrid_retrieval.json", help="JSON results path")
+    args = parser.parse_args()
+
+    print(f"📚 Indexing {len(DOMAIN_KNOWLEDGE)} knowledge entries with {args.model}")
+    embeddings, collection, lexical = build_indexes(args.model)
+    modes = retrievers(embeddings, collection, lexical, k=5, candidates=args.candidates, rrf_k=args.rrf_k)
+
+    results = {}
+    print(f"\n📊 {len(LABELLED_QUESTIONS)} labelled questions, {args.iterations} iterations each")
+    print(f"  {'mode':<8} {'R@1':>6} {'R@3':>6} {'R@5':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode, retrieve in modes.items():
+        result = evaluate(retrieve, args.iterations)
+        results[mode] = result
+        print(f"  {mode:<8} {result['recall@1']:>6.2f} {result['recall@3']:>6.2f} {result['recall@5']:>6.2f} "
+              f"{result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f}")
+
+    report = {
+        "benchmark": "hybrid_retrieval",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "model": args.model,
+        "candidates": args.candidates,
+        "rrf_k": args.rrf_k,
+        "questions": len(LABELLED_QUESTIONS),
+        "modes": results,
+    }
+    output = Path(args.output)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+if __name__ == "__main__":
+    main()
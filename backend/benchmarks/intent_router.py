@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for question intent classification
+
+Checks that the IntentRouter routes like the substring if-chains it replaced and
+reports what the table-driven router costs next to them: the routing step alone
+(`IntentRouter.routes`, comparable to the chains) and the full QueryPlan build.
+
+Usage:
+    python benchmarks/intent_router.py --iterations 20000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.services.intent import IntentRouter, MONGO_RULES, MYSQL_RULES, CHART_RULES
+
+QUESTIONS = [
+    "Show me the top 5 portfolios",
+    "Which portfolios are largest?",
+    "Who are the top relationship managers by AUM?",
+    "Give me the portfolio breakup by relationship manager",
+    "What are the recent transactions?",
+    "Summarize trading activity for this quarter",
+    "What is the total transaction volume by type?",
+    "How should a conservative film star allocate between equity and debt?",
+    "Explain tax saving options under 80CCD(1B)",
+    "List clients with aggressive risk appetite and their portfolio values",
+]
+
+def legacy_classify(question: str):
+    """The three substring chains from the original query router"""
+    question_lower = question.lower()
+    if "top" in question_lower and "portfolio" in question_lower:
+        mongo = "top_portfolios"
+    elif "relationship manager" in question_lower:
+        mongo = "top_relationship_managers" if "top" in question_lower else "portfolio_by_relationship_manager"
+    elif "portfolio" in question_lower:
+        mongo = "portfolio_overview"
+    else:
+        mongo = None
+
+    question_lower = question.lower()
+    if "transaction" in question_lower or "trading" in question_lower:
+        mysql = "recent_transactions"
+    elif "volume" in question_lower:
+        mysql = "transaction_volume"
+    else:
+        mysql = None
+
+    if "portfolio" in question.lower() and "top" in question.lower():
+        chart = "top_portfolios"
+    elif "relationship manager" in question.lower():
+        chart = "rm_aum"
+    else:
+        chart = None
+    return mongo, mysql, chart
+
+# Deliberate routing changes since the chains were replaced
+ROUTING_FIXES = {
+    # Every volume question mentions transactions, so the volume chain was unreachable
+    "What is the total transaction volume by type?": (None, "transaction_volume", None),
+}
+
+def bench(label: str, classify, iterations: int):
+    """Classify the corpus `iterations` times and print throughput"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for question in QUESTIONS:
+            classify(question)
+    elapsed = time.perf_counter() - start
+    total = iterations * len(QUESTIONS)
+    print(f"  {label:<16} {total / elapsed:>12,.0f} questions/s   {elapsed / total * 1e6:6.2f} µs/question")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    router = IntentRouter(MONGO_RULES, MYSQL_RULES, CHART_RULES)
+
+    # The router must route like the chains it replaced, apart from deliberate fixes
+    for question in QUESTIONS:
+        plan = router.classify(question)
+        routed = tuple(spec.name if spec else None for spec in (plan.mongo, plan.mysql, plan.chart))
+        expected = ROUTING_FIXES.get(question) or legacy_classify(question)
+        assert routed == expected, f"Routing mismatch for '{question}': {routed}"
+
+    print(f"🚀 Classifying {len(QUESTIONS)} questions x {args.iterations} iterations")
+    bench("legacy chains", legacy_classify, args.iterations)
+    bench("router.routes", router.routes, args.iterations)
+    bench("router.classify", router.classify, args.iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Offline benchmark for the /query/ask pipeline with a per-stage latency breakdown
+
+Replays a corpus of representative questions through the same pipeline that
+serves /query/ask, against the local MongoDB, MySQL and ChromaDB, with the
+local LLM stand-in in place of Cohere. Every stage is timed (embedding,
+knowledge base retrieval, MongoDB, MySQL, prompt build, LLM, chart) and the
+run is repeated at each concurrency level. p50/p95/p99 per stage and overall
+throughput are printed and written as JSON so runs can be compared across
+commits.
+
+Usage:
+    python benchmarks/pipeline.py --seed-data
+    python benchmarks/pipeline.py --concurrency 1,8,32 --requests 400 --output results.json
+
+The LOCAL_LLM_* settings shape the stand-in LLM (latency, tokens/s, error rate).
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+# The stand-in LLM must be selected before the services are created
+os.environ["LLM_MODEL"] = os.environ.get("BENCHMARK_LLM_MODEL", "local/benchmark")
+
+from app.config import settings
+from app.database import mongodb, mysql_db, vector_store
+from app.routers import query
+from app.services import intent_router, llm_client
+from app.services.answer_cache import SemanticAnswerCache
+
+QUESTIONS = [
+    "Show me the top 5 portfolios",
+    "Who are the top relationship managers by AUM?",
+    "Give me the portfolio breakup by relationship manager",
+    "What are the recent transactions?",
+    "What is the total transaction volume by type?",
+    "List clients with aggressive risk appetite and their portfolio values",
+    "How should a conservative film star allocate between equity and debt?",
+    "Summarize trading activity for this quarter",
+    "Which portfolios are largest?",
+    "What metrics do we use to evaluate relationship managers?",
+]
+
+# Relative periods resolve against the clock, which must not change the answer cache signature
+REPEATED_QUESTIONS = QUESTIONS + [
+    "Net flows for the last 30 days",
+    "What were the buys over the past week?",
+    "Show transactions this month",
+]
+
+def check_answer_cache() -> dict:
+    """Plan and cache each question, then plan it again as a second request would and look it up"""
+    misses = []
+    for question in REPEATED_QUESTIONS:
+        cache = SemanticAnswerCache(max_entries=1, ttl_seconds=60, similarity_threshold=0.99)
+        embedding = [1.0, 0.0]  # Identical requests embed identically
+        cache.store(question, embedding, "answer", [], 0, intent_router.classify(question).signature)
+        if cache.lookup(question, embedding, 0, intent_router.classify(question).signature) is None:
+            misses.append(question)
+    if misses:
+        print(f"❌ Answer cache missed repeated questions: {misses}")
+    else:
+        print(f"✅ Answer cache hit every repeated question ({len(REPEATED_QUESTIONS)})")
+    return {"questions": len(REPEATED_QUESTIONS), "misses": misses}
+
+# Pipeline functions timed as stages, looked up on their owner at call time.
+# Owners are resolved after connecting since the embedding model loads then;
+# knowledge_base includes the embedding of the question (unless the answer cache
+# already embedded it) plus the Chroma search. Question embeddings are batched
+# through embed_documents, so one embedding sample can cover several questions.
+# The embedding model is a pydantic model, so its method is wrapped on the class.
+STAGES = {
+    "embedding": (lambda: vector_store.embeddings and type(vector_store.embeddings), "embed_documents"),
+    "knowledge_base": (lambda: query, "retrieve_context"),
+    "mongodb": (lambda: query, "query_mongodb_data"),
+    "mysql": (lambda: query, "query_mysql_data"),
+    "prompt": (lambda: query, "build_prompt"),
+    "llm": (lambda: query, "generate_ai_response"),
+    "chart": (lambda: query, "generate_chart_data"),
+}
+
+class StageTimer:
+    """Collects wall-clock samples per stage while the stage functions are wrapped"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._originals = {}
+
+    def install(self):
+        for stage, (resolve, name) in STAGES.items():
+            owner = resolve()
+            if owner is None:
+                continue
+            original = getattr(owner, name)
+            self._originals[stage] = (owner, original)
+            setattr(owner, name, self._wrap(stage, original))
+
+    def uninstall(self):
+        for stage, (owner, original) in self._originals.items():
+            setattr(owner, STAGES[stage][1], original)
+        self._originals.clear()
+
+    def reset(self):
+        self.samples.clear()
+        self.errors.clear()
+
+    def _wrap(self, stage, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except BaseException:
+                    self.errors[stage] += 1
+                    raise
+                finally:
+                    self.samples[stage].append(time.perf_counter() - start)
+        else:
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                except BaseException:
+                    self.errors[stage] += 1
+                    raise
+                finally:
+                    self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+def percentile(samples, fraction: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def summarize(samples) -> dict:
+    """Latency summary in milliseconds"""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+    }
+
+async def run_level(timer: StageTimer, concurrency: int, requests: int, include_charts: bool) -> dict:
+    """Replay `requests` questions with at most `concurrency` in flight"""
+    timer.reset()
+    slots = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one(index: int):
+        nonlocal failures
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await query.answer_question(QUESTIONS[index % len(QUESTIONS)], include_charts)
+            except Exception:
+                failures += 1
+            finally:
+                timer.samples["total"].append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - wall_start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "failed_requests": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "stages": {stage: summarize(samples) for stage, samples in timer.samples.items() if samples},
+        "stage_errors": dict(timer.errors),
+    }
+
+def print_level(result: dict):
+    print(f"\n📊 concurrency {result['concurrency']}: {result['throughput_rps']} req/s "
+          f"({result['requests']} requests in {result['elapsed_s']}s, {result['failed_requests']} failed)")
+    print(f"  {'stage':<16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, summary in result["stages"].items():
+        errors = result["stage_errors"].get(stage)
+        suffix = f"  ({errors} errors)" if errors else ""
+        print(f"  {stage:<16} {summary['count']:>6} {summary['p50_ms']:>9.2f} "
+              f"{summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}{suffix}")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+async def seed_data(random_seed: int):
+    """Reload the generated sample data into the local databases"""
+    import insert_enhanced_data
+
+    random.seed(random_seed)
+    await insert_enhanced_data.insert_mongodb_data()
+    await insert_enhanced_data.insert_mysql_data()
+    await insert_enhanced_data.insert_vector_data()
+
+async def connect():
+    """Connect whatever is available; a missing source shows up as stage errors"""
+    for name, start in (("MongoDB", mongodb.connect), ("MySQL", mysql_db.connect),
+                        ("ChromaDB", vector_store.initialize), ("LLM", llm_client.start)):
+        try:
+            await start()
+        except Exception as e:
+            print(f"⚠️ {name} unavailable, its stage will fail: {e}")
+
+async def disconnect():
+    await mongodb.disconnect()
+    await mysql_db.disconnect()
+    await llm_client.close()
+
+async def run(args):
+    answer_cache_check = check_answer_cache()
+    if args.seed_data:
+        await seed_data(args.random_seed)
+    await connect()
+
+    # Repeated questions would otherwise be answered from the caches after the first pass
+    settings.ANSWER_CACHE_ENABLED = args.answer_cache
+    settings.RETRIEVAL_CACHE_ENABLED = args.retrieval_cache
+    vector_store.cache.enabled = args.retrieval_cache  # Built at import, before the flag is read
+
+    timer = StageTimer()
+    timer.install()
+    levels = []
+    try:
+        # One untimed pass to load models and warm connection pools
+        await run_level(timer, 1, len(QUESTIONS), args.charts)
+        for concurrency in args.concurrency:
+            result = await run_level(timer, concurrency, args.requests, args.charts)
+            print_level(result)
+            levels.append(result)
+    finally:
+        timer.uninstall()
+        await disconnect()
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "llm_model": settings.LLM_MODEL,
+            "local_llm_latency_ms": settings.LOCAL_LLM_LATENCY_MS,
+            "local_llm_latency_jitter_ms": settings.LOCAL_LLM_LATENCY_JITTER_MS,
+            "local_llm_tokens_per_second": settings.LOCAL_LLM_TOKENS_PER_SECOND,
+            "local_llm_error_rate": settings.LOCAL_LLM_ERROR_RATE,
+            "llm_max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "answer_cache": args.answer_cache,
+            "retrieval_cache": args.retrieval_cache,
+            "include_charts": args.charts,
+            "questions": len(QUESTIONS),
+        },
+        "answer_cache_check": answer_cache_check,
+        "levels": levels,
+    }
+    output = Path(args.output or f"pipeline-{report['commit']}.json")
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 4, 16], help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--charts", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--answer-cache", action="store_true", help="Leave the semantic answer cache on")
+    parser.add_argument("--retrieval-cache", action="store_true",
+                        help="Leave the embedding and retrieval result caches on")
+    parser.add_argument("--seed-data", action="store_true", help="Reload the generated sample data first")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON results path (default: pipeline-<commit>.json)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark for serializing database results into the LLM prompt
+
+Compares the original path (full documents rendered with json.dumps) against
+per-intent projections rendered as compact column-header tables. Reports the
+prompt size in tokens and characters and the prompt build latency for each
+intent, using the generated sample data so no database is required.
+
+With --mongo, also times the live clients reads with and without the
+projection against the configured MongoDB.
+
+Usage:
+    python benchmarks/prompt_serialization.py --iterations 2000
+    python benchmarks/prompt_serialization.py --mongo
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from bson import ObjectId
+
+from app.config import settings
+from app.services.intent import PORTFOLIO_OVERVIEW, TOP_PORTFOLIOS
+from app.services.prompt_builder import DataSection, PromptBuilder, TokenCounter, render_rows_json
+from app.services.serialization import render_table
+from sample_data.mongodb_data_enhanced import generate_client_data
+from sample_data.mysql_data_enhanced import generate_enhanced_transactions
+
+QUESTION = "Show me the top 5 portfolios and their recent transactions"
+CONTEXT = ["High net worth clients should keep 10-15% of the portfolio in liquid assets."]
+
+def project(document: dict, projection: dict) -> dict:
+    """Apply an inclusion projection the way MongoDB would"""
+    return {key: value for key, value in document.items() if projection.get(key)}
+
+def bench_build(builder: PromptBuilder, sections, iterations: int) -> float:
+    """Median prompt build time in microseconds"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        builder.build(QUESTION, CONTEXT, sections)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+def compare(label: str, full_sections, compact_sections, counter: TokenCounter, iterations: int):
+    # An unlimited budget so both paths render everything and only the format differs
+    json_builder = PromptBuilder(budget=10 ** 9, counter=counter, render_rows=render_rows_json)
+    table_builder = PromptBuilder(budget=10 ** 9, counter=counter, render_rows=render_table)
+
+    json_prompt, json_stats = json_builder.build(QUESTION, CONTEXT, full_sections)
+    table_prompt, table_stats = table_builder.build(QUESTION, CONTEXT, compact_sections)
+    json_us = bench_build(json_builder, full_sections, iterations)
+    table_us = bench_build(table_builder, compact_sections, iterations)
+
+    saved = 1 - table_stats.tokens_used / json_stats.tokens_used
+    print(f"\n📊 {label}")
+    print(f"  {'json.dumps':<18} {json_stats.tokens_used:>7} tokens {len(json_prompt):>8} chars {json_us:>9.1f} µs")
+    print(f"  {'projected table':<18} {table_stats.tokens_used:>7} tokens {len(table_prompt):>8} chars {table_us:>9.1f} µs")
+    print(f"  tokens saved: {saved:.0%}")
+
+async def bench_mongo(iterations: int):
+    """Time the live clients reads with and without the projection"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    collection = client.get_default_database()[PORTFOLIO_OVERVIEW.collection]
+    try:
+        for label, projection in (("full documents", None), ("projected", PORTFOLIO_OVERVIEW.projection)):
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                await collection.find({}, projection).limit(PORTFOLIO_OVERVIEW.limit).to_list(length=PORTFOLIO_OVERVIEW.limit)
+                samples.append(time.perf_counter() - start)
+            print(f"  {label:<18} p50 {statistics.median(samples) * 1000:7.2f} ms")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--mongo", action="store_true", help="Also time live MongoDB reads")
+    args = parser.parse_args()
+
+    counter = TokenCounter(settings.PROMPT_TOKENIZER)
+    clients = [dict(client, _id=ObjectId()) for client in generate_client_data(50)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        transactions = generate_enhanced_transactions(5)[:10]
+
+    for query in (TOP_PORTFOLIOS, PORTFOLIO_OVERVIEW):
+        documents = clients[:query.limit]
+        full = [DataSection("MongoDB", query.label, documents)]
+        compact = [DataSection("MongoDB", query.label, [project(doc, query.projection) for doc in documents])]
+        compare(f"{query.name} ({len(documents)} rows)", full, compact, counter, args.iterations)
+
+    # Transaction reads select their columns in SQL, so only the format differs
+    sections = [DataSection("MySQL", "Recent transactions", transactions)]
+    compare(f"recent_transactions ({len(transactions)} rows)", sections, sections, counter, args.iterations)
+
+    if args.mongo:
+        print(f"\n🍃 Live MongoDB read of {PORTFOLIO_OVERVIEW.collection} (limit {PORTFOLIO_OVERVIEW.limit})")
+        asyncio.run(bench_mongo(args.iterations // 10 or 1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark for the compressed (int8 / float16) vector index against Chroma
+
+Builds a corpus of embedding-like vectors (unit-normalized, clustered around
+topic centroids like sentence embeddings of a knowledge base), computes the
+exact cosine top-10 for a set of held-out queries, and compares recall@10,
+latency and memory for:
+
+    chroma           the current Chroma HNSW cosine index (skipped if chromadb is missing)
+    float32          exact search over the float32 vectors held in memory
+    <dtype>          QuantizedVectorIndex scores alone
+    <dtype>+rescore  top VECTOR_INDEX_RESCORE_CANDIDATES re-scored against full-precision
+                     vectors in a FullPrecisionStore on disk, as VectorStore does with
+                     VECTOR_INDEX=int8/float16
+
+Each index is built and searched in its own process. Memory is that
+process's resident set (from /proc, so Linux only) after searching and
+releasing freed heap, minus its resident set before generating the corpus; `vector_bytes` is the size of
+the arrays alone. Results are printed and written as JSON.
+
+Usage:
+    python benchmarks/quantized_index.py
+    python benchmarks/quantized_index.py --vectors 100000 --queries 500 --output quantized.json
+"""
+
+import argparse
+import ctypes
+import gc
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.config import settings
+from app.database.quantized_index import QUANTIZED_DTYPES, FullPrecisionStore, QuantizedVectorIndex, normalize_rows
+
+def process_memory() -> dict:
+    """Resident memory of this process in bytes: total, anonymous and file-backed (Linux)"""
+    fields = {"VmRSS": "rss_bytes", "RssAnon": "rss_anon_bytes", "RssFile": "rss_file_bytes"}
+    memory = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            name, _, value = line.partition(":")
+            if name in fields:
+                memory[fields[name]] = int(value.split()[0]) * 1024
+    return memory
+
+def release_free_memory():
+    """Collect garbage and hand freed heap back to the OS, so RSS counts only live objects"""
+    gc.collect()
+    try:
+        # glibc otherwise keeps the build's temporaries resident
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def make_corpus(vectors: int, queries: int, dim: int, topics: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centroids = normalize_rows(rng.normal(size=(topics, dim)))
+    def sample(count):
+        topic = rng.integers(0, topics, size=count)
+        return normalize_rows(centroids[topic] + 0.6 * normalize_rows(rng.normal(size=(count, dim))))
+    return sample(vectors), sample(queries)
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> list:
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+def timed_search(search, queries: np.ndarray, truth: list, k: int) -> dict:
+    samples, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        samples.append(time.perf_counter() - start)
+        hits += len(expected & set(found[:k]))
+    ordered = sorted(samples)
+    return {
+        f"recall@{k}": round(hits / (k * len(queries)), 4),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 3),
+    }
+
+def rescorer(index: QuantizedVectorIndex, store: FullPrecisionStore, candidates: int, k: int):
+    """Re-score quantized candidates against the full-precision vectors on disk, like VectorStore"""
+    def search(query):
+        ids, vectors = store.get([doc_id for doc_id, _ in index.search(query, max(k, candidates))])
+        scores = vectors @ query
+        return [int(ids[position]) for position in np.argsort(-scores)[:k]]
+    return search
+
+def chroma_search(corpus: np.ndarray, k: int):
+    try:
+        import chromadb
+    except ImportError:
+        return None, None
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(name="quantized_index_benchmark", metadata={"hnsw:space": "cosine"})
+    for start in range(0, len(corpus), 5000):
+        rows = range(start, min(start + 5000, len(corpus)))
+        collection.add(ids=[str(row) for row in rows], embeddings=corpus[start:start + 5000].tolist())
+    def search(query):
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        return [int(doc_id) for doc_id in result["ids"][0]]
+    # hnswlib keeps every vector at float32 alongside its graph links
+    return search, len(corpus) * corpus.shape[1] * 4
+
+def build(variant: str, corpus: np.ndarray, args, scratch: Path):
+    """(search function, bytes of vector arrays) for one index variant, or (None, None) if unavailable"""
+    if variant == "chroma":
+        return chroma_search(corpus, args.k)
+    if variant == "float32":
+        return (lambda query: np.argpartition(-(corpus @ query), args.k - 1)[:args.k].tolist()), corpus.nbytes
+    dtype, _, rescore = variant.partition("+")
+    index = QuantizedVectorIndex(dtype)
+    ids = [str(row) for row in range(len(corpus))]
+    index.add(ids, corpus)
+    if not rescore:
+        return (lambda query: [int(doc_id) for doc_id, _ in index.search(query, args.k)]), index.memory_bytes()
+    store = FullPrecisionStore(str(scratch / "full_precision.sqlite3"))
+    for start in range(0, len(corpus), 5000):
+        store.add(ids[start:start + 5000], corpus[start:start + 5000])
+    return rescorer(index, store, args.rescore, args.k), index.memory_bytes()
+
+def measure(variant: str, args) -> dict:
+    """Build and search one variant in this process, reporting how much its resident memory grew"""
+    baseline = process_memory()
+    corpus, queries = make_corpus(args.vectors, args.queries, args.dim, args.topics, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+    scratch = Path(tempfile.mkdtemp(prefix="quantized_benchmark_"))
+    try:
+        search, vector_bytes = build(variant, corpus, args, scratch)
+        if search is None:
+            return {"skipped": True}
+        # Only what the index itself keeps of the corpus stays resident
+        del corpus
+        result = {**timed_search(search, queries, truth, args.k), "vector_bytes": vector_bytes}
+        release_free_memory()
+        memory = process_memory()
+        result.update({name: memory[name] - baseline[name] for name in memory})
+        return result
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000, help="Corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 embeds to 384 dimensions")
+    parser.add_argument("--topics", type=int, default=200, help="Clusters in the generated corpus")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=settings.VECTOR_INDEX_RESCORE_CANDIDATES,
+                        help="Quantized candidates re-scored at full precision")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="quantized_index.json", help="JSON results path")
+    parser.add_argument("--variant", help=argparse.SUPPRESS)  # Set for the per-index child processes
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.variant, args)))
+        return
+
+    print(f"🧮 {args.vectors:,} vectors of {args.dim} dimensions, one process per index")
+    float32_bytes = args.vectors * args.dim * 4
+    variants = ["chroma", "float32"] + [name for dtype in QUANTIZED_DTYPES for name in (dtype, f"{dtype}+rescore")]
+    results = {}
+    for variant in variants:
+        child = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--variant", variant],
+                               capture_output=True, text=True, check=True)
+        result = json.loads(child.stdout.splitlines()[-1])
+        if result.get("skipped"):
+            print("⚠️ chromadb not installed, skipping the Chroma baseline")
+            continue
+        results[variant] = result
+
+    baseline = results["float32"]["rss_bytes"]
+    print(f"\n📊 {args.queries} queries, exact top-{args.k} as ground truth, float32 vectors: {float32_bytes / 2**20:.1f} MiB")
+    print(f"  {'index':<16} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p95 ms':>9} {'RSS MiB':>8} {'vs f32':>7}")
+    for name, result in results.items():
+        # Resident memory against holding the float32 vectors in memory
+        result["memory_reduction"] = round(1 - result["rss_bytes"] / baseline, 4)
+        print(f"  {name:<16} {result[f'recall@{args.k}']:>10.4f} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['rss_bytes'] / 2**20:>8.1f} {result['memory_reduction']:>7.1%}")
+
+    report = {
+        "benchmark": "quantized_index",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "vectors": args.vectors,
+        "queries": args.queries,
+        "dimensions": args.dim,
+        "k": args.k,
+        "rescore_candidates": args.rescore,
+        "float32_bytes": float32_bytes,
+        "indexes": results,
+    }
+    output = Path(args.output)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+if __name__ == "__main__":
+    main()
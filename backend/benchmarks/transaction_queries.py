@@ -0,0 +1,237 @@
+"""
+Benchmark for the transaction summaries behind query_mysql_data on a large table
+
+Loads a separate MySQL database with generated transactions (1M rows by
+default), then times every summary in app/services/transactions.py under the
+filters questions produce (none, a date window, a client). Each summary runs
+with its aggregation pushed into MySQL; the unfiltered volume summary is also
+run the old way, pulling the rows into Python and aggregating there, as a
+baseline. p50/p95 per query and the EXPLAIN access path are printed and
+written as JSON. Before anything is loaded, a set of question phrasings is
+checked for the date window (or "period not recognized" label) they resolve to.
+
+Usage:
+    python benchmarks/transaction_queries.py --rows 1000000
+    python benchmarks/transaction_queries.py --reuse --iterations 50 --output transactions.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import aiomysql
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.config import settings
+from app.database.mysql_db import MySQLConnection
+from app.services.transactions import (
+    ASSET_TYPE_SUMMARY, NET_FLOWS, RECENT_TRANSACTIONS, TRANSACTION_VOLUME,
+    DateRange, TransactionFilter, transaction_filter
+)
+from insert_enhanced_data import TRANSACTIONS_INSERT, TRANSACTIONS_TABLE_DDL
+from sample_data.mysql_data_enhanced import generate_client_ids, generate_transactions_for_client
+
+SUMMARIES = [RECENT_TRANSACTIONS, TRANSACTION_VOLUME, NET_FLOWS, ASSET_TYPE_SUMMARY]
+
+UNRECOGNIZED = "period not recognized"
+
+# Question phrasings and the start of the period their filter describes ("" for none at all)
+PERIOD_QUESTIONS = [
+    ("Show monthly net flows", ""),
+    ("What is the weekly transaction volume?", ""),
+    ("How have net flows changed over the years?", ""),
+    ("Which transactions happened yesterday?", "yesterday"),
+    ("Net flows in 2024", "2024"),
+    ("Total sells during march 2024", "march 2024"),
+    ("Buys since january", "since january"),
+    ("Transaction volume since 2023", "since 2023"),
+    ("Recent transactions last week", "last week"),
+    ("Net flows over the past week", "past week"),
+    ("Net flows for the last 30 days", "last 30 days"),
+    ("Net flows this quarter", "this quarter"),
+    ("Net flows in the last few months", UNRECOGNIZED),
+    ("Transactions over the past couple of weeks", UNRECOGNIZED),
+]
+
+def check_periods() -> list:
+    """Resolve each PERIOD_QUESTIONS question's filter and compare its period with the expected one"""
+    checks = []
+    for question, expected in PERIOD_QUESTIONS:
+        described = transaction_filter(question).describe()
+        ok = described.startswith(f" ({expected}") if expected else described == ""
+        checks.append({"question": question, "expected": expected, "described": described.strip(" ()"), "ok": ok})
+    return checks
+
+def filters() -> dict:
+    now = datetime.now()
+    return {
+        "all": TransactionFilter(),
+        "last_90_days": TransactionFilter(date_range=DateRange(start=now - timedelta(days=90), label="last 90 days")),
+        "client": TransactionFilter(client_id="client_042"),
+        "client_last_year": TransactionFilter(
+            date_range=DateRange(start=now - timedelta(days=365), label="last 365 days"), client_id="client_042"
+        ),
+    }
+
+async def create_database(name: str):
+    connection = await aiomysql.connect(
+        host=settings.MYSQL_HOST, port=settings.MYSQL_PORT,
+        user=settings.MYSQL_USER, password=settings.MYSQL_PASSWORD
+    )
+    try:
+        async with connection.cursor() as cursor:
+            await cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+    finally:
+        connection.close()
+
+async def load_rows(db: MySQLConnection, rows: int, clients: int, batch_size: int):
+    """Replace the table contents with `rows` generated transactions"""
+    await db.execute_query("DROP TABLE IF EXISTS transactions")
+    await db.execute_query(TRANSACTIONS_TABLE_DDL)
+    client_ids = generate_client_ids(clients)
+    inserted = 0
+    start = time.perf_counter()
+    async with db.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            while inserted < rows:
+                count = min(batch_size, rows - inserted)
+                batch = generate_transactions_for_client(random.choice(client_ids), count)
+                for offset, transaction in enumerate(batch):
+                    # Generated IDs are 8 hex digits and would collide at this size
+                    transaction["transaction_id"] = f"TXN_B{inserted + offset:09d}"
+                    transaction["client_id"] = client_ids[(inserted + offset) % clients]
+                await cursor.executemany(TRANSACTIONS_INSERT, batch)
+                await connection.commit()
+                inserted += count
+                print(f"  📝 Inserted {inserted:,}/{rows:,} rows", end="\r")
+    print(f"\n  ✅ Loaded {rows:,} rows in {time.perf_counter() - start:.1f}s")
+    await db.execute_query("ANALYZE TABLE transactions")
+
+async def time_query(db: MySQLConnection, sql: str, params, iterations: int):
+    samples = []
+    rows = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows = await db.execute_query(sql, params)
+        samples.append(time.perf_counter() - start)
+    return samples, len(rows)
+
+async def explain(db: MySQLConnection, sql: str, params) -> list:
+    # execute_query only fetches results for SELECT statements
+    async with db.pool.acquire() as connection:
+        async with connection.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(f"EXPLAIN {sql}", params)
+            plan = await cursor.fetchall()
+    return [{"table": row.get("table"), "type": row.get("type"), "key": row.get("key"),
+             "rows": row.get("rows"), "extra": row.get("Extra")} for row in plan]
+
+async def python_volume_baseline(db: MySQLConnection):
+    """Volume by type computed the old way: fetch every row, aggregate in Python"""
+    rows = await db.execute_query("SELECT transaction_type, total_amount, fees FROM transactions", ())
+    totals = defaultdict(lambda: {"transaction_count": 0, "total_volume": 0, "total_fees": 0})
+    for row in rows:
+        total = totals[row["transaction_type"]]
+        total["transaction_count"] += 1
+        total["total_volume"] += row["total_amount"]
+        total["total_fees"] += row["fees"]
+    return totals
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+async def run(args):
+    periods = check_periods()
+    print("📅 Question periods")
+    for check in periods:
+        print(f"  {'✅' if check['ok'] else '❌'} {check['question']:<46} {check['described'] or '-'}")
+
+    await create_database(args.database)
+    settings.MYSQL_DATABASE = args.database
+    db = MySQLConnection()
+    await db.connect()
+    if db.pool is None:
+        raise SystemExit("❌ MySQL is not reachable")
+
+    try:
+        existing = 0
+        if args.reuse:
+            try:
+                existing = (await db.execute_query("SELECT COUNT(*) AS row_count FROM transactions", ()))[0]["row_count"]
+            except Exception:
+                existing = 0
+        if existing:
+            print(f"♻️ Reusing {existing:,} rows in {args.database}.transactions")
+        else:
+            random.seed(args.random_seed)
+            await load_rows(db, args.rows, args.clients, args.batch_size)
+        table_rows = (await db.execute_query("SELECT COUNT(*) AS row_count FROM transactions", ()))[0]["row_count"]
+
+        results = []
+        print(f"\n📊 {table_rows:,} rows, {args.iterations} iterations per query")
+        print(f"  {'summary':<22} {'filter':<18} {'rows':>5} {'p50 ms':>9} {'p95 ms':>9}  access")
+        for summary in SUMMARIES:
+            for filter_name, transaction_filter in filters().items():
+                sql, params = summary.render(transaction_filter)
+                samples, row_count = await time_query(db, sql, params, args.iterations)
+                access = await explain(db, sql, params)
+                result = {"summary": summary.name, "filter": filter_name, "sql": sql,
+                          "result_rows": row_count, **summarize(samples), "explain": access}
+                results.append(result)
+                keys = ",".join(str(step["key"]) for step in access)
+                print(f"  {summary.name:<22} {filter_name:<18} {row_count:>5} "
+                      f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f}  {keys}")
+
+        baseline = []
+        for _ in range(args.baseline_iterations):
+            start = time.perf_counter()
+            await python_volume_baseline(db)
+            baseline.append(time.perf_counter() - start)
+        baseline_summary = summarize(baseline)
+        print(f"\n  transaction_volume in Python (all rows fetched): p50 {baseline_summary['p50_ms']:.2f} ms")
+    finally:
+        await db.disconnect()
+
+    report = {
+        "benchmark": "transaction_queries",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "table_rows": table_rows,
+        "iterations": args.iterations,
+        "periods": periods,
+        "queries": results,
+        "python_aggregation_baseline": {"summary": TRANSACTION_VOLUME.name, "filter": "all", **baseline_summary},
+    }
+    output = Path(args.output)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\n💾 Results written to {output}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per summary and filter")
+    parser.add_argument("--baseline-iterations", type=int, default=3, help="Runs of the fetch-everything baseline")
+    parser.add_argument("--database", default="wealth_transactions_benchmark", help="Scratch database, recreated unless --reuse")
+    parser.add_argument("--reuse", action="store_true", help="Keep an already loaded table")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", default="transaction_queries.json", help="JSON results path")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Knowledge ingestion script: upserts documents into the ChromaDB knowledge base
+
+Re-runs only embed new or changed chunks. Sources are streamed, so large
+corpora (JSON Lines files with `id`, `content` and `metadata` per line, or
+directories of .md/.txt files) are never held in memory at once.
+
+Usage:
+    python ingest_knowledge.py                       # sample_data/vector_data.py
+    python ingest_knowledge.py --jsonl corpus.jsonl --batch-size 128
+    python ingest_knowledge.py --directory docs/
+    python ingest_knowledge.py --remove-legacy      # once, after upgrading from random chunk IDs
+"""
+
+import argparse
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent
+sys.path.append(str(backend_dir))
+
+from app.database.ingestion import iter_jsonl, iter_records, iter_text_files
+from app.database.vector_store import VectorStore
+from sample_data.vector_data import DOMAIN_KNOWLEDGE
+
+async def main(args):
+    sources = [iter_jsonl(Path(path)) for path in args.jsonl]
+    sources += [iter_text_files(Path(directory)) for directory in args.directory]
+    if not sources:
+        sources = [iter_records(DOMAIN_KNOWLEDGE)]
+
+    print("🔄 Ingesting knowledge into ChromaDB...")
+    # Only the API searches; ingestion writes to the collection without indexing it in memory
+    vector_store = VectorStore(in_memory_indexes=False)
+    try:
+        await vector_store.initialize()
+        if args.remove_legacy:
+            removed = await vector_store.remove_legacy_chunks()
+            print(f"  🧹 Removed {removed} legacy chunks without a source_id")
+        report = await vector_store.ingest(itertools.chain(*sources), batch_size=args.batch_size)
+    finally:
+        await vector_store.close()
+
+    print(f"  📄 {report.documents} documents, {report.unchanged_documents} unchanged")
+    print(f"  🧮 {report.chunks_embedded} chunks embedded in {report.batches} batches, "
+          f"{report.chunks_skipped} unchanged, {report.metadata_updates} metadata updates, "
+          f"{report.chunks_removed} removed")
+    print(f"✅ Ingestion finished in {report.seconds:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jsonl", action="append", default=[], help="JSON Lines file of documents (repeatable)")
+    parser.add_argument("--directory", action="append", default=[], help="Directory of .md/.txt files (repeatable)")
+    parser.add_argument("--remove-legacy", action="store_true",
+                        help="First delete chunks without a source_id, stored before incremental ingestion")
+    parser.add_argument("--batch-size", type=int, default=None, help="Documents per group and chunks per embedding call")
+    asyncio.run(main(parser.parse_args()))
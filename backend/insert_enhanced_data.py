@@ -14,6 +14,8 @@ sys.path.append(str(backend_dir))
 from app.database.mongodb import MongoDBConnection
 from app.database.mysql_db import MySQLConnection
 from app.database.vector_store import VectorStore
+from app.database.ingestion import iter_records
+from app.core.data_version import data_version
 from app.config import settings
 
 # Import enhanced sample data
@@ -21,6 +23,48 @@ from sample_data.mongodb_data_enhanced import generate_client_data, generate_por
 from sample_data.mysql_data_enhanced import generate_enhanced_transactions
 from sample_data.vector_data import DOMAIN_KNOWLEDGE
 
+# Summary queries (app/services/transactions.py) are served by the date and client indexes
+TRANSACTIONS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    transaction_id VARCHAR(50) UNIQUE NOT NULL,
+    client_id VARCHAR(50) NOT NULL,
+    transaction_type ENUM('BUY', 'SELL', 'DIVIDEND', 'INTEREST', 'FEE') NOT NULL,
+    asset_type VARCHAR(50) NOT NULL,
+    asset_name VARCHAR(200) NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    quantity DECIMAL(20, 6) NOT NULL,
+    price_per_unit DECIMAL(20, 6) NOT NULL,
+    total_amount DECIMAL(20, 6) NOT NULL,
+    fees DECIMAL(20, 6) DEFAULT 0,
+    transaction_date DATETIME NOT NULL,
+    settlement_date DATETIME,
+    broker VARCHAR(100),
+    exchange VARCHAR(50),
+    status ENUM('PENDING', 'COMPLETED', 'FAILED', 'CANCELLED') DEFAULT 'PENDING',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_client_id (client_id),
+    INDEX idx_transaction_date (transaction_date),
+    INDEX idx_asset_type (asset_type),
+    INDEX idx_symbol (symbol),
+    INDEX idx_date_type (transaction_date, transaction_type),
+    INDEX idx_client_date (client_id, transaction_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+"""
+
+TRANSACTIONS_INSERT = """
+INSERT INTO transactions (
+    transaction_id, client_id, transaction_type, asset_type, asset_name,
+    symbol, quantity, price_per_unit, total_amount, fees,
+    transaction_date, settlement_date, broker, exchange, status
+) VALUES (
+    %(transaction_id)s, %(client_id)s, %(transaction_type)s, %(asset_type)s, %(asset_name)s,
+    %(symbol)s, %(quantity)s, %(price_per_unit)s, %(total_amount)s, %(fees)s,
+    %(transaction_date)s, %(settlement_date)s, %(broker)s, %(exchange)s, %(status)s
+)
+"""
+
 async def insert_mongodb_data():
     """Insert enhanced sample data into MongoDB collections"""
     print("🔄 Inserting enhanced data into MongoDB...")
@@ -75,34 +119,7 @@ async def insert_mysql_data():
     
     try:
         # Create transactions table if it doesn't exist
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            transaction_id VARCHAR(50) UNIQUE NOT NULL,
-            client_id VARCHAR(50) NOT NULL,
-            transaction_type ENUM('BUY', 'SELL', 'DIVIDEND', 'INTEREST', 'FEE') NOT NULL,
-            asset_type VARCHAR(50) NOT NULL,
-            asset_name VARCHAR(200) NOT NULL,
-            symbol VARCHAR(50) NOT NULL,
-            quantity DECIMAL(20, 6) NOT NULL,
-            price_per_unit DECIMAL(20, 6) NOT NULL,
-            total_amount DECIMAL(20, 6) NOT NULL,
-            fees DECIMAL(20, 6) DEFAULT 0,
-            transaction_date DATETIME NOT NULL,
-            settlement_date DATETIME,
-            broker VARCHAR(100),
-            exchange VARCHAR(50),
-            status ENUM('PENDING', 'COMPLETED', 'FAILED', 'CANCELLED') DEFAULT 'PENDING',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            INDEX idx_client_id (client_id),
-            INDEX idx_transaction_date (transaction_date),
-            INDEX idx_asset_type (asset_type),
-            INDEX idx_symbol (symbol)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-        """
-        
-        await mysql_db.execute_query(create_table_query)
+        await mysql_db.execute_query(TRANSACTIONS_TABLE_DDL)
         print("  ✅ Created/verified transactions table")
         
         # Clear existing data
@@ -115,18 +132,6 @@ async def insert_mysql_data():
         
         # Insert new transactions in batches
         if transactions:
-            insert_query = """
-            INSERT INTO transactions (
-                transaction_id, client_id, transaction_type, asset_type, asset_name,
-                symbol, quantity, price_per_unit, total_amount, fees,
-                transaction_date, settlement_date, broker, exchange, status
-            ) VALUES (
-                %(transaction_id)s, %(client_id)s, %(transaction_type)s, %(asset_type)s, %(asset_name)s,
-                %(symbol)s, %(quantity)s, %(price_per_unit)s, %(total_amount)s, %(fees)s,
-                %(transaction_date)s, %(settlement_date)s, %(broker)s, %(exchange)s, %(status)s
-            )
-            """
-            
             # Insert in batches of 100 to avoid memory issues
             batch_size = 100
             total_inserted = 0
@@ -134,7 +139,7 @@ async def insert_mysql_data():
             for i in range(0, len(transactions), batch_size):
                 batch = transactions[i:i + batch_size]
                 for transaction in batch:
-                    await mysql_db.execute_query(insert_query, transaction)
+                    await mysql_db.execute_query(TRANSACTIONS_INSERT, transaction)
                 total_inserted += len(batch)
                 print(f"  📝 Inserted {total_inserted}/{len(transactions)} transactions")
             
@@ -153,12 +158,13 @@ async def insert_vector_data():
     vector_store = VectorStore()
     
     try:
-        # Initialize vector store
+        # Initialize vector store (adds the built-in domain knowledge)
         await vector_store.initialize()
         
-        # The vector store is already initialized with domain knowledge
-        # in the initialize method if the collection is empty
-        print(f"  ✅ Vector store ready with domain knowledge")
+        # Only new or changed knowledge documents are embedded
+        report = await vector_store.ingest(iter_records(DOMAIN_KNOWLEDGE))
+        print(f"  ✅ Ingested {report.documents} knowledge documents: {report.chunks_embedded} chunks embedded, "
+              f"{report.unchanged_documents} documents unchanged")
             
     except Exception as e:
         print(f"  ❌ Error inserting vector data: {e}")
@@ -225,6 +231,10 @@ async def main():
         await insert_mysql_data()
         await insert_vector_data()
         
+        # Running API workers drop answers cached against the old data (DATA_VERSION_BACKEND=redis)
+        await data_version.bump()
+        await data_version.close()
+        
         # Verify data insertion
         await verify_data()
         
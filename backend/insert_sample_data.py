@@ -14,6 +14,7 @@ sys.path.append(str(backend_dir))
 from app.database.mongodb import MongoDBConnection
 from app.database.mysql_db import MySQLConnection
 from app.database.vector_store import VectorStore
+from app.core.data_version import data_version
 from app.config import settings
 
 # Import sample data
@@ -212,6 +213,10 @@ async def main():
         await insert_mysql_data()
         await insert_vector_data()
         
+        # Running API workers drop answers cached against the old data (DATA_VERSION_BACKEND=redis)
+        await data_version.bump()
+        await data_version.close()
+        
         # Verify data insertion
         await verify_data()
         